@@ -0,0 +1,384 @@
+"""
+Benchmarks for the code indexer
+
+Usage:
+  python benchmark.py parse                       # synthetic large Python files
+  python benchmark.py parse path/to/big_module.py ...
+  python benchmark.py store --chunks 20000 --dim 384
+  python benchmark.py search --chunks 200000 --dim 128
+  python benchmark.py lexical --chunks 1000000
+  python benchmark.py chunks path/to/repo ... [--max-tokens 512]
+"""
+
+import argparse
+import ast
+import gc
+import os
+import random
+import shutil
+import tempfile
+import time
+from typing import Callable, List
+
+import numpy as np
+
+from chunk_store import DTYPES, ChunkStore
+from chunks import content_hash
+from embeddings import HashingEmbedder
+from lexical_index import BM25Index
+from main import CodeChunk, CodeIndexer
+from tokenizer import count_tokens
+from vector_index import BruteForceIndex, IVFIndex
+
+
+def synthetic_module(classes: int, methods: int, seed: int = 0) -> str:
+    """A large Python module with nested functions, decorators and many calls"""
+    rng = random.Random(seed)
+    lines = ["import os", "import sys", '"""Synthetic benchmark module"""', ""]
+    for c in range(classes):
+        lines += [f"class Service{c}(Base{c % 7}):", f'    """Service {c}"""', ""]
+        for m in range(methods):
+            prefix = "async def" if m % 5 == 0 else "def"
+            lines += [
+                "    @staticmethod" if m % 3 == 0 else "    @cached(ttl=60)",
+                f"    {prefix} method_{m}(self, a, b=1, *args, key=None, **kwargs):",
+                "        def helper(x):",
+                f"            return transform_{rng.randint(0, 50)}(x) + len(str(x))",
+                "        total = 0",
+                "        for i in range(a):",
+                f"            total += helper(i) * compute_{rng.randint(0, 50)}(b, i)",
+                "            if total > 1000:",
+                "                log(total)",
+                "        return finalize(total, *args, **kwargs)",
+                "",
+            ]
+    return "\n".join(lines)
+
+
+def legacy_index_python(content: str) -> int:
+    """The previous approach: ast.walk, then re-split the file and re-walk each definition"""
+    tree = ast.parse(content)
+    count = 0
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.FunctionDef, ast.ClassDef)):
+            lines = content.split("\n")
+            body = "\n".join(lines[node.lineno - 1 : node.end_lineno])
+            if isinstance(node, ast.FunctionDef):
+                calls = sorted(
+                    {
+                        child.func.id
+                        for child in ast.walk(node)
+                        if isinstance(child, ast.Call)
+                        and isinstance(child.func, ast.Name)
+                    }
+                )
+            count += bool(body)
+    return count
+
+
+def single_pass_index_python(content: str) -> int:
+    indexer = CodeIndexer(["."])
+    indexer._index_python_file(content, "bench.py", "bench", "bench.py")
+    return len(indexer.chunks)
+
+
+def best_of(fn: Callable[[str], int], content: str, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(content)
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def bench_parse(paths: List[str], repeat: int):
+    if paths:
+        sources = []
+        for path in paths:
+            with open(path, "r", encoding="utf-8") as f:
+                sources.append((path, f.read()))
+    else:
+        sources = [
+            (f"synthetic {c}x{m}", synthetic_module(c, m))
+            for c, m in ((20, 10), (50, 20), (100, 20))
+        ]
+
+    print(
+        f"{'file':<24} {'lines':>7} {'chunks':>7} {'legacy ms':>10} {'single ms':>10} {'speedup':>8}"
+    )
+    for name, content in sources:
+        legacy = best_of(legacy_index_python, content, repeat)
+        single = best_of(single_pass_index_python, content, repeat)
+        print(
+            f"{name[-24:]:<24} {content.count(chr(10)) + 1:>7} "
+            f"{single_pass_index_python(content):>7} {legacy * 1000:>10.1f} "
+            f"{single * 1000:>10.1f} {legacy / single:>7.1f}x"
+        )
+
+
+def rss_mb() -> float:
+    """Current resident set size (Linux)"""
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+
+def bench_store(count: int, dim: int):
+    vectors = np.random.default_rng(0).standard_normal((count, dim), dtype=np.float32)
+
+    gc.collect()
+    before = rss_mb()
+    chunks = [
+        CodeChunk(
+            id=f"{i:012x}",
+            type="function",
+            content=f"def function_{i}():\n    return {i}",
+            metadata={"repo_name": "bench", "file_path": f"pkg/module_{i % 100}.py"},
+            embedding=vectors[i].tolist(),
+        )
+        for i in range(count)
+    ]
+    print(f"{count} chunks x {dim} floats as lists: {rss_mb() - before:.0f} MB RSS\n")
+
+    print(
+        f"{'dtype':<8} {'build s':>8} {'disk MB':>8} {'open ms':>8} {'open RSS MB':>11} {'get ms':>7}"
+    )
+    root = tempfile.mkdtemp()
+    try:
+        for dtype in DTYPES:
+            path = os.path.join(root, dtype)
+            started = time.perf_counter()
+            with ChunkStore(path, dtype=dtype) as store:
+                store.add(chunks)
+            build = time.perf_counter() - started
+            disk = sum(
+                os.path.getsize(os.path.join(path, name)) for name in os.listdir(path)
+            )
+
+            gc.collect()
+            before = rss_mb()
+            started = time.perf_counter()
+            store = ChunkStore(path)
+            opened = time.perf_counter() - started
+            open_rss = rss_mb() - before
+            started = time.perf_counter()
+            for row in range(0, count, max(1, count // 100)):
+                store.chunk(row)
+            get = (time.perf_counter() - started) / min(count, 100)
+            store.close()
+
+            print(
+                f"{dtype:<8} {build:>8.2f} {disk / 2**20:>8.1f} {opened * 1000:>8.1f} "
+                f"{open_rss:>11.1f} {get * 1000:>7.3f}"
+            )
+    finally:
+        shutil.rmtree(root)
+
+
+def clustered_vectors(count: int, dim: int, clusters: int, rng) -> np.ndarray:
+    """Unit vectors scattered around random centers, like embeddings of related code"""
+    centers = rng.standard_normal((clusters, dim), dtype=np.float32)
+    vectors = centers[rng.integers(0, clusters, count)]
+    vectors += 0.6 * rng.standard_normal((count, dim), dtype=np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def bench_search(count: int, dim: int, queries: int, k: int):
+    rng = np.random.default_rng(0)
+    vectors = clustered_vectors(count, dim, max(1, count // 500), rng)
+    query_vectors = vectors[rng.choice(count, queries, replace=False)]
+    query_vectors += 0.3 * rng.standard_normal(query_vectors.shape, dtype=np.float32)
+    query_vectors /= np.linalg.norm(query_vectors, axis=1, keepdims=True)
+
+    root = tempfile.mkdtemp()
+    try:
+        store = ChunkStore(root)
+        store.add(
+            CodeChunk(id=f"{i:012x}", type="function", content="", metadata={})
+            for i in range(count)
+        )
+        store.set_embeddings(np.arange(count), vectors)
+        rows = store.rows(with_embedding=True)
+
+        texts = [
+            f"def handler_{i}(request):\n    return parse_{i % 97}(request.body)"
+            for i in range(2000)
+        ]
+        started = time.perf_counter()
+        HashingEmbedder(dim).embed(texts)
+        print(
+            f"HashingEmbedder: {len(texts) / (time.perf_counter() - started):.0f} chunks/s\n"
+        )
+
+        brute = BruteForceIndex(store)
+        started = time.perf_counter()
+        exact = [brute.search(q, k, rows)[0] for q in query_vectors]
+        brute_ms = (time.perf_counter() - started) / queries * 1000
+
+        started = time.perf_counter()
+        ivf = IVFIndex(store).build(rows)
+        build = time.perf_counter() - started
+
+        print(f"{count} vectors x {dim}, {queries} queries, recall@{k} vs brute force")
+        print(f"{'index':<16} {'recall':>7} {'ms/query':>9}")
+        print(f"{'brute force':<16} {1.0:>7.3f} {brute_ms:>9.2f}")
+        for nprobe in (1, 4, 8, 16, 32):
+            ivf.nprobe = nprobe
+            started = time.perf_counter()
+            found = [ivf.search(q, k)[0] for q in query_vectors]
+            ivf_ms = (time.perf_counter() - started) / queries * 1000
+            recall = np.mean(
+                [len(np.intersect1d(a, b)) / k for a, b in zip(found, exact)]
+            )
+            print(f"{f'ivf nprobe={nprobe}':<16} {recall:>7.3f} {ivf_ms:>9.2f}")
+        print(f"\nIVF build ({ivf.nlist} lists): {build:.1f} s")
+        store.close()
+    finally:
+        shutil.rmtree(root)
+
+
+def synthetic_chunks(count: int, rng) -> List[CodeChunk]:
+    """Function chunks over a Zipf-distributed identifier vocabulary"""
+    words = [
+        f"{a}{b}"
+        for a in ("get", "set", "parse", "load", "build", "to", "is")
+        for b in ("Config", "User", "Request", "Cache", "Index", "Token", "Path")
+    ]
+    vocabulary = np.array(words + [f"name{i}" for i in range(50_000)])
+    ranks = np.minimum(rng.zipf(1.3, (count, 24)), len(vocabulary)) - 1
+    return [
+        CodeChunk(
+            id=f"{i:012x}",
+            type="function",
+            content="def f(self):\n    return " + " + ".join(vocabulary[ranks[i]]),
+            metadata={
+                "function_name": str(vocabulary[ranks[i, 0]]),
+                "file_path": "m.py",
+            },
+        )
+        for i in range(count)
+    ]
+
+
+def bench_lexical(count: int, queries: int, k: int):
+    rng = np.random.default_rng(0)
+    root = tempfile.mkdtemp()
+    try:
+        store = ChunkStore(root)
+        started = time.perf_counter()
+        for start in range(0, count, 100_000):
+            store.add(synthetic_chunks(min(100_000, count - start), rng))
+        loaded = time.perf_counter() - started
+
+        started = time.perf_counter()
+        index = BM25Index.build(store, os.path.join(root, "bm25"))
+        build = time.perf_counter() - started
+        postings = int(index.df.sum())
+        size = os.path.getsize(os.path.join(root, "bm25", "postings.bin"))
+        print(f"{count} chunks: store {loaded:.1f} s, BM25 build {build:.1f} s")
+        print(
+            f"{postings} postings in {size / 2**20:.1f} MB "
+            f"({size / max(postings, 1):.2f} bytes/posting, varint)\n"
+        )
+
+        texts = [
+            " ".join(rng.choice(index.terms, rng.integers(1, 4)))
+            for _ in range(queries)
+        ]
+        timings = []
+        for text in texts:
+            started = time.perf_counter()
+            index.search(text, k)
+            timings.append(time.perf_counter() - started)
+        timings.sort()
+        print(
+            f"{queries} queries of 1-3 terms: p50 {timings[len(timings) // 2] * 1000:.2f} ms, "
+            f"p95 {timings[int(len(timings) * 0.95) - 1] * 1000:.2f} ms"
+        )
+        index.close()
+        store.close()
+    finally:
+        shutil.rmtree(root)
+
+
+def bench_chunks(repos: List[str], max_tokens: int):
+    root = None
+    if not repos:
+        root = tempfile.mkdtemp(prefix="chunks_bench_")
+        with open(os.path.join(root, "services.py"), "w") as f:
+            f.write(synthetic_module(50, 20))
+        repos = [root]
+    try:
+        print(
+            f"{'max tokens':>10} {'chunks':>7} {'content MB':>10} {'tokens':>9} "
+            f"{'largest':>8} {'over 512':>8} {'distinct':>8} {'to embed':>9}"
+        )
+        for budget in (10**9, max_tokens):
+            chunks = CodeIndexer(repos, max_chunk_tokens=budget).index_repositories()
+            tokens = [count_tokens(chunk.content) for chunk in chunks]
+            size = sum(len(chunk.content) for chunk in chunks)
+            # What a ChunkStore keeps: one row per distinct (normalized) content
+            distinct = {
+                content_hash(chunk) or i: count
+                for i, (chunk, count) in enumerate(zip(chunks, tokens))
+            }
+            print(
+                f"{'none' if budget == 10**9 else budget:>10} {len(tokens):>7} "
+                f"{size / 2**20:>10.2f} {sum(tokens):>9} {max(tokens):>8} "
+                f"{sum(count > 512 for count in tokens):>8} {len(distinct):>8} "
+                f"{sum(distinct.values()):>9}"
+            )
+    finally:
+        if root:
+            shutil.rmtree(root)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Code indexer benchmarks")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    parse = commands.add_parser(
+        "parse", help="Python chunk extraction: legacy vs single pass"
+    )
+    parse.add_argument(
+        "paths", nargs="*", help="Python files (default: synthetic modules)"
+    )
+    parse.add_argument("--repeat", type=int, default=3)
+
+    store = commands.add_parser("store", help="Chunk store size, open time and RSS")
+    store.add_argument("--chunks", type=int, default=20000)
+    store.add_argument("--dim", type=int, default=384)
+
+    search = commands.add_parser("search", help="Vector search recall and latency")
+    search.add_argument("--chunks", type=int, default=200_000)
+    search.add_argument("--dim", type=int, default=128)
+    search.add_argument("--queries", type=int, default=100)
+    search.add_argument("-k", type=int, default=10)
+
+    lexical = commands.add_parser("lexical", help="BM25 build size and query latency")
+    lexical.add_argument("--chunks", type=int, default=200_000)
+    lexical.add_argument("--queries", type=int, default=200)
+    lexical.add_argument("-k", type=int, default=10)
+
+    chunks = commands.add_parser(
+        "chunks", help="Chunk count, size and tokens to embed with a token budget"
+    )
+    chunks.add_argument(
+        "repos", nargs="*", help="Repositories (default: a synthetic module)"
+    )
+    chunks.add_argument("--max-tokens", type=int, default=512)
+
+    args = parser.parse_args()
+    if args.command == "parse":
+        bench_parse(args.paths, args.repeat)
+    elif args.command == "store":
+        bench_store(args.chunks, args.dim)
+    elif args.command == "search":
+        bench_search(args.chunks, args.dim, args.queries, args.k)
+    elif args.command == "lexical":
+        bench_lexical(args.chunks, args.queries, args.k)
+    elif args.command == "chunks":
+        bench_chunks(args.repos, args.max_tokens)
+
+
+if __name__ == "__main__":
+    main()
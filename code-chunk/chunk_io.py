@@ -0,0 +1,223 @@
+"""
+Streaming chunk files: one JSON chunk per line (JSONL), optionally zstd-compressed,
+plus a sidecar index for random access by chunk ID
+
+  chunks.jsonl       one chunk per line
+  chunks.jsonl.zst   the same lines, in independent zstd frames of frame_chunks chunks
+  <file>.idx         (ID, frame offset, offset in frame, length) records sorted by ID
+"""
+
+import io
+import json
+import mmap
+import os
+import struct
+from typing import Iterator, Optional, Tuple
+
+from chunks import CodeChunk, chunk_to_dict
+
+INDEX_MAGIC = b"CCHUNKIX"
+INDEX_HEADER = struct.Struct("<8sQ")  # magic, record count
+INDEX_RECORD = struct.Struct(
+    "<16sQII"
+)  # ID (NUL-padded), offset, offset in frame, length
+ID_SIZE = 16
+FRAME_CHUNKS = 256
+
+
+def is_jsonl(path: str) -> bool:
+    return path.endswith((".jsonl", ".jsonl.zst"))
+
+
+def index_path(path: str) -> str:
+    return path + ".idx"
+
+
+def _zstd():
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError(
+            "Compressed chunk files need zstandard: pip install 'code-chunk[zstd]'"
+        ) from None
+    return zstandard
+
+
+def _read_exact(stream, size: int) -> bytes:
+    parts = []
+    while size > 0:
+        part = stream.read(size)
+        if not part:
+            break
+        parts.append(part)
+        size -= len(part)
+    return b"".join(parts)
+
+
+class ChunkWriter:
+    """
+    Writes chunks one at a time as they are produced, so memory doesn't grow with the
+    corpus (only 32 bytes of index per chunk). Data and index go to temporary files that
+    replace the previous ones on close, so readers never see a half-written file.
+    """
+
+    def __init__(self, path: str, frame_chunks: int = FRAME_CHUNKS):
+        self.path = path
+        self.compressed = path.endswith(".zst")
+        self.frame_chunks = frame_chunks
+        self.count = 0
+        self._compressor = _zstd().ZstdCompressor(level=3) if self.compressed else None
+        self._file = open(path + ".tmp", "wb")
+        self._records = bytearray()
+        self._frame = []  # (ID, offset in frame, line) of the frame being filled
+        self._frame_size = 0
+
+    def write(self, chunk: CodeChunk):
+        key = chunk.id.encode()
+        if len(key) > ID_SIZE:
+            raise ValueError(f"Chunk ID longer than {ID_SIZE} bytes: {chunk.id!r}")
+        line = json.dumps(chunk_to_dict(chunk), separators=(",", ":")).encode() + b"\n"
+
+        if self.compressed:
+            self._frame.append((key, self._frame_size, line))
+            self._frame_size += len(line)
+            if len(self._frame) >= self.frame_chunks:
+                self._flush_frame()
+        else:
+            self._records += INDEX_RECORD.pack(key, self._file.tell(), 0, len(line))
+            self._file.write(line)
+        self.count += 1
+
+    def _flush_frame(self):
+        if not self._frame:
+            return
+        offset = self._file.tell()
+        for key, inner_offset, line in self._frame:
+            self._records += INDEX_RECORD.pack(key, offset, inner_offset, len(line))
+        self._file.write(
+            self._compressor.compress(b"".join(line for _, _, line in self._frame))
+        )
+        self._frame = []
+        self._frame_size = 0
+
+    def close(self):
+        if self.compressed:
+            self._flush_frame()
+        self._file.close()
+
+        size = INDEX_RECORD.size
+        records = sorted(
+            (self._records[i : i + size] for i in range(0, len(self._records), size)),
+            key=lambda record: record[:ID_SIZE],
+        )  # stable, so repeated IDs stay in file order
+        with open(index_path(self.path) + ".tmp", "wb") as f:
+            f.write(INDEX_HEADER.pack(INDEX_MAGIC, self.count))
+            f.writelines(records)
+
+        os.replace(self.path + ".tmp", self.path)
+        os.replace(index_path(self.path) + ".tmp", index_path(self.path))
+
+    def abort(self):
+        """Discard everything written; the previous file (if any) is left in place"""
+        self._file.close()
+        os.remove(self.path + ".tmp")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class ChunkReader:
+    """
+    Lazily reads a file written by ChunkWriter. Iterating streams it line by line;
+    get() binary-searches the memory-mapped index and reads just that chunk.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.compressed = path.endswith(".zst")
+        self._file = open(path, "rb")
+        self._index = None
+        self._count = 0
+
+        if os.path.exists(index_path(path)):
+            with open(index_path(path), "rb") as f:
+                self._index = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, self._count = INDEX_HEADER.unpack_from(self._index)
+            if magic != INDEX_MAGIC:
+                raise ValueError(f"Not a chunk index: {index_path(path)}")
+
+    def __iter__(self) -> Iterator[CodeChunk]:
+        with open(self.path, "rb") as f:
+            if self.compressed:
+                reader = (
+                    _zstd().ZstdDecompressor().stream_reader(f, read_across_frames=True)
+                )
+                lines = io.BufferedReader(reader, buffer_size=1 << 20)
+            else:
+                lines = f
+            for line in lines:
+                yield CodeChunk(**json.loads(line))
+
+    def __len__(self) -> int:
+        if self._index is None:
+            return sum(1 for _ in self)
+        return self._count
+
+    def __contains__(self, chunk_id: str) -> bool:
+        return self._locate(chunk_id) is not None
+
+    def get(self, chunk_id: str) -> Optional[CodeChunk]:
+        """The chunk with this ID (the first one written, if repeated), or None"""
+        location = self._locate(chunk_id)
+        if location is None:
+            return None
+
+        offset, inner_offset, length = location
+        self._file.seek(offset)
+        if self.compressed:
+            # Reads stop at the end of the frame, decompressing only up to this chunk
+            reader = _zstd().ZstdDecompressor().stream_reader(self._file, closefd=False)
+            data = _read_exact(reader, inner_offset + length)[inner_offset:]
+        else:
+            data = self._file.read(length)
+        return CodeChunk(**json.loads(data))
+
+    def _locate(self, chunk_id: str) -> Optional[Tuple[int, int, int]]:
+        if self._index is None:
+            raise ValueError(
+                f"{self.path} has no index; rewrite it with ChunkWriter for lookups"
+            )
+
+        key = chunk_id.encode().ljust(ID_SIZE, b"\0")
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            start = INDEX_HEADER.size + mid * INDEX_RECORD.size
+            if self._index[start : start + ID_SIZE] < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo == self._count:
+            return None
+
+        record = INDEX_RECORD.unpack_from(
+            self._index, INDEX_HEADER.size + lo * INDEX_RECORD.size
+        )
+        return record[1:] if record[0] == key else None
+
+    def close(self):
+        self._file.close()
+        if self._index is not None:
+            self._index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
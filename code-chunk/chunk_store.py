@@ -0,0 +1,464 @@
+"""
+Compact on-disk chunk store
+
+  <store>/chunks.db        SQLite: one row per distinct chunk content (whitespace-
+                           normalized), and every location it was added from (ID,
+                           metadata and the repo/file columns used for filtering)
+  <store>/embeddings.bin   row-major matrix of every chunk's embedding, memory-mapped
+  <store>/scales.bin       per-row float32 scales when embeddings are int8-quantized
+
+Opening a store maps the matrix instead of reading it, so it is near-instant and
+only the pages actually touched count towards RSS. Code repeated across files or
+repositories is stored, embedded and indexed once; its chunk lists the other
+locations in metadata["locations"].
+"""
+
+import json
+import os
+import sqlite3
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Union
+
+import numpy as np
+
+from chunks import CodeChunk, content_hash
+
+DTYPES = ("float32", "float16", "int8")
+INSERT_BATCH = 1000
+CHUNK_COLUMNS = "row, id, type, content, metadata, has_embedding, locations"
+# Metadata of each location listed on a chunk found in several places
+LOCATION_KEYS = (
+    "repo_name",
+    "file_path",
+    "directory",
+    "line_range",
+    "function_name",
+    "class_name",
+    "parent_class",
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS chunks (
+    row INTEGER PRIMARY KEY,  -- row of the embedding matrix, from 0
+    id TEXT NOT NULL,
+    type TEXT NOT NULL,
+    repo_name TEXT,
+    file_path TEXT,
+    file_type TEXT,
+    content TEXT NOT NULL,
+    metadata TEXT NOT NULL,  -- of the first location
+    has_embedding INTEGER NOT NULL DEFAULT 0,
+    content_hash TEXT,
+    locations INTEGER NOT NULL DEFAULT 1
+);
+CREATE INDEX IF NOT EXISTS idx_chunks_id ON chunks(id);
+CREATE INDEX IF NOT EXISTS idx_chunks_filter ON chunks(repo_name, type, file_type);
+CREATE TABLE IF NOT EXISTS locations (
+    row INTEGER NOT NULL,  -- the chunk holding this location's content
+    id TEXT NOT NULL,
+    repo_name TEXT,
+    file_path TEXT,
+    file_type TEXT,
+    metadata TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS store_info (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_chunks_hash ON chunks(content_hash);
+CREATE INDEX IF NOT EXISTS idx_locations_row ON locations(row);
+CREATE INDEX IF NOT EXISTS idx_locations_id ON locations(id);
+CREATE INDEX IF NOT EXISTS idx_locations_filter ON locations(repo_name, file_type);
+"""
+
+
+class ChunkStore:
+    """
+    Chunks addressed by row number, with embeddings in one contiguous matrix stored
+    as float32, float16 or int8 (symmetric per-row quantization, ~4x smaller than float32)
+    """
+
+    def __init__(self, path: str, dtype: str = "float32"):
+        """dtype applies when the store is created; an existing store keeps its own"""
+        if dtype not in DTYPES:
+            raise ValueError(f"Invalid dtype {dtype!r}. Expected one of {list(DTYPES)}")
+
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self.conn = sqlite3.connect(os.path.join(path, "chunks.db"))
+        self.conn.executescript(SCHEMA)
+        self._upgrade()
+        self.conn.executescript(INDEXES)
+
+        info = dict(self.conn.execute("SELECT key, value FROM store_info"))
+        self.dtype = info.get("dtype", dtype)
+        self.dim: Optional[int] = int(info["dim"]) if "dim" in info else None
+        if "dtype" not in info:
+            with self.conn:
+                self.conn.execute(
+                    "INSERT INTO store_info (key, value) VALUES ('dtype', ?)",
+                    (self.dtype,),
+                )
+
+        self._count = self.conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+        self.matrix: Optional[np.memmap] = None
+        self.scales: Optional[np.memmap] = None
+        self._map_embeddings()
+
+    # ============= Writing =============
+
+    def add(self, chunks: Iterable[CodeChunk]) -> int:
+        """
+        Append chunks (e.g. CodeIndexer.iter_chunks()) in batches, returns how many.
+        A chunk whose content is already stored only adds a location to that row.
+        """
+        added = 0
+        batch: List[CodeChunk] = []
+        for chunk in chunks:
+            batch.append(chunk)
+            if len(batch) >= INSERT_BATCH:
+                added += self._add_batch(batch)
+                batch = []
+        if batch:
+            added += self._add_batch(batch)
+        return added
+
+    def _add_batch(self, chunks: List[CodeChunk]) -> int:
+        first_row = self._count
+        hashes = [content_hash(chunk) for chunk in chunks]
+        distinct = list({key for key in hashes if key is not None})
+        known = dict(
+            self.conn.execute(
+                f"SELECT content_hash, row FROM chunks WHERE content_hash IN ({','.join('?' * len(distinct))})",
+                distinct,
+            )
+        )
+
+        new_chunks, locations = [], []
+        counts: Dict[int, int] = {}  # locations added per row
+        for chunk, key in zip(chunks, hashes):
+            row = known.get(key)
+            if row is None:
+                row = first_row + len(new_chunks)
+                if key is not None:
+                    known[key] = row
+            file_path = chunk.metadata.get("file_path")
+            location = (
+                row,
+                chunk.id,
+                chunk.metadata.get("repo_name"),
+                file_path,
+                Path(file_path).suffix if file_path is not None else None,
+                json.dumps(chunk.metadata, separators=(",", ":")),
+            )
+            if row == first_row + len(new_chunks):
+                new_chunks.append((chunk, key, location))
+            locations.append(location)
+            counts[row] = counts.get(row, 0) + 1
+
+        with self.conn:
+            self.conn.executemany(
+                """INSERT INTO chunks (row, id, type, repo_name, file_path, file_type, content, metadata, content_hash, locations)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                [
+                    (
+                        row,
+                        chunk.id,
+                        chunk.type,
+                        repo_name,
+                        file_path,
+                        file_type,
+                        chunk.content,
+                        metadata,
+                        key,
+                        counts[row],
+                    )
+                    for chunk, key, (
+                        row,
+                        _,
+                        repo_name,
+                        file_path,
+                        file_type,
+                        metadata,
+                    ) in new_chunks
+                ],
+            )
+            self.conn.executemany(
+                """INSERT INTO locations (row, id, repo_name, file_path, file_type, metadata)
+                   VALUES (?, ?, ?, ?, ?, ?)""",
+                locations,
+            )
+            self.conn.executemany(
+                "UPDATE chunks SET locations = locations + ? WHERE row = ?",
+                [(count, row) for row, count in counts.items() if row < first_row],
+            )
+        self._count += len(new_chunks)
+
+        # Only new rows take an embedding; repeats share the stored one
+        with_embedding = [
+            (location[0], chunk.embedding)
+            for chunk, _, location in new_chunks
+            if chunk.embedding is not None
+        ]
+        if with_embedding:
+            rows, vectors = zip(*with_embedding)
+            self.set_embeddings(list(rows), np.asarray(vectors, dtype=np.float32))
+        return len(chunks)
+
+    def set_embeddings(self, rows: Sequence[int], vectors: np.ndarray):
+        """Write embeddings for existing rows (vectors: len(rows) x dim)"""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.ndim != 2 or len(vectors) != len(rows):
+            raise ValueError("Expected one embedding vector per row")
+        if self.dim is None:
+            self.dim = vectors.shape[1]
+            with self.conn:
+                self.conn.execute(
+                    "INSERT INTO store_info (key, value) VALUES ('dim', ?)", (self.dim,)
+                )
+        elif vectors.shape[1] != self.dim:
+            raise ValueError(
+                f"Embedding size {vectors.shape[1]} != store size {self.dim}"
+            )
+
+        # Grow the files to cover every chunk (new rows read as zeros until set)
+        self._resize(self._embeddings_path(), self._count * self.dim * self._itemsize())
+        if self.dtype == "int8":
+            self._resize(self._scales_path(), self._count * 4)
+        self._map_embeddings(writable=True)
+
+        rows = np.asarray(rows, dtype=np.int64)
+        if self.dtype == "int8":
+            scales = np.abs(vectors).max(axis=1) / 127.0
+            scales[scales == 0] = 1.0
+            self.matrix[rows] = np.round(vectors / scales[:, None]).astype(np.int8)
+            self.scales[rows] = scales
+        else:
+            self.matrix[rows] = vectors.astype(self.dtype)
+        self.matrix.flush()
+        if self.scales is not None:
+            self.scales.flush()
+
+        with self.conn:
+            self.conn.executemany(
+                "UPDATE chunks SET has_embedding = 1 WHERE row = ?",
+                [(int(row),) for row in rows],
+            )
+        self._map_embeddings()
+
+    # ============= Reading =============
+
+    def __len__(self) -> int:
+        """Number of distinct chunks (rows)"""
+        return self._count
+
+    def location_count(self) -> int:
+        """Number of chunks added, repeats included"""
+        return self.conn.execute("SELECT COUNT(*) FROM locations").fetchone()[0]
+
+    def __iter__(self) -> Iterator[CodeChunk]:
+        for record in self.conn.execute(
+            f"SELECT {CHUNK_COLUMNS} FROM chunks ORDER BY row"
+        ):
+            yield self._to_chunk(record, self._locations([record]))
+
+    def chunk(self, row: int) -> CodeChunk:
+        record = self.conn.execute(
+            f"SELECT {CHUNK_COLUMNS} FROM chunks WHERE row = ?", (row,)
+        ).fetchone()
+        if record is None:
+            raise IndexError(f"No chunk at row {row}")
+        return self._to_chunk(record, self._locations([record]))
+
+    def chunks(self, rows: Sequence[int]) -> List[CodeChunk]:
+        """Chunks at the given rows, in the same order"""
+        found = {}
+        rows = [int(row) for row in rows]
+        for start in range(0, len(rows), INSERT_BATCH):
+            batch = rows[start : start + INSERT_BATCH]
+            records = self.conn.execute(
+                f"SELECT {CHUNK_COLUMNS} FROM chunks WHERE row IN ({','.join('?' * len(batch))})",
+                batch,
+            ).fetchall()
+            locations = self._locations(records)
+            for record in records:
+                found[record[0]] = self._to_chunk(record, locations)
+        return [found[row] for row in rows]
+
+    def get(self, chunk_id: str) -> Optional[CodeChunk]:
+        """
+        The chunk with this ID (the first one added, if repeated), or None. A chunk
+        stored at several locations comes back with this ID's own metadata.
+        """
+        location = self.conn.execute(
+            "SELECT row, metadata FROM locations WHERE id = ? ORDER BY rowid LIMIT 1",
+            (chunk_id,),
+        ).fetchone()
+        if location is None:
+            return None
+        chunk = self.chunk(location[0])
+        locations = chunk.metadata.get("locations")
+        chunk.id = chunk_id
+        chunk.metadata = json.loads(location[1])
+        if locations:
+            chunk.metadata["locations"] = locations
+        return chunk
+
+    def rows(
+        self,
+        repo_name: Optional[str] = None,
+        chunk_type: Optional[str] = None,
+        file_type: Optional[str] = None,
+        with_embedding: Optional[bool] = None,
+    ) -> np.ndarray:
+        """
+        Row numbers matching every given filter, in order. A chunk stored at several
+        locations matches when any of them is in repo_name / has file_type.
+        """
+        clauses, params = [], []
+        for column, value in (
+            ("l.repo_name", repo_name),
+            ("l.file_type", file_type),
+            ("c.type", chunk_type),
+        ):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if with_embedding is not None:
+            clauses.append(f"c.has_embedding = {int(with_embedding)}")
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        if repo_name is None and file_type is None:
+            query = f"SELECT c.row FROM chunks c {where} ORDER BY c.row"
+        else:
+            query = (
+                "SELECT DISTINCT c.row FROM locations l JOIN chunks c ON c.row = l.row "
+                f"{where} ORDER BY c.row"
+            )
+        found = self.conn.execute(query, params)
+        return np.fromiter((row for (row,) in found), dtype=np.int64)
+
+    def embedding(self, row: int) -> Optional[np.ndarray]:
+        """A row's embedding: a view into the mapped matrix, dequantized for int8"""
+        if self.matrix is None or row >= len(self.matrix):
+            return None
+        if self.dtype == "int8":
+            return self.matrix[row].astype(np.float32) * self.scales[row]
+        return self.matrix[row]
+
+    def vectors(self, rows: Union[np.ndarray, slice, None] = None) -> np.ndarray:
+        """
+        float32 embeddings of the given rows (default all), for batch scoring.
+        A slice reads a contiguous range without gathering (no copy for float32).
+        """
+        if self.matrix is None:
+            return np.zeros((0, self.dim or 0), np.float32)
+        matrix = self.matrix if rows is None else self.matrix[rows]
+        if self.dtype == "int8":
+            scales = self.scales if rows is None else self.scales[rows]
+            return matrix.astype(np.float32) * np.asarray(scales)[:, None]
+        return np.asarray(matrix, dtype=np.float32)
+
+    def close(self):
+        self.matrix = self.scales = None
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    # ============= Internals =============
+
+    def _to_chunk(self, record, locations: Dict[int, List[Dict]]) -> CodeChunk:
+        row, chunk_id, chunk_type, content, metadata, has_embedding, _ = record
+        metadata = json.loads(metadata)
+        if row in locations:
+            metadata["locations"] = locations[row]
+        return CodeChunk(
+            id=chunk_id,
+            type=chunk_type,
+            content=content,
+            metadata=metadata,
+            embedding=self.embedding(row) if has_embedding else None,
+        )
+
+    def _locations(self, records) -> Dict[int, List[Dict]]:
+        """Locations of the chunks (records) stored at more than one, by row"""
+        rows = [record[0] for record in records if record[-1] > 1]
+        locations: Dict[int, List[Dict]] = {}
+        if not rows:
+            return locations
+        for row, chunk_id, metadata in self.conn.execute(
+            f"SELECT row, id, metadata FROM locations WHERE row IN ({','.join('?' * len(rows))}) ORDER BY rowid",
+            rows,
+        ):
+            metadata = json.loads(metadata)
+            location = {"id": chunk_id}
+            location.update(
+                (key, metadata[key]) for key in LOCATION_KEYS if key in metadata
+            )
+            locations.setdefault(row, []).append(location)
+        return locations
+
+    def _upgrade(self):
+        """Bring a store written before content deduplication up to date"""
+        columns = {
+            column[1] for column in self.conn.execute("PRAGMA table_info(chunks)")
+        }
+        if "content_hash" in columns:
+            return
+        with self.conn:
+            self.conn.execute("ALTER TABLE chunks ADD COLUMN content_hash TEXT")
+            self.conn.execute(
+                "ALTER TABLE chunks ADD COLUMN locations INTEGER NOT NULL DEFAULT 1"
+            )
+            self.conn.execute(
+                """INSERT INTO locations (row, id, repo_name, file_path, file_type, metadata)
+                   SELECT row, id, repo_name, file_path, file_type, metadata FROM chunks"""
+            )
+            # Existing rows stay distinct; later chunks repeating them share their row
+            self.conn.executemany(
+                "UPDATE chunks SET content_hash = ? WHERE row = ?",
+                [
+                    (content_hash(CodeChunk(chunk_id, chunk_type, content, {})), row)
+                    for row, chunk_id, chunk_type, content in self.conn.execute(
+                        "SELECT row, id, type, content FROM chunks"
+                    ).fetchall()
+                ],
+            )
+
+    def _itemsize(self) -> int:
+        return np.dtype(self.dtype).itemsize
+
+    def _embeddings_path(self) -> str:
+        return os.path.join(self.path, "embeddings.bin")
+
+    def _scales_path(self) -> str:
+        return os.path.join(self.path, "scales.bin")
+
+    @staticmethod
+    def _resize(path: str, size: int):
+        with open(path, "ab") as f:
+            if f.tell() < size:
+                f.truncate(size)
+
+    def _map_embeddings(self, writable: bool = False):
+        """(Re)map the matrix; rows beyond the file (added since) have no embedding yet"""
+        self.matrix = self.scales = None
+        if self.dim is None or not os.path.exists(self._embeddings_path()):
+            return
+        rows = os.path.getsize(self._embeddings_path()) // (self.dim * self._itemsize())
+        if rows == 0:
+            return
+        mode = "r+" if writable else "r"
+        self.matrix = np.memmap(
+            self._embeddings_path(), dtype=self.dtype, mode=mode, shape=(rows, self.dim)
+        )
+        if self.dtype == "int8":
+            self.scales = np.memmap(
+                self._scales_path(), dtype=np.float32, mode=mode, shape=(rows,)
+            )
@@ -0,0 +1,34 @@
+import hashlib
+from dataclasses import asdict, dataclass
+from typing import Dict, Optional, Sequence
+
+
+@dataclass(slots=True)
+class CodeChunk:
+    id: str
+    type: str  # 'function', 'class', 'module', 'context', 'structure'
+    content: str
+    metadata: Dict
+    # A list, or a row view into a ChunkStore's memory-mapped embedding matrix
+    embedding: Optional[Sequence[float]] = None
+
+
+def chunk_to_dict(chunk: CodeChunk) -> Dict:
+    """JSON-ready dict of a chunk, with an embedding view copied out to a list"""
+    data = asdict(chunk)
+    if data["embedding"] is not None:
+        data["embedding"] = [float(x) for x in data["embedding"]]
+    return data
+
+
+def content_hash(chunk: CodeChunk) -> Optional[str]:
+    """
+    Key shared by chunks of the same type whose contents differ only in whitespace
+    (e.g. a vendored or copied file in another repository); None for empty content
+    """
+    normalized = " ".join(chunk.content.split())
+    if not normalized:
+        return None
+    return hashlib.blake2b(
+        f"{chunk.type}\0{normalized}".encode(), digest_size=16
+    ).hexdigest()
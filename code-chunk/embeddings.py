@@ -0,0 +1,136 @@
+"""
+Embedding pipeline for code chunks
+Any object with a `dim` and an `embed(texts)` returning unit-length float32 rows can be
+plugged in; HashingEmbedder needs no model or network, so results are reproducible offline
+"""
+
+import zlib
+from typing import Callable, Iterable, List, Optional, Protocol
+
+import numpy as np
+
+from chunk_store import ChunkStore
+from chunks import CodeChunk
+from tokenizer import code_tokens
+
+NAME_KEYS = ("function_name", "class_name", "file_path", "directory")
+
+
+class Embedder(Protocol):
+    dim: int
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """(len(texts), dim) float32 array of unit-length rows"""
+        ...
+
+
+def chunk_text(chunk: CodeChunk) -> str:
+    """Text embedded for a chunk: its names from metadata, then its content"""
+    names = [str(chunk.metadata[key]) for key in NAME_KEYS if key in chunk.metadata]
+    return "\n".join(names + [chunk.content])
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+class HashingEmbedder:
+    """
+    Deterministic bag-of-tokens embedder: code tokens and adjacent token pairs are hashed
+    (crc32, stable across processes) into signed buckets with log-scaled counts.
+    fit() turns it into a hashed TF-IDF embedder by weighting buckets with their IDF.
+    """
+
+    def __init__(self, dim: int = 384, bigrams: bool = True):
+        self.dim = dim
+        self.bigrams = bigrams
+        self.idf: Optional[np.ndarray] = None
+
+    def _features(self, text: str) -> List[str]:
+        tokens = code_tokens(text)
+        if self.bigrams:
+            tokens += [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+        return tokens
+
+    def _counts(self, text: str) -> np.ndarray:
+        features = self._features(text)
+        hashes = np.fromiter(
+            (zlib.crc32(feature.encode()) for feature in features),
+            dtype=np.uint32,
+            count=len(features),
+        )
+        signs = np.where(hashes & 0x80000000, 1.0, -1.0)
+        return np.bincount(hashes % self.dim, weights=signs, minlength=self.dim).astype(
+            np.float32
+        )
+
+    def fit(self, texts: Iterable[str]) -> "HashingEmbedder":
+        """Learn bucket IDF weights from a corpus"""
+        df = np.zeros(self.dim, dtype=np.float64)
+        n = 0
+        for text in texts:
+            df += self._counts(text) != 0
+            n += 1
+        self.idf = np.log((1 + n) / (1 + df)).astype(np.float32) + 1.0
+        return self
+
+    def save(self, path: str):
+        np.savez(
+            path,
+            dim=self.dim,
+            bigrams=self.bigrams,
+            idf=self.idf if self.idf is not None else np.zeros(0, np.float32),
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "HashingEmbedder":
+        data = np.load(path)
+        embedder = cls(int(data["dim"]), bool(data["bigrams"]))
+        embedder.idf = data["idf"] if len(data["idf"]) else None
+        return embedder
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        counts = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for i, text in enumerate(texts):
+            counts[i] = self._counts(text)
+        vectors = np.sign(counts) * np.log1p(np.abs(counts))
+        if self.idf is not None:
+            vectors *= self.idf
+        return _normalize(vectors).astype(np.float32)
+
+
+class SentenceTransformerEmbedder:
+    """A locally available sentence-transformers model (e.g. a code embedding model)"""
+
+    def __init__(self, model_name: str, device: Optional[str] = None):
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError:
+            raise ImportError(
+                "SentenceTransformerEmbedder needs sentence-transformers: "
+                "pip install sentence-transformers"
+            ) from None
+        self.model = SentenceTransformer(model_name, device=device)
+        self.dim = self.model.get_sentence_embedding_dimension()
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        return self.model.encode(
+            texts, normalize_embeddings=True, convert_to_numpy=True
+        ).astype(np.float32)
+
+
+def embed_store(
+    store: ChunkStore,
+    embedder: Embedder,
+    batch_size: int = 256,
+    text: Callable[[CodeChunk], str] = chunk_text,
+) -> int:
+    """Embed every chunk in the store that has no embedding yet, batch by batch"""
+    rows = store.rows(with_embedding=False)
+    for start in range(0, len(rows), batch_size):
+        batch = rows[start : start + batch_size]
+        texts = [text(chunk) for chunk in store.chunks(batch)]
+        store.set_embeddings(batch, embedder.embed(texts))
+    return len(rows)
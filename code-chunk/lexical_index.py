@@ -0,0 +1,209 @@
+"""
+BM25 lexical index over a ChunkStore
+
+  <index>/terms.txt      sorted vocabulary, one term per line
+  <index>/lexicon.npz    per term: posting byte offsets and document frequency;
+                         per row: document length
+  <index>/postings.bin   per term, varint-encoded (row delta, term frequency) pairs,
+                         memory-mapped and decoded with numpy at query time
+"""
+
+import bisect
+import mmap
+import os
+from array import array
+from collections import Counter
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from chunk_store import ChunkStore
+from chunks import CodeChunk
+from tokenizer import code_tokens, split_identifier
+
+NAME_KEYS = ("function_name", "class_name")
+NAME_WEIGHT = 3  # a definition's own name counts as this many occurrences
+ENCODE_BLOCK = 1 << 22  # postings varint-encoded at a time while building
+
+
+def chunk_terms(chunk: CodeChunk) -> List[str]:
+    """Tokens of the content, plus the chunk's function/class name and file name"""
+    terms = code_tokens(chunk.content)
+    for key in NAME_KEYS:
+        if key in chunk.metadata:
+            terms += code_tokens(chunk.metadata[key]) * NAME_WEIGHT
+    if "file_path" in chunk.metadata:
+        stem = os.path.splitext(os.path.basename(chunk.metadata["file_path"]))[0]
+        terms += [stem.lower()] + split_identifier(stem)
+    return terms
+
+
+def encode_varints(values: np.ndarray) -> np.ndarray:
+    """LEB128: 7 bits per byte, high bit set on every byte but a value's last"""
+    values = np.asarray(values, dtype=np.uint64)
+    lengths = np.ones(len(values), dtype=np.int64)
+    rest = values >> np.uint64(7)
+    while rest.any():
+        lengths += rest > 0
+        rest >>= np.uint64(7)
+
+    out = np.empty(int(lengths.sum()), dtype=np.uint8)
+    starts = np.cumsum(lengths) - lengths
+    for j in range(int(lengths.max(initial=0))):
+        has = lengths > j
+        byte = (values[has] >> np.uint64(7 * j)) & np.uint64(0x7F)
+        more = (lengths[has] > j + 1).astype(np.uint64) << np.uint64(7)
+        out[starts[has] + j] = byte | more
+    return out
+
+
+def decode_varints(data: np.ndarray) -> np.ndarray:
+    """Inverse of encode_varints, vectorized (values up to 2**63)"""
+    data = np.asarray(data, dtype=np.uint8)
+    last = data < 0x80
+    if last.all():  # every value fits in one byte (typical of dense postings)
+        return data.astype(np.int64)
+    value_of_byte = np.concatenate([[0], np.cumsum(last[:-1])])
+    value_starts = np.concatenate([[0], np.flatnonzero(last)[:-1] + 1])
+    shift = 7 * (np.arange(len(data)) - value_starts[value_of_byte])
+    parts = (data & 0x7F).astype(np.int64) << shift
+    return np.add.reduceat(parts, value_starts)
+
+
+class BM25Index:
+    """Okapi BM25 over store rows; k1 and b are the usual saturation/length parameters"""
+
+    def __init__(self, path: str, k1: float = 1.2, b: float = 0.75):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        with open(os.path.join(path, "terms.txt"), "r", encoding="utf-8") as f:
+            self.terms = f.read().split("\n") if os.path.getsize(f.name) else []
+        lexicon = np.load(os.path.join(path, "lexicon.npz"))
+        self.offsets = lexicon["offsets"]
+        self.df = lexicon["df"]
+        self.doc_lengths = lexicon["doc_lengths"]
+        avg_length = (
+            max(float(self.doc_lengths.mean()), 1.0) if len(self.doc_lengths) else 1.0
+        )
+        # BM25's length-normalized k1 per row, computed once instead of per query
+        self.length_norm = (k1 * (1 - b + b * self.doc_lengths / avg_length)).astype(
+            np.float32
+        )
+
+        with open(os.path.join(path, "postings.bin"), "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            self._postings = (
+                mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+            )
+
+    @classmethod
+    def build(cls, store: ChunkStore, path: str) -> "BM25Index":
+        """Index every chunk in the store, addressed by its row"""
+        vocabulary = {}
+        term_ids, rows, frequencies = array("i"), array("i"), array("i")
+        doc_lengths = np.zeros(len(store), dtype=np.uint32)
+
+        for row, chunk in enumerate(store):
+            terms = chunk_terms(chunk)
+            doc_lengths[row] = len(terms)
+            for term, count in Counter(terms).items():
+                term_ids.append(vocabulary.setdefault(term, len(vocabulary)))
+                rows.append(row)
+                frequencies.append(count)
+
+        terms = sorted(vocabulary)
+        rank = np.empty(len(terms), dtype=np.int32)
+        rank[[vocabulary[term] for term in terms]] = np.arange(len(terms))
+        del vocabulary
+        term_ids = rank[np.frombuffer(term_ids, dtype=np.int32)]
+
+        # Postings grouped by term; rows were appended in order, so a stable sort
+        # keeps them ascending within each term, and each is stored as a delta
+        order = np.argsort(term_ids, kind="stable")
+        term_ids = term_ids[order]
+        rows = np.frombuffer(rows, dtype=np.int32)[order]
+        frequencies = np.frombuffer(frequencies, dtype=np.int32)[order]
+        del order
+        df = np.bincount(term_ids, minlength=len(terms))
+        previous = np.concatenate([[0], rows[:-1]]).astype(np.int32)
+        previous[np.concatenate([[True], term_ids[1:] != term_ids[:-1]])] = 0
+        deltas = rows - previous
+        del term_ids, rows, previous
+
+        os.makedirs(path, exist_ok=True)
+        # Encoded a block at a time to bound memory; offsets[i] is where term i starts
+        term_starts = np.concatenate([[0], np.cumsum(df)])
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        written = 0
+        with open(os.path.join(path, "postings.bin"), "wb") as f:
+            for start in range(0, len(deltas), ENCODE_BLOCK):
+                end = min(start + ENCODE_BLOCK, len(deltas))
+                pairs = np.empty(2 * (end - start), dtype=np.int64)
+                pairs[0::2], pairs[1::2] = deltas[start:end], frequencies[start:end]
+                encoded = encode_varints(pairs)
+                value_ends = np.flatnonzero(encoded < 0x80) + 1
+                pair_starts = np.concatenate([[0], value_ends[1::2][:-1]])
+                first, last = np.searchsorted(term_starts, [start, end])
+                offsets[first:last] = (
+                    written + pair_starts[term_starts[first:last] - start]
+                )
+                f.write(encoded.tobytes())
+                written += len(encoded)
+        offsets[len(terms)] = written
+
+        with open(os.path.join(path, "terms.txt"), "w", encoding="utf-8") as f:
+            f.write("\n".join(terms))
+        np.savez(
+            os.path.join(path, "lexicon.npz"),
+            offsets=offsets,
+            df=df,
+            doc_lengths=doc_lengths,
+        )
+        return cls(path)
+
+    def postings(self, term: str) -> Tuple[np.ndarray, np.ndarray]:
+        """(rows, term frequencies) of a term, rows ascending"""
+        i = bisect.bisect_left(self.terms, term)
+        if i == len(self.terms) or self.terms[i] != term:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        data = np.frombuffer(
+            self._postings,
+            dtype=np.uint8,
+            count=int(self.offsets[i + 1] - self.offsets[i]),
+            offset=int(self.offsets[i]),
+        )
+        pairs = decode_varints(data)
+        return np.cumsum(pairs[0::2]), pairs[1::2]
+
+    def search(
+        self, query: str, k: int = 10, allowed: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Top-k (rows, BM25 scores); allowed is an optional boolean mask over rows"""
+        n = len(self.doc_lengths)
+        scores = np.zeros(n, dtype=np.float32)
+        matched = False
+        for term, weight in Counter(code_tokens(query)).items():
+            rows, tf = self.postings(term)
+            if len(rows) == 0:
+                continue
+            matched = True
+            idf = np.log(1 + (n - len(rows) + 0.5) / (len(rows) + 0.5))
+            tf = tf.astype(np.float32)
+            scores[rows] += (
+                (weight * idf * (self.k1 + 1)) * tf / (tf + self.length_norm[rows])
+            )
+        if not matched:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+
+        if allowed is not None:
+            scores[~allowed] = 0
+        candidates = np.flatnonzero(scores)
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return candidates, scores[candidates]
+
+    def close(self):
+        if isinstance(self._postings, mmap.mmap):
+            self._postings.close()
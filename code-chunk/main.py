@@ -2,33 +2,154 @@ import ast
 import hashlib
 import json
 import os
-from dataclasses import asdict, dataclass
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, Iterator, List, Optional
 
+from chunk_io import ChunkReader, ChunkWriter, is_jsonl
+from chunks import CodeChunk, chunk_to_dict
+from structural_chunker import LANGUAGES, find_definitions
+from tokenizer import budget_windows, count_tokens
 
-@dataclass
-class CodeChunk:
-    id: str
-    type: str  # 'function', 'class', 'module', 'context', 'structure'
-    content: str
-    metadata: Dict
-    embedding: Optional[List[float]] = None
+MIN_CODE_TOKENS = 16  # smaller runs of code between definitions get no chunk
+
+
+def _line_offsets(content: str) -> List[int]:
+    """Offset of the start of every line, so a line range is one slice of the source"""
+    offsets = [0]
+    find = content.find
+    i = find("\n")
+    while i != -1:
+        offsets.append(i + 1)
+        i = find("\n", i + 1)
+    return offsets
+
+
+def _first_line(node: ast.stmt) -> int:
+    """0-based line a statement starts on, decorators included"""
+    return (
+        min([node.lineno] + [d.lineno for d in getattr(node, "decorator_list", ())]) - 1
+    )
+
+
+class _PythonChunkVisitor(ast.NodeVisitor):
+    """
+    Collects classes and (async) functions in source order in a single traversal,
+    along with the names called anywhere inside each function (nested ones included),
+    the class each method or nested class belongs to, and where statements start
+    """
+
+    def __init__(self):
+        # (node, calls, parent class or None); calls is None for classes
+        self.definitions: List[tuple] = []
+        self.statement_starts: set = set()  # 0-based lines
+        self._open_functions: List[set] = []
+        self._scopes: List[ast.AST] = []
+
+    def visit(self, node):
+        if isinstance(node, ast.stmt):
+            self.statement_starts.add(_first_line(node))
+        return super().visit(node)
+
+    def _parent_class(self) -> Optional[ast.ClassDef]:
+        if self._scopes and isinstance(self._scopes[-1], ast.ClassDef):
+            return self._scopes[-1]
+        return None
+
+    def visit_FunctionDef(self, node):
+        calls = set()
+        self.definitions.append((node, calls, self._parent_class()))
+        self._open_functions.append(calls)
+        self._scopes.append(node)
+        self.generic_visit(node)
+        self._scopes.pop()
+        self._open_functions.pop()
+
+    visit_AsyncFunctionDef = visit_FunctionDef
+
+    def visit_ClassDef(self, node):
+        self.definitions.append((node, None, self._parent_class()))
+        self._scopes.append(node)
+        self.generic_visit(node)
+        self._scopes.pop()
+
+    def visit_Call(self, node):
+        if isinstance(node.func, ast.Name):
+            for calls in self._open_functions:
+                calls.add(node.func.id)
+        self.generic_visit(node)
+
+
+def _header_lines(start: int, end: int, nested: set, lines: List[str]) -> List[int]:
+    """
+    Lines [start, end) of a class without its nested definitions (nor the blank
+    lines that followed them): the declaration, docstring and class-level statements
+    """
+    kept, after_nested = [], False
+    for line in range(start, end):
+        if line in nested:
+            after_nested = True
+        elif not (after_nested and not lines[line].strip()):
+            after_nested = False
+            kept.append(line)
+    return kept
+
+
+# Indexer used by each pool worker, created once per process by _init_worker
+_worker_indexer = None
+
+
+def _init_worker(repo_paths: List[str], max_chunk_tokens: int, overlap_tokens: int):
+    global _worker_indexer
+    _worker_indexer = CodeIndexer(
+        repo_paths,
+        max_chunk_tokens=max_chunk_tokens,
+        chunk_overlap_tokens=overlap_tokens,
+    )
+
+
+def _index_file_batch(
+    batch: List[str], repo_name: str, previous: List[Optional[Dict]]
+) -> List[tuple]:
+    """Index a batch of files in a pool worker, returning (manifest entry, chunks) per file"""
+    return [
+        _worker_indexer._index_file_entry(file_path, repo_name, entry)
+        for file_path, entry in zip(batch, previous)
+    ]
 
 
 class CodeIndexer:
-    def __init__(self, repo_paths: List[str]):
+    def __init__(
+        self,
+        repo_paths: List[str],
+        workers: int = 1,
+        batch_size: int = 32,
+        manifest_path: Optional[str] = None,
+        max_chunk_tokens: int = 512,
+        chunk_overlap_tokens: int = 64,
+    ):
+        """
+        workers: processes used to read, parse and chunk files (1 = serial,
+        0 = one per CPU). batch_size: files sent to a worker per task.
+        manifest_path: file recording (mtime, size, content hash) -> chunk IDs per
+        file; with chunks from a previous run loaded, only changed files are re-indexed.
+        max_chunk_tokens: approximate size limit of a chunk (see tokenizer.count_tokens);
+        longer ones are split into parts repeating chunk_overlap_tokens of each other.
+        """
         self.repo_paths = repo_paths
+        self.workers = workers if workers > 0 else os.cpu_count() or 1
+        self.batch_size = batch_size
+        self.max_chunk_tokens = max_chunk_tokens
+        self.chunk_overlap_tokens = chunk_overlap_tokens
         self.chunks: List[CodeChunk] = []
+        self.manifest_path = manifest_path
+        self.manifest: Dict[str, Dict] = {}
+        if manifest_path and os.path.exists(manifest_path):
+            with open(manifest_path, "r") as f:
+                self.manifest = json.load(f)["files"]
         self.file_extensions = {
             ".py",
-            ".js",
-            ".ts",
-            ".java",
-            ".cpp",
-            ".h",
-            ".go",
-            ".rs",
+            *LANGUAGES,
         }
 
         # Directories to skip
@@ -53,26 +174,161 @@ class CodeIndexer:
         }
 
     def index_repositories(self) -> List[CodeChunk]:
-        """Main indexing function"""
-        for repo_path in self.repo_paths:
-            print(f"Indexing repository: {repo_path}")
-            self._index_repository(repo_path)
+        """
+        Main indexing function. Incremental when a manifest and the chunks it
+        describes (load_chunks) are present: unchanged files keep their chunks.
+        """
+        chunks = list(self.iter_chunks())
+        self.chunks = chunks
+        return chunks
+
+    def index_to_file(self, output_path: str) -> int:
+        """Index straight into a .jsonl/.jsonl.zst file without holding every chunk in memory"""
+        with ChunkWriter(output_path) as writer:
+            for chunk in self.iter_chunks():
+                writer.write(chunk)
+        self._save_manifest()
+        return writer.count
+
+    def iter_chunks(self) -> Iterator[CodeChunk]:
+        """
+        Yield chunks as they are produced, in the same order as index_repositories.
+        Only per-file metadata is kept until each repository's context chunks are built.
+        """
+        # Chunks of the previous run, reused for unchanged files and directories.
+        # File chunks are grouped per file since IDs can repeat within a file
+        # (e.g. two classes defining __init__)
+        previous_chunks = {chunk.id: chunk for chunk in self.chunks}
+        previous_file_chunks: Dict[tuple, List[CodeChunk]] = {}
+        for chunk in self.chunks:
+            if "file_path" in chunk.metadata:
+                key = (chunk.metadata["repo_name"], chunk.metadata["file_path"])
+                previous_file_chunks.setdefault(key, []).append(chunk)
+        # Files whose chunks don't match the loaded output are re-indexed
+        self.manifest = {
+            path: entry
+            for path, entry in self.manifest.items()
+            if entry["chunk_ids"]
+            == [
+                chunk.id
+                for chunk in previous_file_chunks.get(
+                    (entry["repo_name"], entry["rel_path"]), []
+                )
+            ]
+        }
+        self.chunks = []
+
+        if self.workers == 1:
+            for repo_path in self.repo_paths:
+                print(f"Indexing repository: {repo_path}")
+                yield from self._index_repository(
+                    repo_path, previous_chunks, previous_file_chunks
+                )
+            return
 
-        return self.chunks
+        with ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_init_worker,
+            initargs=(
+                self.repo_paths,
+                self.max_chunk_tokens,
+                self.chunk_overlap_tokens,
+            ),
+        ) as pool:
+            for repo_path in self.repo_paths:
+                print(f"Indexing repository: {repo_path} ({self.workers} workers)")
+                yield from self._index_repository(
+                    repo_path, previous_chunks, previous_file_chunks, pool
+                )
 
-    def _index_repository(self, repo_path: str):
+    def _index_repository(
+        self,
+        repo_path: str,
+        previous_chunks: Dict[str, CodeChunk],
+        previous_file_chunks: Dict[tuple, List[CodeChunk]],
+        pool: Optional[ProcessPoolExecutor] = None,
+    ) -> Iterator[CodeChunk]:
         """Index a single repository"""
         repo_name = Path(repo_path).name
+        code_files = self._get_code_files(repo_path)
+        previous_files = {
+            path
+            for path, entry in self.manifest.items()
+            if entry["repo_name"] == repo_name
+        }
+        previous = [self.manifest.get(file_path) for file_path in code_files]
+        removed = previous_files - set(code_files)
+
+        # 1. Create repository overview (the tree only changes when files come or go)
+        overview_id = self._generate_chunk_id(f"{repo_name}_overview")
+        if (
+            overview_id in previous_chunks
+            and not removed
+            and previous_files.issuperset(code_files)
+        ):
+            yield previous_chunks[overview_id]
+        else:
+            self._create_repo_overview(repo_path, repo_name)
+            yield from self._take_chunks()
+
+        # 2. Index individual files (reusing chunks of unchanged ones)
+        if pool is None:
+            results = (
+                self._index_file_entry(file_path, repo_name, entry)
+                for file_path, entry in zip(code_files, previous)
+            )
+        else:
+            # map yields batches in submission order, so chunks (and their order)
+            # are identical to a serial run
+            starts = range(0, len(code_files), self.batch_size)
+            results = (
+                result
+                for batch_results in pool.map(
+                    _index_file_batch,
+                    [code_files[i : i + self.batch_size] for i in starts],
+                    [repo_name] * len(starts),
+                    [previous[i : i + self.batch_size] for i in starts],
+                )
+                for result in batch_results
+            )
 
-        # 1. Create repository overview
-        self._create_repo_overview(repo_path, repo_name)
+        # Content-free copies, enough to describe each directory in step 3
+        file_summaries = []
+        changed_dirs = set()
+        reindexed = 0
+        for file_path, (entry, chunks) in zip(code_files, results):
+            if chunks is None:
+                chunks = previous_file_chunks.get((repo_name, entry["rel_path"]), [])
+            else:
+                changed_dirs.add(os.path.dirname(entry["rel_path"]))
+                reindexed += 1
+            self.manifest[file_path] = entry
+            for chunk in chunks:
+                file_summaries.append(
+                    CodeChunk(chunk.id, chunk.type, "", chunk.metadata)
+                )
+                yield chunk
 
-        # 2. Index individual files
-        for file_path in self._get_code_files(repo_path):
-            self._index_file(file_path, repo_name)
+        for file_path in removed:
+            changed_dirs.add(os.path.dirname(self.manifest.pop(file_path)["rel_path"]))
 
-        # 3. Create contextual chunks (related files)
-        self._create_context_chunks(repo_path, repo_name)
+        # 3. Create contextual chunks (related files), rebuilding only changed directories
+        self._create_context_chunks(
+            repo_name,
+            file_summaries,
+            previous_chunks,
+            changed_dirs if previous_files else None,
+        )
+        yield from self._take_chunks()
+        print(
+            f"  {reindexed} files indexed, {len(code_files) - reindexed} unchanged, "
+            f"{len(removed)} removed"
+        )
+
+    def _take_chunks(self) -> List[CodeChunk]:
+        """Chunks appended by the _create_* helpers since the last call"""
+        chunks, self.chunks = self.chunks, []
+        return chunks
 
     def _get_code_files(self, repo_path: str) -> List[str]:
         """Get all code files from repository"""
@@ -89,11 +345,49 @@ class CodeIndexer:
 
         return code_files
 
-    def _index_file(self, file_path: str, repo_name: str):
+    def _index_file_entry(
+        self, file_path: str, repo_name: str, previous: Optional[Dict]
+    ) -> tuple:
+        """
+        Manifest entry and chunks for one file. Chunks are None when the file is
+        unchanged since `previous`: same mtime and size, or else the same content hash.
+        """
+        stat = os.stat(file_path)
+        if (
+            previous
+            and previous["mtime_ns"] == stat.st_mtime_ns
+            and previous["size"] == stat.st_size
+        ):
+            return previous, None
+
+        with open(file_path, "rb") as f:
+            data = f.read()
+        entry = {
+            "repo_name": repo_name,
+            "rel_path": os.path.relpath(file_path, self.repo_paths[0]),
+            "mtime_ns": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "hash": hashlib.blake2b(data, digest_size=16).hexdigest(),
+            "chunk_ids": [],
+        }
+        if previous and previous["hash"] == entry["hash"]:
+            entry["chunk_ids"] = previous["chunk_ids"]
+            return entry, None
+
+        start = len(self.chunks)
+        self._index_file(file_path, repo_name, data)
+        chunks = self.chunks[start:]
+        del self.chunks[start:]
+        entry["chunk_ids"] = [chunk.id for chunk in chunks]
+        return entry, chunks
+
+    def _index_file(self, file_path: str, repo_name: str, data: Optional[bytes] = None):
         """Index a single file - create multiple chunk types"""
         try:
-            with open(file_path, "r", encoding="utf-8") as f:
-                content = f.read()
+            if data is None:
+                with open(file_path, "rb") as f:
+                    data = f.read()
+            content = data.decode("utf-8")
         except UnicodeDecodeError:
             print(f"Skipping binary file: {file_path}")
             return
@@ -115,7 +409,7 @@ class CodeIndexer:
     ):
         """Create overview chunk for the entire file"""
         # Extract imports and module-level info
-        lines = content.split("\n")
+        lines = content.split("\n", 50)[:50]
         imports = [
             line for line in lines[:50] if line.strip().startswith(("import ", "from "))
         ]
@@ -155,113 +449,193 @@ class CodeIndexer:
             print(f"Syntax error in {file_path}, skipping AST parsing")
             return
 
-        for node in ast.walk(tree):
-            if isinstance(node, ast.FunctionDef):
+        visitor = _PythonChunkVisitor()
+        visitor.visit(tree)
+        lines = content.split("\n")
+        line_tokens = [count_tokens(line) for line in lines]
+
+        # Lines of each class's methods and nested classes, left out of its chunk
+        nested_lines: Dict[ast.ClassDef, set] = {}
+        for node, _, parent in visitor.definitions:
+            if parent is not None:
+                nested_lines.setdefault(parent, set()).update(
+                    range(_first_line(node), node.end_lineno)
+                )
+
+        for node, calls, parent in visitor.definitions:
+            if calls is None:
+                self._create_class_chunk(
+                    node,
+                    parent,
+                    _header_lines(
+                        _first_line(node),
+                        node.end_lineno,
+                        nested_lines.get(node, set()),
+                        lines,
+                    ),
+                    lines,
+                    line_tokens,
+                    visitor.statement_starts,
+                    repo_name,
+                    rel_path,
+                )
+            else:
                 self._create_function_chunk(
-                    node, content, file_path, repo_name, rel_path
+                    node,
+                    calls,
+                    parent,
+                    lines,
+                    line_tokens,
+                    visitor.statement_starts,
+                    repo_name,
+                    rel_path,
                 )
-            elif isinstance(node, ast.ClassDef):
-                self._create_class_chunk(node, content, file_path, repo_name, rel_path)
 
     def _create_function_chunk(
         self,
         node: ast.FunctionDef,
-        file_content: str,
-        file_path: str,
+        calls: set,
+        parent: Optional[ast.ClassDef],
+        lines: List[str],
+        line_tokens: List[int],
+        statement_starts: set,
         repo_name: str,
         rel_path: str,
     ):
-        """Create chunk for individual function"""
-        lines = file_content.split("\n")
-        start_line = node.lineno - 1
-        end_line = node.end_lineno if hasattr(node, "end_lineno") else start_line + 20
-
-        function_content = "\n".join(lines[start_line:end_line])
-
-        # Extract function calls and dependencies
-        function_calls = []
-        for child in ast.walk(node):
-            if isinstance(child, ast.Call) and isinstance(child.func, ast.Name):
-                function_calls.append(child.func.id)
-
-        chunk_id = self._generate_chunk_id(f"{repo_name}_{rel_path}_{node.name}")
-
-        chunk = CodeChunk(
-            id=chunk_id,
-            type="function",
-            content=function_content,
-            metadata={
-                "repo_name": repo_name,
-                "file_path": rel_path,
-                "function_name": node.name,
-                "line_range": [start_line + 1, end_line],
-                "args": [arg.arg for arg in node.args.args],
-                "calls": list(set(function_calls)),
-                "decorators": [
-                    d.id if isinstance(d, ast.Name) else str(d)
-                    for d in node.decorator_list
-                ],
-            },
+        """
+        Create chunk for individual function (calls: names called inside it), split
+        at statement boundaries when it exceeds the token budget
+        """
+        start_line = _first_line(node)
+        end_line = node.end_lineno
+        args = node.args
+
+        metadata = {
+            "repo_name": repo_name,
+            "file_path": rel_path,
+            "function_name": node.name,
+            "args": [
+                arg.arg
+                for arg in (
+                    args.posonlyargs
+                    + args.args
+                    + [args.vararg]
+                    + args.kwonlyargs
+                    + [args.kwarg]
+                )
+                if arg is not None
+            ],
+            "calls": sorted(calls),
+            "decorators": [
+                d.id if isinstance(d, ast.Name) else ast.unparse(d)
+                for d in node.decorator_list
+            ],
+            "is_async": isinstance(node, ast.AsyncFunctionDef),
+        }
+        if parent is not None:
+            metadata.update(self._parent_reference(parent.name, repo_name, rel_path))
+        self._create_budgeted_chunks(
+            "function",
+            f"{repo_name}_{rel_path}_{node.name}",
+            metadata,
+            range(start_line, end_line),
+            lines,
+            line_tokens,
+            statement_starts,
         )
-        self.chunks.append(chunk)
 
     def _create_class_chunk(
         self,
         node: ast.ClassDef,
-        file_content: str,
-        file_path: str,
+        parent: Optional[ast.ClassDef],
+        header_lines: List[int],
+        lines: List[str],
+        line_tokens: List[int],
+        statement_starts: set,
         repo_name: str,
         rel_path: str,
     ):
-        """Create chunk for entire class"""
-        lines = file_content.split("\n")
-        start_line = node.lineno - 1
-        end_line = node.end_lineno if hasattr(node, "end_lineno") else len(lines)
-
-        class_content = "\n".join(lines[start_line:end_line])
-
+        """
+        Create the class's header chunk: the class without its methods and nested
+        classes (header_lines), which have chunks of their own referring back to it
+        """
         # Extract method names
-        methods = [n.name for n in node.body if isinstance(n, ast.FunctionDef)]
-
-        chunk_id = self._generate_chunk_id(f"{repo_name}_{rel_path}_class_{node.name}")
+        methods = [
+            n.name
+            for n in node.body
+            if isinstance(n, (ast.FunctionDef, ast.AsyncFunctionDef))
+        ]
 
-        chunk = CodeChunk(
-            id=chunk_id,
-            type="class",
-            content=class_content,
-            metadata={
-                "repo_name": repo_name,
-                "file_path": rel_path,
-                "class_name": node.name,
-                "line_range": [start_line + 1, end_line],
-                "methods": methods,
-                "base_classes": [
-                    base.id if isinstance(base, ast.Name) else str(base)
-                    for base in node.bases
-                ],
-            },
+        metadata = {
+            "repo_name": repo_name,
+            "file_path": rel_path,
+            "class_name": node.name,
+            "methods": methods,
+            "base_classes": [
+                base.id if isinstance(base, ast.Name) else ast.unparse(base)
+                for base in node.bases
+            ],
+        }
+        if parent is not None:
+            metadata.update(self._parent_reference(parent.name, repo_name, rel_path))
+        self._create_budgeted_chunks(
+            "class",
+            f"{repo_name}_{rel_path}_class_{node.name}",
+            metadata,
+            header_lines,
+            lines,
+            line_tokens,
+            statement_starts,
         )
-        self.chunks.append(chunk)
 
-    def _create_context_chunks(self, repo_path: str, repo_name: str):
-        """Create chunks that group related files together"""
+    def _parent_reference(self, class_name: str, repo_name: str, rel_path: str):
+        """Metadata linking a method or nested class to its class's chunk"""
+        return {
+            "parent_class": class_name,
+            "parent_id": self._generate_chunk_id(
+                f"{repo_name}_{rel_path}_class_{class_name}"
+            ),
+        }
+
+    def _create_context_chunks(
+        self,
+        repo_name: str,
+        file_chunks: List[CodeChunk],
+        previous_chunks: Optional[Dict[str, CodeChunk]] = None,
+        changed_dirs: Optional[set] = None,
+    ):
+        """
+        Create chunks that group related files together. With changed_dirs, only
+        those directories are rebuilt; the others keep their previous context chunk.
+        """
         # Group files by directory
         file_groups = {}
-        for chunk in self.chunks:
-            # Only process chunks that have file_path and belong to this repo
-            if (
-                chunk.metadata.get("repo_name") == repo_name
-                and "file_path" in chunk.metadata
-                and chunk.type not in ["repository_overview"]
-            ):  # Skip repo overview chunks
-                dir_path = os.path.dirname(chunk.metadata["file_path"])
-                if dir_path not in file_groups:
-                    file_groups[dir_path] = []
-                file_groups[dir_path].append(chunk)
+        for chunk in file_chunks:
+            dir_path = os.path.dirname(chunk.metadata["file_path"])
+            if dir_path not in file_groups:
+                file_groups[dir_path] = []
+            file_groups[dir_path].append(chunk)
 
         # Create context chunks for each directory
         for dir_path, chunks in file_groups.items():
-            if len(chunks) > 1:  # Only create context if multiple files
+            if len(chunks) <= 1:  # Only create context if multiple files
+                continue
+            context_id = self._generate_chunk_id(f"{repo_name}_{dir_path}_context")
+            previous = []
+            if changed_dirs is not None and dir_path not in changed_dirs:
+                first = previous_chunks.get(context_id)
+                parts = first.metadata.get("parts", 1) if first else 0
+                previous = [first] + [
+                    previous_chunks.get(
+                        self._generate_chunk_id(
+                            f"{repo_name}_{dir_path}_context_part{part}"
+                        )
+                    )
+                    for part in range(2, parts + 1)
+                ]
+            if previous and None not in previous:
+                self.chunks.extend(previous)
+            else:
                 self._create_directory_context_chunk(dir_path, chunks, repo_name)
 
     def _create_directory_context_chunk(
@@ -272,29 +646,43 @@ class CodeIndexer:
         all_files = set()
 
         for chunk in chunks:
-            if chunk.type in ["function", "class"]:
+            if (
+                chunk.type in ["function", "class"]
+                and chunk.metadata.get("part", 1) == 1
+            ):
                 summary = f"{chunk.metadata['file_path']}: {chunk.type} {chunk.metadata.get(f'{chunk.type}_name', '')}"
                 file_summaries.append(summary)
                 all_files.add(chunk.metadata["file_path"])
 
-        context_content = f"Directory: {dir_path}\n"
-        context_content += f"Files: {', '.join(all_files)}\n"
-        context_content += "Components:\n" + "\n".join(file_summaries)
-
-        chunk_id = self._generate_chunk_id(f"{repo_name}_{dir_path}_context")
-
-        chunk = CodeChunk(
-            id=chunk_id,
-            type="directory_context",
-            content=context_content,
-            metadata={
+        all_files = sorted(all_files)
+        header = f"Directory: {dir_path}\n"
+        header += f"Files: {', '.join(all_files)}\n"
+        header += "Components:\n"
+
+        # Large directories list their components over several parts
+        windows = budget_windows(
+            [count_tokens(summary) for summary in file_summaries],
+            max(self.max_chunk_tokens - count_tokens(header), 1),
+        ) or [(0, 0)]
+        base_id = f"{repo_name}_{dir_path}_context"
+        for part, (start, end) in enumerate(windows, 1):
+            metadata = {
                 "repo_name": repo_name,
                 "directory": dir_path,
-                "files": list(all_files),
+                "files": all_files,
                 "component_count": len(file_summaries),
-            },
-        )
-        self.chunks.append(chunk)
+            }
+            if len(windows) > 1:
+                metadata.update(part=part, parts=len(windows))
+            chunk = CodeChunk(
+                id=self._generate_chunk_id(
+                    base_id if part == 1 else f"{base_id}_part{part}"
+                ),
+                type="directory_context",
+                content=header + "\n".join(file_summaries[start:end]),
+                metadata=metadata,
+            )
+            self.chunks.append(chunk)
 
     def _create_repo_overview(self, repo_path: str, repo_name: str):
         """Create high-level repository overview"""
@@ -339,37 +727,184 @@ class CodeIndexer:
     def _index_generic_file(
         self, content: str, file_path: str, repo_name: str, rel_path: str
     ):
-        """Index non-Python files with simpler approach"""
-        # For now, create chunks based on logical sections
-        # You can extend this for specific languages
+        """
+        Index non-Python files: functions, methods and classes found by the structural
+        chunker, then the code between them, each within the token budget
+        """
+        language = LANGUAGES.get(Path(file_path).suffix)
+        definitions = None
+        if language is not None:
+            definitions = find_definitions(content, language, _line_offsets(content))
+            if definitions is None:
+                print(f"Unbalanced braces in {file_path}, chunking by size")
+        definitions = definitions or []
 
-        chunk_id = self._generate_chunk_id(f"{repo_name}_{rel_path}_content")
+        lines = content.split("\n")
+        line_tokens = [count_tokens(line) for line in lines]
+        covered = [False] * len(lines)
+        classes = {d.name for d in definitions if d.kind == "class"}
+
+        # Lines of each class's methods and nested classes, left out of its chunk
+        nested_lines: Dict[str, set] = {}
+        for definition in definitions:
+            if definition.parent is not None:
+                nested_lines.setdefault(definition.parent, set()).update(
+                    range(definition.start_line, definition.end_line)
+                )
 
-        chunk = CodeChunk(
-            id=chunk_id,
-            type="file_content",
-            content=content[:2000],  # Limit content size
-            metadata={
+        for definition in definitions:
+            start, end = definition.start_line, definition.end_line
+            covered[start:end] = [True] * (end - start)
+            metadata = {
                 "repo_name": repo_name,
                 "file_path": rel_path,
-                "file_type": Path(file_path).suffix,
-                "full_content_length": len(content),
-            },
-        )
-        self.chunks.append(chunk)
+                f"{definition.kind}_name": definition.name,
+            }
+            if definition.kind == "function":
+                chunk_id = f"{repo_name}_{rel_path}_{definition.name}"
+                metadata.update(
+                    args=definition.args,
+                    calls=definition.calls,
+                    decorators=definition.decorators,
+                    is_async=definition.is_async,
+                )
+                line_numbers = range(start, end)
+            else:
+                chunk_id = f"{repo_name}_{rel_path}_class_{definition.name}"
+                metadata.update(
+                    methods=definition.methods, base_classes=definition.base_classes
+                )
+                line_numbers = _header_lines(
+                    start, end, nested_lines.get(definition.name, set()), lines
+                )
+            if definition.parent in classes:
+                metadata.update(
+                    self._parent_reference(definition.parent, repo_name, rel_path)
+                )
+            elif (
+                definition.parent is not None
+            ):  # e.g. a Go method of another file's type
+                metadata["parent_class"] = definition.parent
+            self._create_budgeted_chunks(
+                definition.kind, chunk_id, metadata, line_numbers, lines, line_tokens
+            )
+
+        # Imports, globals and anything else outside the definitions
+        runs, run = [], []
+        for line, is_covered in enumerate(covered):
+            if not is_covered:
+                run.append(line)
+            elif run:
+                runs.append(run)
+                run = []
+        if run:
+            runs.append(run)
+        for run in runs:
+            if definitions and sum(line_tokens[line] for line in run) < MIN_CODE_TOKENS:
+                continue
+            suffix = "" if run is runs[0] else f"_{run[0] + 1}"
+            self._create_budgeted_chunks(
+                "file_content",
+                f"{repo_name}_{rel_path}_content{suffix}",
+                {
+                    "repo_name": repo_name,
+                    "file_path": rel_path,
+                    "file_type": Path(file_path).suffix,
+                    "full_content_length": len(content),
+                },
+                run,
+                lines,
+                line_tokens,
+            )
+
+    def _create_budgeted_chunks(
+        self,
+        chunk_type: str,
+        base_id: str,
+        metadata: Dict,
+        line_numbers,
+        lines: List[str],
+        line_tokens: List[int],
+        statement_starts: Optional[set] = None,
+    ):
+        """
+        One chunk of the given lines of a file (0-based, ascending), or when they exceed
+        max_chunk_tokens, overlapping parts preferring to end at statement boundaries:
+        before statement_starts lines if given, else after lines ending a statement or
+        block in brace languages
+        """
+        line_numbers = list(line_numbers)
+        if not line_numbers:
+            return
+        tokens = [line_tokens[line] for line in line_numbers]
+        windows = [(0, len(line_numbers))]
+        if sum(tokens) > self.max_chunk_tokens:
+            breaks = [True] * len(line_numbers)
+            for i in range(1, len(line_numbers)):
+                if line_numbers[i] != line_numbers[i - 1] + 1:
+                    continue
+                if statement_starts is not None:
+                    breaks[i] = line_numbers[i] in statement_starts
+                    continue
+                previous = lines[line_numbers[i - 1]].rstrip()
+                breaks[i] = (
+                    not previous
+                    or previous.endswith((";", "{", "}", ","))
+                    or not lines[line_numbers[i]].strip()
+                )
+            windows = budget_windows(
+                tokens, self.max_chunk_tokens, self.chunk_overlap_tokens, breaks
+            )
+
+        for part, (start, end) in enumerate(windows, 1):
+            part_metadata = dict(metadata)
+            part_metadata["line_range"] = [
+                line_numbers[start] + 1,
+                line_numbers[end - 1] + 1,
+            ]
+            if len(windows) > 1:
+                part_metadata.update(part=part, parts=len(windows))
+            chunk = CodeChunk(
+                id=self._generate_chunk_id(
+                    base_id if part == 1 else f"{base_id}_part{part}"
+                ),
+                type=chunk_type,
+                content="\n".join(lines[line] for line in line_numbers[start:end]),
+                metadata=part_metadata,
+            )
+            self.chunks.append(chunk)
 
     def _generate_chunk_id(self, base_id: str) -> str:
         """Generate unique chunk ID"""
         return hashlib.md5(base_id.encode()).hexdigest()[:12]
 
     def save_chunks(self, output_path: str):
-        """Save chunks to JSON file"""
-        chunks_data = [asdict(chunk) for chunk in self.chunks]
-        with open(output_path, "w") as f:
-            json.dump(chunks_data, f, indent=2)
+        """
+        Save chunks (and the manifest describing them) to a JSON file, or stream
+        them to a .jsonl/.jsonl.zst file with a sidecar index (see chunk_io)
+        """
+        if is_jsonl(output_path):
+            with ChunkWriter(output_path) as writer:
+                for chunk in self.chunks:
+                    writer.write(chunk)
+        else:
+            chunks_data = [chunk_to_dict(chunk) for chunk in self.chunks]
+            with open(output_path, "w") as f:
+                json.dump(chunks_data, f, indent=2)
+        self._save_manifest()
+
+    def _save_manifest(self):
+        if self.manifest_path:
+            with open(self.manifest_path, "w") as f:
+                json.dump({"version": 1, "files": self.manifest}, f)
 
     def load_chunks(self, input_path: str):
-        """Load chunks from JSON file"""
+        """Load chunks from a JSON or JSONL file (use ChunkReader to read lazily)"""
+        if is_jsonl(input_path):
+            with ChunkReader(input_path) as reader:
+                self.chunks = list(reader)
+            return
+
         with open(input_path, "r") as f:
             chunks_data = json.load(f)
 
@@ -378,19 +913,23 @@ class CodeIndexer:
 
 # Usage example
 if __name__ == "__main__":
-    # Initialize indexer with your repo paths
+    # Initialize indexer with your repo paths (workers=0 uses every CPU)
     indexer = CodeIndexer(
         [
             "/Users/chiauhung/Documents/Projects/llm-orchestrator",
             "/Users/chiauhung/Documents/Projects/de-integration-cf",
-        ]
+        ],
+        workers=0,
+        manifest_path="code_chunks.manifest.json",
     )
 
-    # Index all repositories
-    chunks = indexer.index_repositories()
+    # Re-runs only re-index files changed since the saved manifest
+    if os.path.exists("code_chunks.jsonl"):
+        indexer.load_chunks("code_chunks.jsonl")
 
-    # Save to file
-    indexer.save_chunks("code_chunks.json")
+    # Index all repositories, streaming chunks to disk as they are produced
+    count = indexer.index_to_file("code_chunks.jsonl")
 
-    print(f"Created {len(chunks)} chunks")
-    print("Chunk types:", {chunk.type for chunk in chunks})
+    print(f"Created {count} chunks")
+    with ChunkReader("code_chunks.jsonl") as reader:
+        print("Chunk types:", {chunk.type for chunk in reader})
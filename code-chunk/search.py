@@ -0,0 +1,229 @@
+"""
+Search over CodeIndexer output: BM25, vector similarity, or both fused by rank
+
+Usage:
+  python search.py build code_chunks.jsonl code_index/ [--no-embed] [--dim 384] [--dtype float16]
+  python search.py query code_index/ "parse config file" [-k 10] [--mode hybrid]
+                   [--repo NAME] [--type function] [--file-type .py]
+"""
+
+import argparse
+import os
+import time
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from chunk_io import ChunkReader, is_jsonl
+from chunk_store import DTYPES, ChunkStore
+from chunks import CodeChunk
+from embeddings import Embedder, HashingEmbedder, chunk_text, embed_store
+from lexical_index import BM25Index
+from vector_index import VectorSearch
+
+MODES = ("lexical", "vector", "hybrid")
+RRF_K = 60  # reciprocal rank fusion constant; damps the weight of the very top ranks
+HYBRID_DEPTH = 50  # candidates taken from each ranking before fusing
+
+
+def reciprocal_rank_fusion(
+    rankings: List[np.ndarray], k: int, rrf_k: int = RRF_K
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Top-k (rows, fused scores) where each ranking adds 1 / (rrf_k + rank)"""
+    fused = {}
+    for ranking in rankings:
+        for rank, row in enumerate(ranking.tolist()):
+            fused[row] = fused.get(row, 0.0) + 1.0 / (rrf_k + rank + 1)
+    best = sorted(fused.items(), key=lambda item: -item[1])[:k]
+    return (
+        np.array([row for row, _ in best], dtype=np.int64),
+        np.array([score for _, score in best], dtype=np.float32),
+    )
+
+
+def build_index(
+    chunks: Iterable[CodeChunk],
+    path: str,
+    embed: bool = True,
+    dim: int = 384,
+    dtype: str = "float32",
+) -> ChunkStore:
+    """Write a chunk store, its BM25 index and (with embed) hashed TF-IDF embeddings"""
+    store = ChunkStore(path, dtype=dtype)
+    if len(store):
+        raise ValueError(f"{path} already holds an index")
+    store.add(chunks)
+    BM25Index.build(store, os.path.join(path, "bm25")).close()
+
+    if embed:
+        embedder = HashingEmbedder(dim).fit(chunk_text(chunk) for chunk in store)
+        embed_store(store, embedder)
+        embedder.save(os.path.join(path, "embedder.npz"))
+        # Trains and saves the IVF index now (at AUTO_IVF_ROWS chunks and up), not per open
+        VectorSearch(store, embedder, ivf_path=os.path.join(path, "ivf.npz"))
+    return store
+
+
+class CodeSearch:
+    """Lexical, vector or hybrid search over an index directory written by build_index"""
+
+    def __init__(
+        self,
+        path: str,
+        embedder: Optional[Embedder] = None,
+        index: str = "auto",
+        nprobe: int = 8,
+    ):
+        """
+        embedder defaults to the HashingEmbedder saved by build_index, if any.
+        An IVF index is loaded from ivf.npz, or trained once and saved there.
+        """
+        self.store = ChunkStore(path)
+        self.bm25 = BM25Index(os.path.join(path, "bm25"))
+        self.vectors: Optional[VectorSearch] = None
+
+        embedder_path = os.path.join(path, "embedder.npz")
+        if embedder is None and os.path.exists(embedder_path):
+            embedder = HashingEmbedder.load(embedder_path)
+        if embedder is not None and self.store.dim is not None:
+            self.vectors = VectorSearch(
+                self.store, embedder, index, nprobe, os.path.join(path, "ivf.npz")
+            )
+
+    def search(
+        self,
+        query: str,
+        k: int = 10,
+        mode: str = "hybrid",
+        repo_name: Optional[str] = None,
+        chunk_type: Optional[str] = None,
+        file_type: Optional[str] = None,
+    ) -> List[Tuple[float, CodeChunk]]:
+        """
+        (score, chunk) pairs, best first. Hybrid fuses the BM25 and vector rankings
+        by reciprocal rank, and is lexical-only when the index has no embeddings.
+        """
+        if mode not in MODES:
+            raise ValueError(f"Invalid mode {mode!r}. Expected one of {list(MODES)}")
+        if k < 1:
+            raise ValueError("k must be at least 1")
+        if mode == "vector" and self.vectors is None:
+            raise ValueError("This index has no embeddings; use lexical search")
+
+        filters = (repo_name, chunk_type, file_type)
+        allowed = None
+        if any(value is not None for value in filters):
+            allowed = np.zeros(len(self.store), dtype=bool)
+            allowed[self.store.rows(*filters)] = True
+
+        if mode == "lexical" or (mode == "hybrid" and self.vectors is None):
+            rows, scores = self.bm25.search(query, k, allowed)
+        elif mode == "vector":
+            rows, scores = self._vector_rows(query, k, filters)
+        else:
+            depth = max(k, HYBRID_DEPTH)
+            lexical_rows, _ = self.bm25.search(query, depth, allowed)
+            vector_rows, _ = self._vector_rows(query, depth, filters)
+            rows, scores = reciprocal_rank_fusion([lexical_rows, vector_rows], k)
+
+        return list(zip(scores.tolist(), self.store.chunks(rows)))
+
+    def _vector_rows(self, query: str, k: int, filters: tuple):
+        vector = self.vectors.embedder.embed([query])[0]
+        return self.vectors.search_rows(vector, k, *filters)
+
+    def close(self):
+        self.bm25.close()
+        self.store.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def _read_chunks(path: str) -> Iterable[CodeChunk]:
+    if is_jsonl(path):
+        return ChunkReader(path)
+    from main import CodeIndexer
+
+    indexer = CodeIndexer([])
+    indexer.load_chunks(path)
+    return indexer.chunks
+
+
+def _location(chunk: CodeChunk) -> str:
+    metadata = chunk.metadata
+    where = metadata.get("file_path") or metadata.get("directory") or ""
+    if "line_range" in metadata:
+        where += f":{metadata['line_range'][0]}"
+    name = metadata.get("function_name") or metadata.get("class_name") or ""
+    if "parent_class" in metadata:
+        name = f"{metadata['parent_class']}.{name}"
+    location = f"{metadata.get('repo_name', '')}/{where} {name}".strip()
+    if "locations" in metadata:
+        location += f" (+{len(metadata['locations']) - 1} copies)"
+    return location
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Search code chunks")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build = commands.add_parser("build", help="Index a .json/.jsonl chunk file")
+    build.add_argument(
+        "chunks", help="Output of CodeIndexer (save_chunks / index_to_file)"
+    )
+    build.add_argument("index", help="Index directory to create")
+    build.add_argument("--no-embed", action="store_true", help="BM25 only")
+    build.add_argument("--dim", type=int, default=384)
+    build.add_argument("--dtype", choices=DTYPES, default="float32")
+
+    query = commands.add_parser("query", help="Search an index directory")
+    query.add_argument("index")
+    query.add_argument("text")
+    query.add_argument("-k", type=int, default=10)
+    query.add_argument("--mode", choices=MODES, default="hybrid")
+    query.add_argument("--repo")
+    query.add_argument("--type", dest="chunk_type")
+    query.add_argument("--file-type", help="e.g. .py")
+    query.add_argument("--show", action="store_true", help="Print chunk contents")
+
+    args = parser.parse_args()
+    if args.command == "build":
+        started = time.perf_counter()
+        store = build_index(
+            _read_chunks(args.chunks),
+            args.index,
+            embed=not args.no_embed,
+            dim=args.dim,
+            dtype=args.dtype,
+        )
+        print(
+            f"Indexed {store.location_count()} chunks ({len(store)} distinct) into "
+            f"{args.index} in {time.perf_counter() - started:.1f}s"
+        )
+        store.close()
+        return
+
+    with CodeSearch(args.index) as search:
+        started = time.perf_counter()
+        results = search.search(
+            args.text,
+            k=args.k,
+            mode=args.mode,
+            repo_name=args.repo,
+            chunk_type=args.chunk_type,
+            file_type=args.file_type,
+        )
+        elapsed = time.perf_counter() - started
+        for score, chunk in results:
+            print(f"{score:8.4f}  {chunk.type:<18} {_location(chunk)}")
+            if args.show:
+                print("    " + chunk.content[:500].replace("\n", "\n    ") + "\n")
+        print(f"{len(results)} results in {elapsed * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,742 @@
+"""
+Function/class-level structure of brace-delimited languages (JavaScript/TypeScript,
+Java, Go, Rust, C/C++). Uses tree-sitter when a grammar package is installed
+(tree-sitter-languages or tree-sitter-language-pack), otherwise a single-pass scanner
+that tracks brace depth while skipping strings and comments.
+"""
+
+import bisect
+import functools
+import re
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+LANGUAGES = {
+    ".js": "javascript",
+    ".jsx": "javascript",
+    ".ts": "typescript",
+    ".tsx": "tsx",
+    ".java": "java",
+    ".go": "go",
+    ".rs": "rust",
+    ".c": "c",
+    ".h": "cpp",
+    ".cpp": "cpp",
+    ".cc": "cpp",
+    ".hpp": "cpp",
+}
+_JS = ("javascript", "typescript", "tsx")
+
+
+@dataclass(slots=True)
+class Definition:
+    """A function or class; lines are 0-based, end exclusive, leading comments included"""
+
+    kind: str  # "function" or "class"
+    name: str
+    start_line: int
+    end_line: int
+    parent: Optional[str] = None  # enclosing class of a method
+    args: List[str] = field(default_factory=list)
+    calls: List[str] = field(default_factory=list)
+    decorators: List[str] = field(default_factory=list)
+    is_async: bool = False
+    methods: List[str] = field(default_factory=list)
+    base_classes: List[str] = field(default_factory=list)
+
+
+def find_definitions(
+    content: str, language: str, line_offsets: List[int]
+) -> Optional[List[Definition]]:
+    """
+    Definitions in source order: top-level functions and classes, and the methods (and
+    nested classes) of classes. None when the file can't be parsed (unbalanced braces).
+    line_offsets: start offset of every line of content.
+    """
+    parser = _tree_sitter_parser(language)
+    if parser is not None:
+        return _TreeSitterDefinitions(content, language, parser).definitions
+    return _scan_definitions(content, language, line_offsets)
+
+
+# --- Lexing -----------------------------------------------------------------------
+
+_COMMENTS_AND_STRINGS = r'//[^\n]*|/\*.*?\*/|"(?:\\.|[^"\\\n])*"'
+_QUOTES = {
+    "javascript": r"'(?:\\.|[^'\\\n])*'|`(?:\\.|[^`\\])*`",
+    "go": r"'(?:\\.|[^'\\\n])+'|`[^`]*`",
+    # a char literal is one (escaped) character, so lifetimes like 'a are left alone
+    "rust": r"'(?:\\[^']+|[^'\\\n])'",
+}
+# a regex literal can only start where an expression can: after an operator or opening
+# punctuation, after `return`, or at the start of a line; only the literal is blanked
+_JS_REGEX = (
+    r"(?:[(,=:\[!&|?{};]|(?m:^)|(?<![\w$.])return)\s*"
+    r"(?P<regex>/(?![/*])(?:\\.|\[(?:\\.|[^\]\\\n])*\]|[^/\\\n\[])+/[A-Za-z]*)"
+)
+_NOT_NEWLINE = re.compile(r"[^\n]")
+
+
+@functools.lru_cache(maxsize=None)
+def _lexer(language: str) -> re.Pattern:
+    quotes = _QUOTES.get(
+        "javascript" if language in _JS else language, r"'(?:\\.|[^'\\\n])+'"
+    )
+    if language in _JS:
+        quotes += f"|{_JS_REGEX}"
+    return re.compile(f"{_COMMENTS_AND_STRINGS}|{quotes}", re.S)
+
+
+def _mask(text: str, language: str) -> str:
+    """text with comments, string and regex literals blanked out, offsets and newlines kept"""
+    pieces, last = [], 0
+    for match in _lexer(language).finditer(text):
+        # a regex literal match includes the punctuation before it, which is kept
+        start, end = match.span(match.lastgroup or 0)
+        pieces.append(text[last:start])
+        pieces.append(_NOT_NEWLINE.sub(" ", text[start:end]))
+        last = end
+    pieces.append(text[last:])
+    return "".join(pieces)
+
+
+# --- Header classification, shared by both parsers --------------------------------
+
+_DECORATOR = re.compile(
+    r"\s*(?:@([\w.]+(?:\s*\((?:[^()]|\([^()]*\))*\))?)|#!?\[((?:[^\[\]]|\[[^\]]*\])*)\])"
+)
+_MODIFIERS = (
+    r"(?:(?:export|default|declare|public|private|protected|internal|abstract|final"
+    r"|static|sealed|partial|inline|pub(?:\s*\([^)]*\))?|unsafe|template\s*<.*?>"
+    r"|typedef)\s+)*"
+)
+_NAMESPACE = re.compile(
+    r"^(?:export\s+)?(?:inline\s+)?(?:namespace|module|declare\s+module|extern|mod)\b"
+)
+_CLASS = re.compile(
+    _MODIFIERS
+    + r"(class|interface|struct|enum(?:\s+(?:class|struct))?|record|union|trait)"
+    r"\s+([A-Za-z_$][\w$]*)(.*)$"
+)
+_GO_TYPE = re.compile(r"^type\s+(\w+)(?:\[.*?\])?\s+(struct|interface)$")
+_RUST_IMPL = re.compile(
+    _MODIFIERS + r"impl\b\s*(?:<.*?>)?\s*(?:([\w:<>, &']+?)\s+for\s+)?([\w:<>, &']+?)"
+    r"(?:\s+where\b.*)?$"
+)
+_GO_FUNC = re.compile(r"^func\s*(?:\(([^)]*)\))?\s*(\w+)\s*(?:\[.*?\])?\s*\(")
+_RUST_FN = re.compile(
+    _MODIFIERS + r"(?:(?:const|async|unsafe|extern(?:\s+\S+)?)\s+)*fn\s+(\w+)"
+)
+_ARROW = re.compile(
+    r"([A-Za-z_$][\w$]*)\s*(?::[^=]*)?=\s*(async\s*)?(\(.*\)|[A-Za-z_$][\w$]*)"
+    r"\s*(?::[^=]*)?=>$"
+)
+_FUNCTION_EXPRESSION = re.compile(
+    r"([A-Za-z_$][\w$]*)\s*[:=]\s*(?:async\s+)?function\b\s*\*?\s*[\w$]*\s*\("
+)
+_JS_FUNCTION = re.compile(r"\bfunction\b\s*\*?\s*([\w$]*)\s*(?:<.*?>)?\s*\(")
+_CALLABLE = re.compile(r"([A-Za-z_$~][\w$]*(?:::~?[A-Za-z_]\w*)*)\s*(?:<[^()]*>)?\s*$")
+# What may follow a function's parameter list before its body; braces only as (nested)
+# object types or member initializers
+_SIGNATURE_END = re.compile(
+    r"^\s*(?:(?:const|noexcept|override|final|mutable|volatile|&&?)\s*)*"
+    r"(?:(?:->|:)\s*(?:[^{}=;]|\{(?:[^{}]|\{[^{}]*\})*\})*"
+    r"|throws\s+[\w.,\s<>]+|where\s[^{]*)?$"
+)
+_KEYWORDS = {
+    "if",
+    "else",
+    "for",
+    "foreach",
+    "while",
+    "do",
+    "switch",
+    "case",
+    "default",
+    "try",
+    "catch",
+    "finally",
+    "return",
+    "throw",
+    "new",
+    "delete",
+    "sizeof",
+    "typeof",
+    "instanceof",
+    "await",
+    "yield",
+    "function",
+    "match",
+    "loop",
+    "select",
+    "defer",
+    "go",
+    "synchronized",
+    "using",
+    "with",
+    "operator",
+    "decltype",
+    "alignof",
+    "static_assert",
+}
+_CALL = re.compile(r"(?<![\w$.])(?<!->)(?<!::)([A-Za-z_$][\w$]*)!?\s*\(")
+_DEFINED_NAME = re.compile(r"\b(?:function|fn|func)\s+[\w$]+")
+_ASYNC = re.compile(r"\basync\b")
+_IDENTIFIER = re.compile(r"[A-Za-z_$][\w$]*")
+_NON_NAMES = {"void", "const", "mut", "self", "this", "final", "struct", "unsigned"}
+
+
+def _strip_decorators(header: str, raw: str) -> tuple:
+    """(header without leading decorators/attributes, decorator texts from raw)"""
+    decorators, pos = [], 0
+    while True:
+        match = _DECORATOR.match(header, pos)
+        if match is None or match.end() == pos:
+            break
+        group = 1 if match.group(1) is not None else 2
+        decorators.append(raw[match.start(group) : match.end(group)].strip())
+        pos = match.end()
+    return header[pos:], decorators
+
+
+def _matching_paren(text: str, open_pos: int) -> int:
+    """Index of the ")" closing text[open_pos], or -1"""
+    depth = 0
+    for i in range(open_pos, len(text)):
+        if text[i] == "(":
+            depth += 1
+        elif text[i] == ")":
+            depth -= 1
+            if depth == 0:
+                return i
+    return -1
+
+
+def _split_top_level(text: str) -> List[str]:
+    parts, depth, start = [], 0, 0
+    for i, char in enumerate(text):
+        if char in "([{<":
+            depth += 1
+        elif char in ")]}>" and depth:
+            depth -= 1
+        elif char == "," and depth == 0:
+            parts.append(text[start:i])
+            start = i + 1
+    parts.append(text[start:])
+    return [part.strip() for part in parts if part.strip()]
+
+
+def _parameter_names(params: str, language: str) -> List[str]:
+    names = []
+    for param in _split_top_level(params):
+        param = re.split(r"(?<![=!<>])=(?!=)", param, maxsplit=1)[0]  # default value
+        if language == "rust":
+            param = re.sub(r"'\w+", "", param)  # lifetimes
+        if language != "go":
+            param = re.split(r"(?<!:):(?!:)", param, maxsplit=1)[0]  # name: Type
+        identifiers = [
+            word for word in _IDENTIFIER.findall(param) if word not in _NON_NAMES
+        ]
+        if language == "go" and identifiers:
+            names.append(identifiers[0])  # name Type
+        elif identifiers:
+            names.append(identifiers[-1])  # Type name (Java, C/C++) or bare name
+        elif re.search(r"\bself\b", param):
+            names.append("self")  # Rust receivers
+    return names
+
+
+def _calls(body: str) -> List[str]:
+    body = _DEFINED_NAME.sub(" ", body)
+    return sorted(
+        {name for name in _CALL.findall(body) if name not in _KEYWORDS}
+        - {"self", "this"}
+    )
+
+
+def _base_classes(rest: str) -> List[str]:
+    """Bases named after a class name: extends/implements lists, or C++ ": public A" """
+    rest = rest.strip()
+    if rest.startswith("<"):  # the class's own type parameters
+        depth = 0
+        for i, char in enumerate(rest):
+            depth += {"<": 1, ">": -1}.get(char, 0)
+            if depth == 0:
+                rest = rest[i + 1 :]
+                break
+    match = re.search(r"(?:\bextends\b|\bimplements\b|:)(.*)$", rest)
+    if match is None:
+        return []
+    bases = []
+    for base in _split_top_level(
+        re.sub(r"\b(?:extends|implements)\b", ",", match.group(1))
+    ):
+        base = re.sub(r"^(?:(?:public|protected|private|virtual)\s+)+", "", base)
+        if base:
+            bases.append(base)
+    return bases
+
+
+def _classify(header: str, raw_header: str, language: str) -> Optional[Definition]:
+    """
+    The definition a block header introduces, without its line range, or None for
+    control flow, initializers and anything else that isn't a function or class.
+    Namespaces/modules come back as kind "namespace" (their contents are top-level).
+    """
+    collapsed, decorators = _strip_decorators(header, raw_header)
+    collapsed = " ".join(collapsed.split())
+    collapsed = collapsed.lstrip(");,] ")
+    collapsed = collapsed.strip()
+    if not collapsed:
+        return None
+    is_async = bool(_ASYNC.search(collapsed))
+
+    if _NAMESPACE.match(collapsed):
+        return Definition("namespace", "", 0, 0)
+
+    if language == "go":
+        match = _GO_TYPE.match(collapsed)
+        if match:
+            return Definition("class", match.group(1), 0, 0, decorators=decorators)
+        match = _GO_FUNC.match(collapsed)
+        if not match:
+            return None
+        params = collapsed[match.end() - 1 :]
+        close = _matching_paren(params, 0)
+        if close < 0:
+            return None
+        receiver = _IDENTIFIER.findall(re.sub(r"\[.*?\]", "", match.group(1) or ""))
+        return Definition(
+            "function",
+            match.group(2),
+            0,
+            0,
+            parent=receiver[-1] if receiver else None,
+            args=_parameter_names(params[1:close], language),
+            decorators=decorators,
+        )
+
+    if language == "rust":
+        match = _RUST_IMPL.match(collapsed)
+        if match:
+            trait, target = match.group(1), match.group(2)
+            return Definition(
+                "class",
+                re.sub(r"<.*", "", target).strip(),
+                0,
+                0,
+                decorators=decorators,
+                base_classes=[trait.strip()] if trait else [],
+            )
+        match = _RUST_FN.match(collapsed)
+        if match:
+            paren = collapsed.find("(", match.end())
+            close = _matching_paren(collapsed, paren) if paren >= 0 else -1
+            if close < 0:
+                return None
+            return Definition(
+                "function",
+                match.group(1),
+                0,
+                0,
+                args=_parameter_names(collapsed[paren + 1 : close], language),
+                decorators=decorators,
+                is_async=is_async,
+            )
+
+    function = None
+    if language in _JS:
+        match = _ARROW.search(collapsed) if collapsed.endswith("=>") else None
+        if match:
+            params = match.group(3)
+            if params.startswith("("):
+                params = params[1 : _matching_paren(params, 0)]
+            return Definition(
+                "function",
+                match.group(1),
+                0,
+                0,
+                args=_parameter_names(params, language),
+                decorators=decorators,
+                is_async=is_async,
+            )
+        match = None
+        if "function" in collapsed:
+            match = _FUNCTION_EXPRESSION.search(collapsed) or _JS_FUNCTION.search(
+                collapsed
+            )
+        if match:
+            paren = match.end() - 1
+            function = (match.group(1) or "default", paren)
+
+    match = _CLASS.match(collapsed)
+    if match and not (language in ("c", "cpp") and _function_signature(collapsed)):
+        if language in ("c", "cpp") and collapsed.startswith("typedef"):
+            return None  # anonymous or aliased; the alias follows the body
+        name = match.group(2)
+        if name in ("extends", "implements"):  # export default class extends Base
+            name = "default"
+        return Definition(
+            "class",
+            name,
+            0,
+            0,
+            decorators=decorators,
+            base_classes=_base_classes(match.group(3)),
+        )
+
+    if function is None:
+        function = _function_signature(collapsed)
+        if function is None:
+            return None
+    name, paren = function
+    close = _matching_paren(collapsed, paren)
+    if close < 0:
+        return None
+    return Definition(
+        "function",
+        name,
+        0,
+        0,
+        args=_parameter_names(collapsed[paren + 1 : close], language),
+        decorators=decorators,
+        is_async=is_async,
+    )
+
+
+def _function_signature(header: str) -> Optional[tuple]:
+    """(name, offset of the parameter list's "(") when header looks like name(...) ..."""
+    paren = header.find("(")
+    match = _CALLABLE.search(header, 0, paren) if paren > 0 else None
+    if match is None:
+        return None
+    name = match.group(1)
+    prefix = header[: match.start()]
+    if (
+        name.split("::")[-1] in _KEYWORDS
+        or re.search(r"[=()]", prefix)
+        or re.search(r"\bnew\s*$", prefix)
+    ):
+        return None
+    close = _matching_paren(header, paren)
+    if close < 0 or not _SIGNATURE_END.match(header[close + 1 :]):
+        return None
+    return name, paren
+
+
+# --- Brace scanner ----------------------------------------------------------------
+
+
+class _Block:
+    __slots__ = ("header_start", "open", "close", "children")
+
+    def __init__(self, header_start: int, open_pos: int):
+        self.header_start = header_start
+        self.open = open_pos
+        self.close = -1
+        self.children: List["_Block"] = []
+
+
+_BRACES = re.compile(r"[{};(),]")
+_BLANK_LINE = re.compile(r"\n[ \t]*\n")
+# Go statements need no terminator, so a declaration may directly follow one
+_GO_DECLARATION = re.compile(r"\n(?=(?:func|type|var|const|import)\b)")
+_PREPROCESSOR = re.compile(r"^[ \t]*#[ \t]*[a-z]+\b.*\n", re.M)
+_ACCESS_LABEL = re.compile(r"(?:public|private|protected)[ \t]*:(?!:)\s*")
+# Header text after which a "{" opens a type or initializer rather than the body: a TS
+# return type that is (or starts) an object type, a C++ constructor's member initializer
+_TYPE_BRACE = {
+    "typescript": re.compile(r"\)\s*:(?:[^;=]*[<|&,(\[])?\s*$"),
+    "cpp": re.compile(
+        r"\)\s*(?:noexcept\s*)?:\s*(?:[\w:<>]+\s*(?:\([^()]*\)|\{[^{}]*\})\s*,\s*)*"
+        r"[\w:<>]+\s*$"
+    ),
+}
+_TYPE_BRACE["tsx"] = _TYPE_BRACE["typescript"]
+# A "{" inside parentheses is a body (of a callback, lambda or anonymous class) after these
+_BODY_AFTER = re.compile(r"(?:\)|=>|->)\s*$")
+
+
+class _Group:
+    """An open ( or a { that belongs to a header; start is where a header inside it begins"""
+
+    __slots__ = ("char", "start")
+
+    def __init__(self, char: str, start: int):
+        self.char = char
+        self.start = start
+
+
+def _scan_blocks(masked: str, language: str) -> Optional[List["_Block"]]:
+    """
+    Tree of {} blocks; a block's header runs from the previous ; { or } to its {.
+    Braces inside parentheses (destructuring, object types, default values) and those
+    of a return type or member initializer are part of a header, not blocks.
+    """
+    roots: List[_Block] = []
+    stack: list = []  # _Block and _Group, innermost last
+    statement_start = 0
+    type_brace = _TYPE_BRACE.get(language)
+    for match in _BRACES.finditer(masked):
+        char, pos = match.group(), match.start()
+        group = stack[-1] if stack and isinstance(stack[-1], _Group) else None
+        if char == "(":
+            # A statement opening with "(" (an IIFE) keeps its header, comments included
+            start = group.start if group is not None else statement_start
+            if masked[start:pos].strip("( \t\n"):
+                start = pos + 1
+            stack.append(_Group("(", start))
+        elif char == ")":
+            if group is not None and group.char == "(":
+                stack.pop()
+        elif char == ",":
+            if group is not None:
+                group.start = pos + 1
+        elif char == "{":
+            if group is not None:
+                if _BODY_AFTER.search(masked, group.start, pos):
+                    stack.append(_Block(group.start, pos))
+                else:
+                    stack.append(_Group("{", pos + 1))
+            elif type_brace and type_brace.search(masked, statement_start, pos):
+                stack.append(_Group("{", pos + 1))
+            else:
+                stack.append(_Block(statement_start, pos))
+                statement_start = pos + 1
+        elif char == "}":
+            # Unclosed parentheses (e.g. in JSX text) end with the braces around them
+            while group is not None and group.char == "(":
+                stack.pop()
+                group = stack[-1] if stack and isinstance(stack[-1], _Group) else None
+            if not stack:
+                return None
+            entry = stack.pop()
+            if isinstance(entry, _Block):
+                entry.close = pos
+                parent = next(
+                    (e for e in reversed(stack) if isinstance(e, _Block)), None
+                )
+                (parent.children if parent else roots).append(entry)
+                if not stack or isinstance(stack[-1], _Block):
+                    statement_start = pos + 1
+                else:
+                    stack[-1].start = pos + 1
+        elif group is None:  # ";"
+            statement_start = pos + 1
+    if any(isinstance(entry, _Block) or entry.char == "{" for entry in stack):
+        return None
+    return roots
+
+
+def _scan_definitions(
+    content: str, language: str, line_offsets: List[int]
+) -> Optional[List[Definition]]:
+    masked = _mask(content, language)
+    roots = _scan_blocks(masked, language)
+    if roots is None:
+        return None
+
+    def line_of(pos: int) -> int:
+        return bisect.bisect_right(line_offsets, pos) - 1
+
+    definitions: List[Definition] = []
+
+    def visit(blocks: List[_Block], parent: Optional[Definition]):
+        for block in blocks:
+            # A header starts after the last blank line before its brace, so
+            # statements without terminators (Go, JavaScript) don't run into it
+            start = block.header_start
+            blank = None
+            for blank in _BLANK_LINE.finditer(content, start, block.open):
+                pass
+            if blank is not None:
+                start = blank.end() - 1
+            if language == "go":
+                declaration = None
+                for declaration in _GO_DECLARATION.finditer(masked, start, block.open):
+                    pass
+                if declaration is not None:
+                    start = declaration.end()
+                    # with the comment lines right above it (blank once masked)
+                    while start > block.header_start:
+                        line = masked.rfind("\n", block.header_start, start - 1) + 1
+                        if (
+                            masked[line : start - 1].strip()
+                            or not content[line:start].strip()
+                        ):
+                            break
+                        start = max(line, block.header_start)
+            if language in ("c", "cpp"):
+                for directive in _PREPROCESSOR.finditer(masked, start, block.open):
+                    start = directive.end()
+            while start < block.open and content[start].isspace():
+                start += 1
+            if language == "cpp":
+                label = _ACCESS_LABEL.match(masked, start, block.open)
+                start = label.end() if label else start
+
+            definition = _classify(
+                masked[start : block.open], content[start : block.open], language
+            )
+            if definition is None:
+                continue
+            if definition.kind == "namespace":
+                visit(block.children, parent)
+                continue
+            definition.start_line = line_of(start)
+            definition.end_line = line_of(block.close) + 1
+            if parent is not None:
+                definition.parent = parent.name
+                if definition.kind == "function":
+                    parent.methods.append(definition.name)
+            definitions.append(definition)
+            if definition.kind == "function":
+                definition.calls = _calls(masked[block.open + 1 : block.close])
+            else:
+                visit(block.children, definition)
+
+    visit(roots, None)
+    definitions.sort(key=lambda definition: definition.start_line)
+    return definitions
+
+
+# --- tree-sitter ------------------------------------------------------------------
+
+
+@functools.lru_cache(maxsize=None)
+def _tree_sitter_parser(language: str):
+    """A parser from a locally installed grammar package, or None"""
+    try:
+        from tree_sitter_languages import get_parser
+    except ImportError:
+        try:
+            from tree_sitter_language_pack import get_parser
+        except ImportError:
+            return None
+    try:
+        return get_parser(language)
+    except Exception:  # grammar missing from the package, or not downloadable
+        return None
+
+
+_TS_FUNCTIONS = {
+    "function_declaration",
+    "generator_function_declaration",
+    "method_definition",
+    "method_declaration",
+    "constructor_declaration",
+    "function_definition",
+    "function_item",
+}
+_TS_CLASSES = {
+    "class_declaration",
+    "abstract_class_declaration",
+    "interface_declaration",
+    "enum_declaration",
+    "record_declaration",
+    "class_specifier",
+    "struct_specifier",
+    "union_specifier",
+    "struct_item",
+    "enum_item",
+    "union_item",
+    "trait_item",
+    "impl_item",
+    "type_spec",
+}
+_TS_FUNCTION_VALUES = {"arrow_function", "function", "function_expression"}
+_TS_LEADING = ("comment", "line_comment", "block_comment", "attribute_item")
+
+
+class _TreeSitterDefinitions:
+    """Definitions from a tree-sitter syntax tree; metadata comes from the same
+    header/body text helpers as the scanner"""
+
+    def __init__(self, content: str, language: str, parser):
+        self.source = content.encode("utf-8")
+        self.language = language
+        self.definitions: List[Definition] = []
+        self._visit(parser.parse(self.source).root_node, None)
+        self.definitions.sort(key=lambda definition: definition.start_line)
+
+    def _text(self, start: int, end: int) -> str:
+        return self.source[start:end].decode("utf-8", errors="replace")
+
+    def _visit(self, node, parent: Optional[Definition]):
+        for child in node.named_children:
+            definition = self._definition(child)
+            if definition is None:
+                self._visit(child, parent)
+                continue
+            if parent is not None:
+                definition.parent = parent.name
+                if definition.kind == "function":
+                    parent.methods.append(definition.name)
+            self.definitions.append(definition)
+            if definition.kind == "class":
+                body = self._body(child)
+                if body is not None:
+                    self._visit(body, definition)
+
+    def _body(self, node):
+        if node.type == "type_spec":
+            return node.child_by_field_name("type")
+        return node.child_by_field_name("body")
+
+    def _definition(self, node) -> Optional[Definition]:
+        target = node
+        if node.type == "variable_declarator":
+            value = node.child_by_field_name("value")
+            if value is None or value.type not in _TS_FUNCTION_VALUES:
+                return None
+            target = value
+        elif node.type == "type_spec":
+            kind = node.child_by_field_name("type")
+            if kind is None or kind.type not in ("struct_type", "interface_type"):
+                return None
+        elif node.type not in _TS_FUNCTIONS and node.type not in _TS_CLASSES:
+            return None
+
+        body = self._body(target)
+        if body is None:
+            return None  # a declaration or forward reference, not a definition
+        outer = node.parent if node.type == "variable_declarator" else node
+        start = outer
+        while start.prev_named_sibling is not None and (
+            start.prev_named_sibling.type in _TS_LEADING
+            and start.prev_named_sibling.end_point[0] >= start.start_point[0] - 1
+        ):
+            start = start.prev_named_sibling
+
+        header_raw = self._text(outer.start_byte, body.start_byte)
+        header = _mask(header_raw, self.language)
+        definition = _classify(header, header_raw, self.language)
+        name = self._name(node)
+        if name is None:
+            return None
+        if definition is None or definition.kind == "namespace":
+            # Unusual headers still get a definition, without parsed metadata
+            kind = "class" if node.type in _TS_CLASSES else "function"
+            definition = Definition(kind, name, 0, 0)
+        definition.name = name
+        definition.start_line = start.start_point[0]
+        definition.end_line = outer.end_point[0] + 1
+        if definition.kind == "function":
+            definition.calls = _calls(
+                _mask(self._text(body.start_byte, body.end_byte), self.language)
+            )
+        return definition
+
+    def _name(self, node) -> Optional[str]:
+        if node.type == "impl_item":
+            name = node.child_by_field_name("type")
+        else:
+            name = node.child_by_field_name("name")
+        declarator = node.child_by_field_name("declarator")
+        while name is None and declarator is not None:
+            if declarator.child_by_field_name("declarator") is None:
+                name = declarator
+            declarator = declarator.child_by_field_name("declarator")
+        if name is None:
+            return None
+        return re.sub(r"<.*", "", self._text(name.start_byte, name.end_byte))
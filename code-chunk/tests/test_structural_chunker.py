@@ -0,0 +1,97 @@
+"""
+Definitions found by the brace scanner (the fallback used without tree-sitter)
+"""
+
+import pytest
+
+import structural_chunker
+from main import _line_offsets
+from structural_chunker import find_definitions
+
+
+@pytest.fixture(autouse=True)
+def scanner(monkeypatch):
+    monkeypatch.setattr(structural_chunker, "_tree_sitter_parser", lambda language: None)
+
+
+def definitions(content: str, language: str):
+    found = find_definitions(content, language, _line_offsets(content))
+    return [(d.kind, d.name, d.start_line, d.end_line) for d in found]
+
+
+def test_braces_in_parameters():
+    content = """\
+export function PieChart({ data }: PieChartProps) {
+  const total = data.reduce((sum, item) => sum + item.value, 0)
+  return <div style={{ width: total }}>{total}</div>
+}
+
+function f(opts: { a: string }) {
+  return opts.a
+}
+
+export const useThing = async (a, b = {}) => {
+  await a(b)
+}
+"""
+    assert definitions(content, "tsx") == [
+        ("function", "PieChart", 0, 4),
+        ("function", "f", 5, 8),
+        ("function", "useThing", 9, 12),
+    ]
+
+
+def test_object_return_type_is_not_the_body():
+    content = """\
+export function getMonthDates(monthStr: string): { start: string; end: string } {
+  const [year, month] = monthStr.split('-').map(Number)
+  return { start: `${year}-${month}-01`, end: `${year}-${month}-28` }
+}
+"""
+    assert definitions(content, "typescript") == [("function", "getMonthDates", 0, 4)]
+
+
+def test_regex_literals():
+    content = """\
+const re = /[{]/g;
+
+function isOpen(c) {
+  return /\\{/.test(c) || /["'`]/.test(c);
+}
+"""
+    assert definitions(content, "javascript") == [("function", "isOpen", 2, 5)]
+
+
+def test_cpp_brace_member_initializers():
+    content = """\
+A::A(int y) : v_{y} {
+  init();
+}
+
+B::B() : a_{1}, b_(2), c_{3} {
+  go();
+}
+"""
+    assert definitions(content, "cpp") == [
+        ("function", "A::A", 0, 3),
+        ("function", "B::B", 4, 7),
+    ]
+
+
+def test_go_declarations_after_one_line_statements():
+    content = """\
+package main
+import "fmt"
+type S struct {
+\tA int
+}
+var x = 1
+// F prints x
+func F() {
+\tfmt.Println(x)
+}
+"""
+    assert definitions(content, "go") == [
+        ("class", "S", 2, 5),
+        ("function", "F", 6, 10),
+    ]
@@ -0,0 +1,72 @@
+"""
+Code-aware tokenization shared by the hashing embedder, the lexical index and the
+chunkers. Identifiers are kept whole and also split on snake_case and camelCase
+boundaries, so "parseHTTPResponse" matches queries for "parse", "http" or "response"
+"""
+
+import re
+from typing import List, Optional, Sequence, Tuple
+
+_WORD = re.compile(r"[A-Za-z_][A-Za-z0-9_]*|[0-9]+")
+_MODEL_TOKEN = re.compile(r"\w+|[^\w\s]")
+_PART = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|[0-9]+")
+
+
+def split_identifier(identifier: str) -> List[str]:
+    """Lowercased parts of a snake_case / camelCase / PascalCase identifier"""
+    return [part.lower() for part in _PART.findall(identifier)]
+
+
+def code_tokens(text: str) -> List[str]:
+    """Lowercased identifiers of the text, each followed by its parts if it has several"""
+    tokens = []
+    for word in _WORD.findall(text):
+        tokens.append(word.lower())
+        parts = split_identifier(word)
+        if len(parts) > 1:
+            tokens.extend(parts)
+    return tokens
+
+
+def count_tokens(text: str) -> int:
+    """Approximate embedding-model tokens: words, numbers and punctuation marks"""
+    return len(_MODEL_TOKEN.findall(text))
+
+
+def budget_windows(
+    line_tokens: Sequence[int],
+    max_tokens: int,
+    overlap_tokens: int = 0,
+    breaks: Optional[Sequence[bool]] = None,
+) -> List[Tuple[int, int]]:
+    """
+    Split lines into [start, end) windows of at most max_tokens each (a longer single
+    line is a window of its own). A window ends before a line where breaks is True
+    when there is one, and the next window repeats up to overlap_tokens of its end
+    (from a break as well).
+    """
+    windows = []
+    start, n = 0, len(line_tokens)
+    while start < n:
+        end, total, last_break = start, 0, None
+        while end < n and (end == start or total + line_tokens[end] <= max_tokens):
+            total += line_tokens[end]
+            end += 1
+            if end < n and (breaks is None or breaks[end]):
+                last_break = end
+        if end < n and last_break is not None:
+            end = last_break
+        windows.append((start, end))
+        if end == n:
+            break
+        next_start, carried = end, 0
+        while (
+            next_start - 1 > start
+            and carried + line_tokens[next_start - 1] <= overlap_tokens
+        ):
+            next_start -= 1
+            carried += line_tokens[next_start]
+        while breaks is not None and next_start < end and not breaks[next_start]:
+            next_start += 1  # the overlap starts at a boundary too
+        start = next_start
+    return windows
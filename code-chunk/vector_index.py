@@ -0,0 +1,260 @@
+"""
+Vector similarity search over a ChunkStore's embeddings
+BruteForceIndex scores every candidate row (exact); IVFIndex clusters the rows with
+k-means and only scores the lists closest to the query (approximate, far fewer rows
+touched on large corpora). Embeddings are unit length, so dot product is cosine similarity.
+"""
+
+import math
+import os
+from typing import List, Optional, Tuple, Union
+
+import numpy as np
+
+from chunk_store import ChunkStore
+from chunks import CodeChunk
+from embeddings import Embedder
+
+BLOCK_ROWS = 65536
+AUTO_IVF_ROWS = 100_000  # "auto" switches from brute force to IVF at this many chunks
+INDEX_TYPES = ("auto", "brute", "ivf")
+
+
+def _top_k(
+    rows: np.ndarray, scores: np.ndarray, k: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """The k best (rows, scores), best first"""
+    if len(scores) > k:
+        best = np.argpartition(-scores, k - 1)[:k]
+        rows, scores = rows[best], scores[best]
+    order = np.argsort(-scores, kind="stable")
+    return rows[order], scores[order]
+
+
+class BruteForceIndex:
+    """Exact search: one matrix-vector product per block of rows"""
+
+    def __init__(self, store: ChunkStore):
+        self.store = store
+
+    def search(
+        self, query: np.ndarray, k: int, rows: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        best_rows = np.zeros(0, dtype=np.int64)
+        best_scores = np.zeros(0, dtype=np.float32)
+        # Blocks keep float16/int8 stores from being expanded to float32 all at once
+        for start in range(0, len(rows), BLOCK_ROWS):
+            block = rows[start : start + BLOCK_ROWS]
+            if block[-1] - block[0] + 1 == len(block):
+                vectors = self.store.vectors(slice(int(block[0]), int(block[-1]) + 1))
+            else:
+                vectors = self.store.vectors(block)
+            block_rows, block_scores = _top_k(block, vectors @ query, k)
+            best_rows, best_scores = _top_k(
+                np.concatenate([best_rows, block_rows]),
+                np.concatenate([best_scores, block_scores]),
+                k,
+            )
+        return best_rows, best_scores
+
+
+class IVFIndex:
+    """
+    Inverted-file index: spherical k-means centroids trained on a sample of rows, and
+    every row filed under its nearest centroid. A search scores the nprobe closest lists.
+    """
+
+    def __init__(self, store: ChunkStore, nlist: Optional[int] = None, nprobe: int = 8):
+        self.store = store
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.centroids: Optional[np.ndarray] = None
+        self.order: Optional[np.ndarray] = None  # rows grouped by list
+        self.offsets: Optional[np.ndarray] = (
+            None  # list i is order[offsets[i]:offsets[i + 1]]
+        )
+
+    def build(
+        self,
+        rows: np.ndarray,
+        iterations: int = 10,
+        sample_size: int = 50_000,
+        seed: int = 0,
+    ) -> "IVFIndex":
+        if len(rows) == 0:
+            raise ValueError("No embedded chunks to index")
+        rng = np.random.default_rng(seed)
+        nlist = min(self.nlist or max(1, int(math.sqrt(len(rows)))), len(rows))
+
+        sample = np.sort(
+            rng.choice(rows, min(len(rows), max(sample_size, nlist)), replace=False)
+        )
+        vectors = self.store.vectors(sample)
+        centroids = vectors[rng.choice(len(vectors), nlist, replace=False)].copy()
+        for _ in range(iterations):
+            assignment = np.argmax(vectors @ centroids.T, axis=1)
+            counts = np.bincount(assignment, minlength=nlist)
+            by_list = vectors[np.argsort(assignment, kind="stable")]
+            filled = np.flatnonzero(counts)
+            starts = np.concatenate([[0], np.cumsum(counts)[:-1]])[filled]
+            centroids[filled] = np.add.reduceat(by_list, starts, axis=0)
+            # Empty lists restart from random sample points
+            empty = np.flatnonzero(counts == 0)
+            centroids[empty] = vectors[rng.choice(len(vectors), len(empty))]
+            centroids /= np.maximum(
+                np.linalg.norm(centroids, axis=1, keepdims=True), 1e-12
+            )
+
+        assignment = np.concatenate(
+            [
+                np.argmax(
+                    self.store.vectors(rows[i : i + BLOCK_ROWS]) @ centroids.T, axis=1
+                )
+                for i in range(0, len(rows), BLOCK_ROWS)
+            ]
+        )
+        self.nlist = nlist
+        self.centroids = centroids.astype(np.float32)
+        self.order = rows[np.argsort(assignment, kind="stable")]
+        self.offsets = np.concatenate(
+            [[0], np.cumsum(np.bincount(assignment, minlength=nlist))]
+        )
+        return self
+
+    def search(
+        self, query: np.ndarray, k: int, allowed: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Approximate top-k; allowed is an optional boolean mask over store rows"""
+        probe = np.argsort(-(self.centroids @ query))[: self.nprobe]
+        candidates = np.concatenate(
+            [self.order[self.offsets[i] : self.offsets[i + 1]] for i in probe]
+        )
+        if allowed is not None:
+            candidates = candidates[allowed[candidates]]
+        return _top_k(candidates, self.store.vectors(candidates) @ query, k)
+
+    def save(self, path: str):
+        """Written to a temporary file first, so readers never load a partial index"""
+        with open(f"{path}.tmp", "wb") as f:
+            np.savez(
+                f,
+                centroids=self.centroids,
+                order=self.order,
+                offsets=self.offsets,
+                nprobe=self.nprobe,
+            )
+        os.replace(f"{path}.tmp", path)
+
+    @classmethod
+    def load(cls, store: ChunkStore, path: str) -> "IVFIndex":
+        data = np.load(path)
+        index = cls(store, nlist=len(data["centroids"]), nprobe=int(data["nprobe"]))
+        index.centroids = data["centroids"]
+        index.order = data["order"]
+        index.offsets = data["offsets"]
+        return index
+
+
+class VectorSearch:
+    """Top-k chunks for a query text or vector, optionally filtered by metadata"""
+
+    def __init__(
+        self,
+        store: ChunkStore,
+        embedder: Optional[Embedder] = None,
+        index: str = "auto",
+        nprobe: int = 8,
+        ivf_path: Optional[str] = None,
+    ):
+        """
+        index: "brute", "ivf", or "auto" (IVF from AUTO_IVF_ROWS embedded chunks)
+        ivf_path: where the trained IVF index is kept; it is loaded from there when it
+        covers the store's embedded rows, and trained and saved there otherwise
+        """
+        if index not in INDEX_TYPES:
+            raise ValueError(
+                f"Invalid index {index!r}. Expected one of {list(INDEX_TYPES)}"
+            )
+        if embedder is not None and store.dim is not None and embedder.dim != store.dim:
+            raise ValueError(f"Embedder size {embedder.dim} != store size {store.dim}")
+
+        self.store = store
+        self.embedder = embedder
+        self.rows = store.rows(with_embedding=True)
+        self.brute_force = BruteForceIndex(store)
+        if index == "auto":
+            index = "ivf" if len(self.rows) >= AUTO_IVF_ROWS else "brute"
+        self.ivf: Optional[IVFIndex] = None
+        if index == "ivf":
+            self.ivf = self._saved_ivf(ivf_path, nprobe)
+            if self.ivf is None:
+                self.ivf = IVFIndex(store, nprobe=nprobe).build(self.rows)
+                if ivf_path:
+                    self.ivf.save(ivf_path)
+
+    def _saved_ivf(self, path: Optional[str], nprobe: int) -> Optional[IVFIndex]:
+        """The IVF index saved at path, unless rows were embedded (or the size changed) since"""
+        if path is None or not os.path.exists(path):
+            return None
+        ivf = IVFIndex.load(self.store, path)
+        if ivf.centroids.shape[1] != self.store.dim or not np.array_equal(
+            np.sort(ivf.order), self.rows
+        ):
+            return None
+        ivf.nprobe = nprobe
+        return ivf
+
+    def search(
+        self,
+        query: Union[str, np.ndarray],
+        k: int = 10,
+        repo_name: Optional[str] = None,
+        chunk_type: Optional[str] = None,
+        file_type: Optional[str] = None,
+    ) -> List[Tuple[float, CodeChunk]]:
+        """(similarity, chunk) pairs, most similar first"""
+        if k < 1:
+            raise ValueError("k must be at least 1")
+        rows, scores = self.search_rows(
+            self._query_vector(query), k, repo_name, chunk_type, file_type
+        )
+        return list(zip(scores.tolist(), self.store.chunks(rows)))
+
+    def search_rows(
+        self,
+        vector: np.ndarray,
+        k: int,
+        repo_name: Optional[str] = None,
+        chunk_type: Optional[str] = None,
+        file_type: Optional[str] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Top-k (rows, scores) for a unit-length query vector"""
+        filtered = any(
+            value is not None for value in (repo_name, chunk_type, file_type)
+        )
+        rows = (
+            self.store.rows(repo_name, chunk_type, file_type, with_embedding=True)
+            if filtered
+            else self.rows
+        )
+        if self.ivf is None:
+            return self.brute_force.search(vector, k, rows)
+
+        allowed = None
+        if filtered:
+            allowed = np.zeros(len(self.store), dtype=bool)
+            allowed[rows] = True
+        found_rows, scores = self.ivf.search(vector, k, allowed)
+        if len(found_rows) < min(k, len(rows)):
+            # A selective filter left too few rows in the probed lists; the filtered
+            # set is small, so score it exactly instead
+            return self.brute_force.search(vector, k, rows)
+        return found_rows, scores
+
+    def _query_vector(self, query: Union[str, np.ndarray]) -> np.ndarray:
+        if isinstance(query, str):
+            if self.embedder is None:
+                raise ValueError("Text queries need an embedder")
+            return self.embedder.embed([query])[0]
+        vector = np.asarray(query, dtype=np.float32)
+        return vector / max(float(np.linalg.norm(vector)), 1e-12)
@@ -6,37 +6,39 @@ Clean architecture with services and database layers.
 
 Modules:
   - Expense Tracker (ACTIVE)
-  - Habit Tracker (PLANNED)
-  - Savings & Investment (PLANNED)
-  - Journal (PLANNED)
+  - Habit Tracker (ACTIVE)
+  - Savings & Investment (ACTIVE)
+  - Journal (ACTIVE)
 """
 
-from fastapi import FastAPI, HTTPException
+from fastapi import BackgroundTasks, Depends, FastAPI, Header, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
 from typing import Optional, List
+from contextlib import asynccontextmanager
 from datetime import date
+import asyncio
+import json
 import os
 
 # Import configuration
 from config import CATEGORIES, DEFAULT_BUDGETS
-from database.sqlite_impl import SQLiteDatabase
+from tenants import DEFAULT_TENANT, TENANT_HEADER, Tenant, TenantPathMiddleware, pool_from_env
 
-# Import active services
-from services.expense_service import ExpenseService
-from services.budget_service import BudgetService
-from services.recurring_service import RecurringService
-
-# Import placeholder services (to be implemented)
-# from services.habit_service import HabitService
-# from services.savings_service import SavingsService
-# from services.journal_service import JournalService
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # Release tenants' database connections (PostgreSQL pools) on shutdown
+    tenant_pool.close()
 
 # Initialize FastAPI app
 app = FastAPI(
     title="Life Dashboard API",
     version="2.0.0",
-    description="Unified API for expense tracking, habits, savings, and journaling"
+    description="Unified API for expense tracking, habits, savings, and journaling",
+    lifespan=lifespan,
 )
 
 # CORS for React frontend
@@ -48,15 +50,48 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize services with local database
-DATABASE_PATH = os.path.join(os.path.dirname(__file__), "data", "expenses.db")
-db = SQLiteDatabase(DATABASE_PATH)
-expense_service = ExpenseService(db)
-budget_service = BudgetService(db)
-recurring_service = RecurringService(db)
+# Route /t/<tenant>/... to the same endpoints with the tenant header set
+app.add_middleware(TenantPathMiddleware)
+
+# One SQLite file per tenant; open databases and services live in an LRU-bounded pool
+DATA_DIR = os.environ.get("DATA_DIR", os.path.join(os.path.dirname(__file__), "data"))
+BACKUP_KEEP_LAST = int(os.environ.get("BACKUP_KEEP_LAST", "7"))
+tenant_pool = pool_from_env(DATA_DIR)
+
+# /events: seconds between change log polls, idle seconds before a keep-alive, changes read per batch
+EVENTS_POLL_INTERVAL = float(os.environ.get("EVENTS_POLL_INTERVAL", "1.0"))
+EVENTS_HEARTBEAT = 15.0
+EVENTS_BATCH_SIZE = 500
+EVENTS_RETRY_MS = 3000
+
+# Open the default tenant up front (creates tables and default recurring transactions)
+tenant_pool.get(DEFAULT_TENANT)
+
+@app.exception_handler(NotImplementedError)
+async def feature_unavailable(request: Request, exc: NotImplementedError):
+    """Features the tenant's storage backend can't serve (see Tenant._sqlite_service)"""
+    return JSONResponse(status_code=501, content={"detail": str(exc)})
+
+async def get_tenant(x_tenant_id: Optional[str] = Header(None, alias=TENANT_HEADER)):
+    """
+    Resolve the request's tenant from the X-Tenant-ID header (or /t/<tenant>/ path).
+    Each tenant may only hold a few worker threads at once; extra requests wait here
+    on the event loop instead of starving other tenants' requests of threads.
+    """
+    try:
+        tenant = await run_in_threadpool(tenant_pool.get, x_tenant_id or DEFAULT_TENANT)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    async with tenant.request_slots:
+        yield tenant
 
-# Setup default recurring transactions
-recurring_service.setup_default_recurring()
+async def get_stream_tenant(x_tenant_id: Optional[str] = Header(None, alias=TENANT_HEADER)):
+    """Resolve the tenant for a long-lived stream, which takes a request slot only while it reads"""
+    try:
+        return await run_in_threadpool(tenant_pool.get, x_tenant_id or DEFAULT_TENANT)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 # Pydantic models for request/response
 class ExpenseCreate(BaseModel):
@@ -79,6 +114,85 @@ class RecurringUpdate(BaseModel):
     amount: Optional[float] = None
     is_active: Optional[bool] = None
 
+class HabitCreate(BaseModel):
+    name: str
+    description: str = ""
+    frequency: str = "daily"
+
+class HabitUpdate(BaseModel):
+    name: Optional[str] = None
+    description: Optional[str] = None
+    is_active: Optional[bool] = None
+
+class HabitLog(BaseModel):
+    date: str
+    completed: bool = True
+
+class HabitLogEntry(BaseModel):
+    habit_id: int
+    dates: List[str]
+    completed: bool = True
+
+class HabitBatchLog(BaseModel):
+    entries: List[HabitLogEntry]
+
+class SavingsAccountCreate(BaseModel):
+    name: str
+    account_type: str = "savings"
+    initial_balance: float = 0.0
+    date: Optional[str] = None
+
+class BalanceUpdate(BaseModel):
+    balance: float
+    date: str
+
+class InvestmentCreate(BaseModel):
+    name: str
+    investment_type: str
+    amount: float
+    purchase_price: float
+    date: Optional[str] = None
+
+class PriceUpdate(BaseModel):
+    price: float
+    date: str
+
+class InvestmentPrice(BaseModel):
+    investment_id: int
+    price: float
+    date: str
+
+class PriceBatchUpdate(BaseModel):
+    prices: List[InvestmentPrice]
+
+class JournalEntryCreate(BaseModel):
+    date: str
+    title: str = ""
+    content: str
+    mood: Optional[str] = None
+    tags: List[str] = []
+
+class JournalEntryUpdate(BaseModel):
+    title: str = ""
+    content: str
+    mood: Optional[str] = None
+    tags: Optional[List[str]] = None
+
+class GratitudeCreate(BaseModel):
+    date: str
+    text: str
+
+class SyncMutation(BaseModel):
+    table: str
+    op: str
+    id: Optional[int] = None
+    base_version: Optional[int] = None
+    values: Optional[dict] = None
+    client_id: Optional[str] = None
+
+class SyncBatch(BaseModel):
+    mutations: List[SyncMutation]
+
 # ============= API Endpoints =============
 
 @app.get("/")
@@ -98,40 +212,48 @@ def get_default_budgets():
 # ============= Expenses =============
 
 @app.get("/expenses")
-def get_expenses(start_date: Optional[str] = None, end_date: Optional[str] = None):
+def get_expenses(start_date: Optional[str] = None, end_date: Optional[str] = None, tenant: Tenant = Depends(get_tenant)):
     """Get all expenses, optionally filtered by date range"""
-    df = expense_service.get_expenses(start_date, end_date)
+    df = tenant.expense_service.get_expenses(start_date, end_date)
     return {"expenses": df.to_dict(orient="records")}
 
 @app.post("/expenses")
-def add_expense(expense: ExpenseCreate):
+def add_expense(expense: ExpenseCreate, tenant: Tenant = Depends(get_tenant)):
     """Add a new expense"""
     try:
-        expense_service.add_expense(
+        expense_id = tenant.expense_service.add_expense(
             expense.date,
             expense.category,
             expense.subcategory,
             expense.amount,
             expense.description
         )
-        return {"message": "Expense added successfully"}
+        tenant.timeseries_service.record_expense(expense.date, expense.category, expense.amount)
+        anomalies = tenant.anomaly_service.check_expense(expense_id) if tenant.expenses_in_sqlite else []
+        return {"message": "Expense added successfully", "anomalies": anomalies}
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @app.delete("/expenses/{expense_id}")
-def delete_expense(expense_id: int):
+def delete_expense(expense_id: int, tenant: Tenant = Depends(get_tenant)):
     """Delete an expense"""
     try:
-        expense_service.delete_expense(expense_id)
+        existing = tenant.expense_service.get_expense_by_id(expense_id)
+        tenant.expense_service.delete_expense(expense_id)
+        if tenant.expenses_in_sqlite:
+            tenant.anomaly_service.forget_expense(expense_id)
+        if existing:
+            tenant.timeseries_service.remove_expense(existing)
         return {"message": "Expense deleted successfully"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.put("/expenses/{expense_id}")
-def update_expense(expense_id: int, expense: ExpenseCreate):
+def update_expense(expense_id: int, expense: ExpenseCreate, tenant: Tenant = Depends(get_tenant)):
     """Update an existing expense"""
     try:
-        expense_service.update_expense(
+        existing = tenant.expense_service.get_expense_by_id(expense_id)
+        tenant.expense_service.update_expense(
             expense_id,
             expense.date,
             expense.category,
@@ -139,80 +261,115 @@ def update_expense(expense_id: int, expense: ExpenseCreate):
             expense.amount,
             expense.description
         )
-        return {"message": "Expense updated successfully"}
+        tenant.timeseries_service.remove_expense(existing)
+        tenant.timeseries_service.record_expense(expense.date, expense.category, expense.amount, bool(existing['is_recurring']))
+        anomalies = []
+        if tenant.expenses_in_sqlite:
+            tenant.anomaly_service.forget_expense(expense_id)
+            anomalies = tenant.anomaly_service.check_expense(expense_id)
+        return {"message": "Expense updated successfully", "anomalies": anomalies}
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @app.get("/expenses/summary")
-def get_summary(start_date: Optional[str] = None, end_date: Optional[str] = None, exclude_recurring: bool = True):
+def get_summary(start_date: Optional[str] = None, end_date: Optional[str] = None, exclude_recurring: bool = True, tenant: Tenant = Depends(get_tenant)):
     """Get expense summary statistics (excludes recurring by default)"""
-    df = expense_service.get_expenses(start_date, end_date, exclude_recurring)
-    summary = expense_service.calculate_summary(df)
+    df = tenant.expense_service.get_expenses(start_date, end_date, exclude_recurring)
+    summary = tenant.expense_service.calculate_summary(df)
     return {"summary": summary}
 
 @app.get("/expenses/by-category")
-def get_spending_by_category(start_date: Optional[str] = None, end_date: Optional[str] = None, exclude_recurring: bool = True):
+def get_spending_by_category(start_date: Optional[str] = None, end_date: Optional[str] = None, exclude_recurring: bool = True, tenant: Tenant = Depends(get_tenant)):
     """Get spending grouped by category (excludes recurring by default)"""
-    df = expense_service.get_expenses(start_date, end_date, exclude_recurring)
-    spending = expense_service.get_spending_by_category(df)
+    spending = tenant.expense_service.get_category_totals(start_date, end_date, exclude_recurring)
     return {"spending": spending}
 
 @app.get("/expenses/by-subcategory")
-def get_spending_by_subcategory(start_date: Optional[str] = None, end_date: Optional[str] = None):
+def get_spending_by_subcategory(start_date: Optional[str] = None, end_date: Optional[str] = None, tenant: Tenant = Depends(get_tenant)):
     """Get spending grouped by subcategory"""
-    df = expense_service.get_expenses(start_date, end_date)
-    spending_df = expense_service.get_spending_by_subcategory(df)
+    df = tenant.expense_service.get_expenses(start_date, end_date)
+    spending_df = tenant.expense_service.get_spending_by_subcategory(df)
     return {"spending": spending_df.to_dict(orient="records")}
 
 @app.get("/expenses/daily")
-def get_daily_spending(start_date: Optional[str] = None, end_date: Optional[str] = None, exclude_recurring: bool = True):
+def get_daily_spending(start_date: Optional[str] = None, end_date: Optional[str] = None, exclude_recurring: bool = True, tenant: Tenant = Depends(get_tenant)):
     """Get daily spending totals (excludes recurring by default for trends)"""
-    df = expense_service.get_expenses(start_date, end_date, exclude_recurring)
-    daily_df = expense_service.get_daily_spending(df)
+    df = tenant.expense_service.get_expenses(start_date, end_date, exclude_recurring)
+    daily_df = tenant.expense_service.get_daily_spending(df)
     # Convert date to string for JSON serialization
     if not daily_df.empty and 'date' in daily_df.columns:
         daily_df['date'] = daily_df['date'].dt.strftime('%Y-%m-%d')
     return {"daily": daily_df.to_dict(orient="records")}
 
+@app.get("/expenses/anomalies")
+def get_expense_anomalies(kind: Optional[str] = None, start_date: Optional[str] = None, end_date: Optional[str] = None, tenant: Tenant = Depends(get_tenant)):
+    """Get flagged expenses (probable duplicates and outliers)"""
+    try:
+        df = tenant.anomaly_service.get_anomalies(kind, start_date, end_date)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"anomalies": df.to_dict(orient="records")}
+
+@app.post("/expenses/anomalies/scan")
+def scan_expense_anomalies(tenant: Tenant = Depends(get_tenant)):
+    """Re-run anomaly detection over the full expense history"""
+    counts = tenant.anomaly_service.scan_history()
+    return {"message": "Anomaly scan completed", "counts": counts}
+
+@app.get("/expenses/timeseries")
+def get_spending_timeseries(
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    granularity: str = "daily",
+    exclude_recurring: bool = True,
+    rolling_window: int = 7,
+    tenant: Tenant = Depends(get_tenant),
+):
+    """Get gap-filled daily/weekly/monthly spending per category with rolling means and month-to-date totals"""
+    try:
+        return {"timeseries": tenant.timeseries_service.get_series(start_date, end_date, granularity, exclude_recurring, rolling_window)}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @app.get("/expenses/monthly")
-def get_monthly_spending():
+def get_monthly_spending(tenant: Tenant = Depends(get_tenant)):
     """Get monthly spending totals"""
-    df = expense_service.get_expenses()
-    monthly_df = expense_service.get_monthly_spending(df)
+    df = tenant.expense_service.get_expenses()
+    monthly_df = tenant.expense_service.get_monthly_spending(df)
     return {"monthly": monthly_df.to_dict(orient="records")}
 
 @app.get("/expenses/by-day-of-week")
-def get_spending_by_day_of_week():
+def get_spending_by_day_of_week(tenant: Tenant = Depends(get_tenant)):
     """Get average spending by day of week"""
-    df = expense_service.get_expenses()
-    dow_df = expense_service.get_spending_by_day_of_week(df)
+    df = tenant.expense_service.get_expenses()
+    dow_df = tenant.expense_service.get_spending_by_day_of_week(df)
     return {"day_of_week": dow_df.to_dict(orient="records")}
 
 @app.get("/expenses/available-months")
-def get_available_months():
+def get_available_months(tenant: Tenant = Depends(get_tenant)):
     """Get list of available months from earliest expense to current month"""
-    months = expense_service.get_available_months()
+    months = tenant.expense_service.get_available_months()
     return {"months": months}
 
 # ============= Budgets =============
 
 @app.get("/budgets/{month}")
-def get_budgets(month: str):
+def get_budgets(month: str, tenant: Tenant = Depends(get_tenant)):
     """Get all budgets for a specific month"""
-    budgets = budget_service.get_all_budgets(month)
+    budgets = tenant.budget_service.get_all_budgets(month)
     return {"budgets": budgets}
 
 @app.put("/budgets/{month}")
-def update_budgets(month: str, budget_update: BudgetUpdate):
+def update_budgets(month: str, budget_update: BudgetUpdate, tenant: Tenant = Depends(get_tenant)):
     """Update budgets for a specific month"""
     try:
-        budget_service.set_multiple_budgets(month, budget_update.budgets)
+        tenant.budget_service.set_multiple_budgets(month, budget_update.budgets)
         return {"message": "Budgets updated successfully"}
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @app.get("/budgets/{month}/comparison")
-def get_budget_comparison(month: str, exclude_recurring: bool = True):
+def get_budget_comparison(month: str, exclude_recurring: bool = True, tenant: Tenant = Depends(get_tenant)):
     """Get budget vs actual comparison for a month (excludes recurring by default)"""
     # Get month start and end dates
     from datetime import datetime, timedelta
@@ -225,39 +382,46 @@ def get_budget_comparison(month: str, exclude_recurring: bool = True):
     month_end = month_end - timedelta(days=1)
 
     # Get expenses and calculate comparison (excluding recurring for floating budget)
-    df = expense_service.get_expenses(
+    spending = tenant.expense_service.get_category_totals(
         month_start.strftime("%Y-%m-%d"),
         month_end.strftime("%Y-%m-%d"),
         exclude_recurring
     )
-    spending = expense_service.get_spending_by_category(df)
-    comparison = budget_service.calculate_budget_comparison(month, spending)
-    total_summary = budget_service.calculate_total_budget_summary(comparison)
+    comparison = tenant.budget_service.calculate_budget_comparison(month, spending)
+    total_summary = tenant.budget_service.calculate_total_budget_summary(comparison)
 
     return {
         "comparison": comparison,
         "total_summary": total_summary
     }
 
+@app.get("/budgets/{month}/forecast")
+def get_budget_forecast(month: str, exclude_recurring: bool = True, tenant: Tenant = Depends(get_tenant)):
+    """Get projected month-end spending per category vs budget (excludes recurring by default)"""
+    try:
+        return tenant.forecast_service.get_forecast(month, exclude_recurring)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 # ============= Recurring Transactions =============
 
 @app.get("/recurring")
-def get_recurring_transactions():
+def get_recurring_transactions(tenant: Tenant = Depends(get_tenant)):
     """Get all recurring transactions"""
-    df = recurring_service.get_recurring_transactions()
+    df = tenant.recurring_service.get_recurring_transactions()
     return {"recurring": df.to_dict(orient="records")}
 
 @app.get("/recurring/active")
-def get_active_recurring():
+def get_active_recurring(tenant: Tenant = Depends(get_tenant)):
     """Get only active recurring transactions"""
-    df = recurring_service.get_active_recurring_transactions()
+    df = tenant.recurring_service.get_active_recurring_transactions()
     return {"recurring": df.to_dict(orient="records")}
 
 @app.post("/recurring")
-def add_recurring(recurring: RecurringCreate):
+def add_recurring(recurring: RecurringCreate, tenant: Tenant = Depends(get_tenant)):
     """Add a new recurring transaction"""
     try:
-        recurring_service.add_recurring_transaction(
+        tenant.recurring_service.add_recurring_transaction(
             recurring.category,
             recurring.subcategory,
             recurring.amount,
@@ -268,75 +432,400 @@ def add_recurring(recurring: RecurringCreate):
         raise HTTPException(status_code=400, detail=str(e))
 
 @app.put("/recurring/{recurring_id}")
-def update_recurring(recurring_id: int, update: RecurringUpdate):
+def update_recurring(recurring_id: int, update: RecurringUpdate, tenant: Tenant = Depends(get_tenant)):
     """Update a recurring transaction"""
     try:
-        recurring_service.toggle_recurring_active(recurring_id, update.is_active) if update.is_active is not None else None
-        recurring_service.update_recurring_amount(recurring_id, update.amount) if update.amount is not None else None
+        tenant.recurring_service.toggle_recurring_active(recurring_id, update.is_active) if update.is_active is not None else None
+        tenant.recurring_service.update_recurring_amount(recurring_id, update.amount) if update.amount is not None else None
         return {"message": "Recurring transaction updated successfully"}
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @app.delete("/recurring/{recurring_id}")
-def delete_recurring(recurring_id: int):
+def delete_recurring(recurring_id: int, tenant: Tenant = Depends(get_tenant)):
     """Delete a recurring transaction"""
     try:
-        recurring_service.delete_recurring_transaction(recurring_id)
+        tenant.recurring_service.delete_recurring_transaction(recurring_id)
         return {"message": "Recurring transaction deleted successfully"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/recurring/status/{month}")
-def get_recurring_status(month: str):
+def get_recurring_status(month: str, tenant: Tenant = Depends(get_tenant)):
     """Get recurring transaction status for a month"""
-    status = recurring_service.check_month_status(month)
+    status = tenant.recurring_service.check_month_status(month)
     return {"status": status}
 
 @app.post("/recurring/apply/{month}")
-def apply_recurring(month: str):
+def apply_recurring(month: str, tenant: Tenant = Depends(get_tenant)):
     """Apply all pending recurring transactions for a month"""
-    applied = recurring_service.apply_recurring_for_month(month)
+    applied = tenant.recurring_service.apply_recurring_for_month(month)
+    for item in applied:
+        tenant.timeseries_service.record_expense(f"{month}-01", item["category"], item["amount"], is_recurring=True)
     return {
         "message": f"Applied {len(applied)} recurring transactions",
         "applied": applied
     }
 
 @app.get("/recurring/total")
-def get_total_recurring():
+def get_total_recurring(tenant: Tenant = Depends(get_tenant)):
     """Get total amount of active recurring transactions"""
-    total = recurring_service.calculate_total_recurring_amount()
+    total = tenant.recurring_service.calculate_total_recurring_amount()
     return {"total": total}
 
-# ============= Habit Tracker Endpoints (PLACEHOLDER) =============
-# TODO: Implement habit tracking endpoints
-# Planned routes:
-#   GET    /habits - Get all habits
-#   POST   /habits - Create a new habit
-#   PUT    /habits/{habit_id} - Update a habit
-#   DELETE /habits/{habit_id} - Delete a habit
-#   POST   /habits/{habit_id}/log - Log habit completion
-#   GET    /habits/{habit_id}/stats - Get habit statistics
-
-# ============= Savings & Investment Endpoints (PLACEHOLDER) =============
-# TODO: Implement savings and investment endpoints
-# Planned routes:
-#   GET    /savings/accounts - Get all savings accounts
-#   POST   /savings/accounts - Create a savings account
-#   GET    /investments - Get all investments
-#   POST   /investments - Add an investment
-#   GET    /net-worth - Calculate total net worth
-#   GET    /portfolio/allocation - Get asset allocation
-
-# ============= Journal Endpoints (PLACEHOLDER) =============
-# TODO: Implement journaling endpoints
-# Planned routes:
-#   GET    /journal/entries - Get all journal entries
-#   POST   /journal/entries - Create a journal entry
-#   PUT    /journal/entries/{entry_id} - Update an entry
-#   DELETE /journal/entries/{entry_id} - Delete an entry
-#   GET    /journal/search - Search journal entries
-#   GET    /journal/moods - Get mood statistics
+# ============= Admin: Backups =============
+
+def _run_backup(tenant: Tenant, name: str):
+    """Create a snapshot after the response is sent and apply retention"""
+    tenant.backup_manager.create_snapshot(name)
+    tenant.backup_manager.apply_retention(BACKUP_KEEP_LAST)
+
+@app.get("/admin/backups")
+def list_backups(tenant: Tenant = Depends(get_tenant)):
+    """List available database snapshots, newest first"""
+    return {"backups": tenant.backup_manager.list_snapshots()}
+
+@app.post("/admin/backups")
+def create_backup(background_tasks: BackgroundTasks, tenant: Tenant = Depends(get_tenant)):
+    """Start an online snapshot; the copy runs in the background in small steps"""
+    name = tenant.backup_manager.new_snapshot_name()
+    background_tasks.add_task(_run_backup, tenant, name)
+    return {"message": "Backup started", "name": name}
+
+@app.post("/admin/backups/{name}/verify")
+def verify_backup(name: str, tenant: Tenant = Depends(get_tenant)):
+    """Verify a snapshot (integrity check plus row-count and rollup checksums)"""
+    try:
+        return {"verification": tenant.backup_manager.verify_snapshot(name)}
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+# ============= Habits =============
+
+@app.get("/habits")
+def get_habits(active_only: bool = False, tenant: Tenant = Depends(get_tenant)):
+    """Get all habits"""
+    df = tenant.habit_service.get_habits(active_only)
+    return {"habits": df.to_dict(orient="records")}
+
+@app.post("/habits")
+def add_habit(habit: HabitCreate, tenant: Tenant = Depends(get_tenant)):
+    """Create a new habit"""
+    try:
+        habit_id = tenant.habit_service.add_habit(habit.name, habit.description, habit.frequency)
+        return {"message": "Habit created successfully", "id": habit_id}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.put("/habits/{habit_id}")
+def update_habit(habit_id: int, habit: HabitUpdate, tenant: Tenant = Depends(get_tenant)):
+    """Update a habit"""
+    try:
+        tenant.habit_service.update_habit(habit_id, habit.name, habit.description, habit.is_active)
+        return {"message": "Habit updated successfully"}
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+@app.delete("/habits/{habit_id}")
+def delete_habit(habit_id: int, tenant: Tenant = Depends(get_tenant)):
+    """Delete a habit and its history"""
+    tenant.habit_service.delete_habit(habit_id)
+    return {"message": "Habit deleted successfully"}
+
+@app.post("/habits/log")
+def log_habits(batch: HabitBatchLog, tenant: Tenant = Depends(get_tenant)):
+    """Log completions for many habits and days in one transaction"""
+    try:
+        logged = tenant.habit_service.log_completions([entry.model_dump() for entry in batch.entries])
+        return {"message": f"Logged {logged} day(s)", "logged": logged}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.post("/habits/{habit_id}/log")
+def log_habit(habit_id: int, log: HabitLog, tenant: Tenant = Depends(get_tenant)):
+    """Log (or un-log) a habit completion for a date"""
+    try:
+        tenant.habit_service.log_habit_completion(habit_id, log.date, log.completed)
+        return {"message": "Habit logged successfully"}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/habits/{habit_id}/stats")
+def get_habit_stats(habit_id: int, start_date: Optional[str] = None, end_date: Optional[str] = None, tenant: Tenant = Depends(get_tenant)):
+    """Get completion rate and streaks for a habit"""
+    try:
+        return {"stats": tenant.habit_service.get_habit_statistics(habit_id, start_date, end_date)}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+# ============= Savings & Investments =============
+
+@app.get("/savings/accounts")
+def get_savings_accounts(tenant: Tenant = Depends(get_tenant)):
+    """Get all savings accounts"""
+    df = tenant.savings_service.get_accounts()
+    return {"accounts": df.to_dict(orient="records")}
+
+@app.post("/savings/accounts")
+def add_savings_account(account: SavingsAccountCreate, tenant: Tenant = Depends(get_tenant)):
+    """Create a savings account"""
+    try:
+        account_id = tenant.savings_service.add_savings_account(
+            account.name, account.account_type, account.initial_balance, account.date
+        )
+        return {"message": "Account created successfully", "id": account_id}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.put("/savings/accounts/{account_id}/balance")
+def update_account_balance(account_id: int, update: BalanceUpdate, tenant: Tenant = Depends(get_tenant)):
+    """Record an account balance snapshot"""
+    try:
+        tenant.savings_service.update_account_balance(account_id, update.balance, update.date)
+        return {"message": "Balance updated successfully"}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/investments")
+def get_investments(tenant: Tenant = Depends(get_tenant)):
+    """Get all investments"""
+    df = tenant.savings_service.get_investments()
+    return {"investments": df.to_dict(orient="records")}
+
+@app.post("/investments")
+def add_investment(investment: InvestmentCreate, tenant: Tenant = Depends(get_tenant)):
+    """Add an investment"""
+    try:
+        investment_id = tenant.savings_service.add_investment(
+            investment.name, investment.investment_type, investment.amount, investment.purchase_price, investment.date
+        )
+        return {"message": "Investment added successfully", "id": investment_id}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.post("/investments/prices")
+def update_investment_prices(batch: PriceBatchUpdate, tenant: Tenant = Depends(get_tenant)):
+    """Record price snapshots for many investments in one transaction"""
+    try:
+        updated = tenant.savings_service.update_investment_prices([p.model_dump() for p in batch.prices])
+        return {"message": f"Updated {updated} price(s)", "updated": updated}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.put("/investments/{investment_id}/price")
+def update_investment_price(investment_id: int, update: PriceUpdate, tenant: Tenant = Depends(get_tenant)):
+    """Record an investment price snapshot"""
+    try:
+        tenant.savings_service.update_investment_value(investment_id, update.price, update.date)
+        return {"message": "Price updated successfully"}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/investments/{investment_id}/roi")
+def get_investment_roi(investment_id: int, tenant: Tenant = Depends(get_tenant)):
+    """Get return on investment (percent)"""
+    try:
+        return {"investment_id": investment_id, "roi": tenant.savings_service.calculate_roi(investment_id)}
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+@app.get("/net-worth")
+def get_net_worth(tenant: Tenant = Depends(get_tenant)):
+    """Get current total net worth"""
+    return {"net_worth": tenant.savings_service.calculate_net_worth()}
+
+@app.get("/net-worth/history")
+def get_net_worth_history(start_date: Optional[str] = None, end_date: Optional[str] = None, tenant: Tenant = Depends(get_tenant)):
+    """Get daily net worth over a date range"""
+    try:
+        df = tenant.savings_service.get_net_worth_history(start_date, end_date)
+        return {"history": df.to_dict(orient="records")}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/portfolio/allocation")
+def get_portfolio_allocation(tenant: Tenant = Depends(get_tenant)):
+    """Get asset allocation (percent of net worth per asset type)"""
+    return {"allocation": tenant.savings_service.get_portfolio_allocation()}
+
+# ============= Journal =============
+
+@app.get("/journal/entries")
+def get_journal_entries(
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    tags: Optional[str] = None,
+    mood: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = 50,
+    tenant: Tenant = Depends(get_tenant),
+):
+    """Get journal entries newest first; tags is comma-separated, cursor comes from the previous page"""
+    try:
+        df, next_cursor = tenant.journal_service.get_entries(
+            start_date, end_date, tags.split(",") if tags else None, mood, cursor, limit
+        )
+        return {"entries": df.to_dict(orient="records"), "next_cursor": next_cursor}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.post("/journal/entries")
+def create_journal_entry(entry: JournalEntryCreate, tenant: Tenant = Depends(get_tenant)):
+    """Create a journal entry"""
+    try:
+        entry_id = tenant.journal_service.create_entry(entry.date, entry.title, entry.content, entry.mood, entry.tags)
+        return {"message": "Entry created successfully", "id": entry_id}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.put("/journal/entries/{entry_id}")
+def update_journal_entry(entry_id: int, entry: JournalEntryUpdate, tenant: Tenant = Depends(get_tenant)):
+    """Update a journal entry"""
+    try:
+        tenant.journal_service.update_entry(entry_id, entry.title, entry.content, entry.mood, entry.tags)
+        return {"message": "Entry updated successfully"}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.delete("/journal/entries/{entry_id}")
+def delete_journal_entry(entry_id: int, tenant: Tenant = Depends(get_tenant)):
+    """Delete a journal entry"""
+    tenant.journal_service.delete_entry(entry_id)
+    return {"message": "Entry deleted successfully"}
+
+@app.post("/journal/gratitude")
+def add_gratitude(gratitude: GratitudeCreate, tenant: Tenant = Depends(get_tenant)):
+    """Add a gratitude entry"""
+    try:
+        entry_id = tenant.journal_service.add_gratitude(gratitude.date, gratitude.text)
+        return {"message": "Gratitude added successfully", "id": entry_id}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/journal/search")
+def search_journal(q: str, limit: int = 50, tenant: Tenant = Depends(get_tenant)):
+    """Full-text search over journal titles and content"""
+    try:
+        df = tenant.journal_service.search_entries(q, limit)
+        return {"entries": df.to_dict(orient="records")}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/journal/moods")
+def get_mood_statistics(start_date: Optional[str] = None, end_date: Optional[str] = None, tenant: Tenant = Depends(get_tenant)):
+    """Get mood statistics from per-day mood counts"""
+    return {"statistics": tenant.journal_service.get_mood_statistics(start_date, end_date)}
+
+# ============= Timeline =============
+
+@app.get("/timeline")
+def get_timeline(limit: int = 50, cursor: Optional[str] = None, sources: Optional[str] = None, tenant: Tenant = Depends(get_tenant)):
+    """Get events from all modules newest first; sources is comma-separated, cursor comes from the previous page"""
+    try:
+        return tenant.timeline_service.get_timeline(limit, cursor, sources.split(",") if sources else None)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+# ============= Sync =============
+
+@app.get("/sync")
+def get_sync_changes(since: int = 0, limit: int = 1000, tenant: Tenant = Depends(get_tenant)):
+    """Rows of expenses, budgets and recurring transactions changed after version `since`, plus deleted ids"""
+    try:
+        return tenant.sync_service.get_changes(since, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.post("/sync")
+def apply_sync_mutations(batch: SyncBatch, tenant: Tenant = Depends(get_tenant)):
+    """Apply queued client mutations; update/delete conflict if the row changed since base_version"""
+    try:
+        result = tenant.sync_service.apply_mutations([mutation.model_dump() for mutation in batch.mutations])
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if any(m.table == "expenses" and r["status"] == "applied" for m, r in zip(batch.mutations, result["results"])):
+        tenant.timeseries_service.invalidate()
+    return result
+
+# ============= Live Events =============
+
+def _sse(event: str, data, event_id: Optional[int] = None) -> str:
+    """Format one server-sent event"""
+    lines = [f"id: {event_id}"] if event_id is not None else []
+    lines += [f"event: {event}", f"data: {json.dumps(data, default=str)}"]
+    return "\n".join(lines) + "\n\n"
+
+@app.get("/events")
+async def stream_events(
+    request: Request,
+    since: Optional[int] = None,
+    tables: Optional[str] = None,
+    last_event_id: Optional[str] = Header(None),
+    tenant: Tenant = Depends(get_stream_tenant),
+):
+    """
+    Server-sent events: one 'change' per insert/update/delete of expenses, budgets or recurring
+    transactions, with the old and new row so clients can patch their aggregates.
+    Resumes after the Last-Event-ID header (sent by EventSource on reconnect) or ?since=<id>;
+    without either only new changes are sent. A 'reset' event means the client missed changes
+    that are no longer in the log and must refetch. tables is comma-separated.
+    """
+    try:
+        position = int(last_event_id) if last_event_id else since
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid Last-Event-ID")
+    feed = tenant.change_feed_service
+    table_list = tables.split(",") if tables else None
+
+    async def read_batch(after: int) -> dict:
+        async with tenant.request_slots:
+            return await run_in_threadpool(feed.read_after, after, EVENTS_BATCH_SIZE, table_list)
+
+    try:
+        if position is None:
+            async with tenant.request_slots:
+                position = await run_in_threadpool(feed.latest_event_id)
+        batch = await read_batch(position)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    async def event_stream(batch: dict):
+        yield f"retry: {EVENTS_RETRY_MS}\n\n"
+        idle = 0.0
+        while True:
+            if batch["reset"]:
+                yield _sse("reset", {"position": batch["position"]}, batch["position"])
+            for change in batch["changes"]:
+                yield _sse("change", change, change["id"])
+            # Each yield returns only once the server has accepted the event (sends are
+            # flow-controlled), so a slow client holds at most one batch here and simply
+            # falls behind in the durable log instead of growing a queue
+            if batch["changes"] or batch["reset"]:
+                idle = 0.0
+
+            if not batch["more"]:
+                await asyncio.sleep(EVENTS_POLL_INTERVAL)
+                idle += EVENTS_POLL_INTERVAL
+                if idle >= EVENTS_HEARTBEAT:
+                    yield ": keep-alive\n\n"
+                    idle = 0.0
+            if await request.is_disconnected():
+                break
+            batch = await read_batch(batch["position"])
+
+    return StreamingResponse(
+        event_stream(batch),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+
+    # WEB_CONCURRENCY=4 python api.py runs four worker processes sharing the databases
+    workers = int(os.environ.get("WEB_CONCURRENCY", "1"))
+    if workers > 1:
+        uvicorn.run("api:app", host="0.0.0.0", port=8000, workers=workers)
+    else:
+        uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,238 @@
+"""
+Online backups for the SQLite database
+Uses the sqlite3 backup API so snapshots are consistent without blocking writers
+"""
+
+import hashlib
+import json
+import logging
+import shutil
+import sqlite3
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from database.sqlite_impl import SQLiteDatabase
+
+MANIFEST_FILE = "manifest.json"
+SNAPSHOT_DB_FILE = "expenses.db"
+SNAPSHOT_PREFIX = "snapshot-"
+TIMESTAMP_FORMAT = "%Y%m%dT%H%M%S"
+
+logger = logging.getLogger(__name__)
+
+
+class BackupManager:
+    """Creates, verifies, prunes and restores snapshots of a SQLiteDatabase"""
+
+    def __init__(self, db: SQLiteDatabase, backup_dir: str, pages_per_step: int = 256, step_sleep: float = 0.005):
+        """
+        pages_per_step and step_sleep control how the copy is interleaved with other work:
+        the source lock is released after every step so writers are never stalled for long.
+        """
+        self.db = db
+        self.backup_dir = Path(backup_dir)
+        self.pages_per_step = pages_per_step
+        self.step_sleep = step_sleep
+
+    # ============= Snapshots =============
+
+    def new_snapshot_name(self) -> str:
+        """Generate a unique, time-ordered snapshot name"""
+        base = SNAPSHOT_PREFIX + datetime.now().strftime(TIMESTAMP_FORMAT)
+        name = base
+        suffix = 1
+        while (self.backup_dir / name).exists():
+            name = f"{base}-{suffix}"
+            suffix += 1
+        return name
+
+    def create_snapshot(self, name: Optional[str] = None) -> dict:
+        """
+        Copy the database (and its archive files) into a new snapshot directory.
+        Pages are copied in small steps; a manifest with row counts and rollup
+        checksums of the copied data is written for later verification.
+        The archive lock is held throughout, so no rows move between the hot table and
+        the archives in between the copies (writes to the hot table carry on).
+        """
+        name = name or self.new_snapshot_name()
+        snapshot_dir = self.backup_dir / name
+        tmp_dir = self.backup_dir / f".{name}.tmp"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        (tmp_dir / "archive").mkdir(parents=True)
+
+        started = time.monotonic()
+        archives = []
+        with self.db.archive_lock():
+            self._copy_database(self.db.db_path, tmp_dir / SNAPSHOT_DB_FILE)
+
+            if self.db.archive_dir.exists():
+                for archive_path in sorted(self.db.archive_dir.glob("*.db")):
+                    self._copy_database(str(archive_path), tmp_dir / "archive" / archive_path.name)
+                    archives.append(archive_path.name)
+
+        manifest = {
+            "name": name,
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "source": str(self.db.db_path),
+            "duration_seconds": round(time.monotonic() - started, 3),
+            "archives": archives,
+            "checksums": self._compute_checksums(tmp_dir),
+        }
+        with open(tmp_dir / MANIFEST_FILE, "w") as f:
+            json.dump(manifest, f, indent=2)
+
+        # Only complete snapshots ever appear under their final name
+        tmp_dir.rename(snapshot_dir)
+        return manifest
+
+    def list_snapshots(self) -> List[dict]:
+        """List complete snapshots, newest first"""
+        if not self.backup_dir.exists():
+            return []
+
+        snapshots = []
+        for manifest_path in self.backup_dir.glob(f"{SNAPSHOT_PREFIX}*/{MANIFEST_FILE}"):
+            with open(manifest_path, "r") as f:
+                manifest = json.load(f)
+            snapshots.append({
+                "name": manifest["name"],
+                "created_at": manifest["created_at"],
+                "duration_seconds": manifest["duration_seconds"],
+                "archives": manifest["archives"],
+            })
+
+        return sorted(snapshots, key=lambda s: (s["created_at"], s["name"]), reverse=True)
+
+    def apply_retention(self, keep_last: int) -> List[str]:
+        """Delete all but the newest keep_last snapshots, returns deleted names"""
+        if keep_last < 1:
+            raise ValueError("Must keep at least one snapshot")
+
+        deleted = []
+        for snapshot in self.list_snapshots()[keep_last:]:
+            shutil.rmtree(self.backup_dir / snapshot["name"])
+            deleted.append(snapshot["name"])
+        return deleted
+
+    def find_snapshot_at(self, timestamp: str) -> Optional[str]:
+        """Get the newest snapshot taken at or before an ISO timestamp"""
+        for snapshot in self.list_snapshots():
+            if snapshot["created_at"] <= timestamp:
+                return snapshot["name"]
+        return None
+
+    def run_schedule(self, interval_seconds: float, keep_last: int, max_runs: Optional[int] = None):
+        """Take a snapshot every interval_seconds and prune old ones"""
+        runs = 0
+        while max_runs is None or runs < max_runs:
+            manifest = self.create_snapshot()
+            deleted = self.apply_retention(keep_last)
+            logger.info("Created %s in %ss, pruned %d", manifest['name'], manifest['duration_seconds'], len(deleted))
+
+            runs += 1
+            if max_runs is None or runs < max_runs:
+                time.sleep(interval_seconds)
+
+    # ============= Verify / Restore =============
+
+    def verify_snapshot(self, name: str) -> dict:
+        """Run integrity_check on every file and compare row counts and rollups with the manifest"""
+        snapshot_dir = self._snapshot_dir(name)
+        with open(snapshot_dir / MANIFEST_FILE, "r") as f:
+            manifest = json.load(f)
+
+        integrity = {}
+        for path in self._snapshot_files(snapshot_dir):
+            conn = sqlite3.connect(path.resolve().as_uri() + "?mode=ro", uri=True)
+            integrity[path.name] = conn.execute("PRAGMA integrity_check").fetchone()[0]
+            conn.close()
+
+        checksums = self._compute_checksums(snapshot_dir)
+        mismatches = [
+            key for key in set(manifest["checksums"]) | set(checksums)
+            if manifest["checksums"].get(key) != checksums.get(key)
+        ]
+
+        return {
+            "name": name,
+            "ok": all(result == "ok" for result in integrity.values()) and not mismatches,
+            "integrity": integrity,
+            "mismatches": sorted(mismatches),
+        }
+
+    def restore_snapshot(self, name: str, target_path: str, archive_dir: Optional[str] = None) -> SQLiteDatabase:
+        """
+        Restore a snapshot into a fresh database file and its archive files into archive_dir
+        (default: "archive" next to the target, where SQLiteDatabase looks for them).
+        Nothing is written if the target or any of the archive files already exists.
+        """
+        snapshot_dir = self._snapshot_dir(name)
+        target = Path(target_path)
+        archive_dir = Path(archive_dir) if archive_dir else target.parent / "archive"
+        archives = sorted((snapshot_dir / "archive").glob("*.db"))
+
+        if target.exists():
+            raise ValueError(f"Restore target {target_path} already exists")
+        existing = [path.name for path in archives if (archive_dir / path.name).exists()]
+        if existing:
+            raise ValueError(f"Archive files {existing} already exist in {archive_dir}; restore into another archive_dir")
+
+        target.parent.mkdir(parents=True, exist_ok=True)
+        self._copy_database(str(snapshot_dir / SNAPSHOT_DB_FILE), target)
+
+        for archive_path in archives:
+            archive_dir.mkdir(parents=True, exist_ok=True)
+            self._copy_database(str(archive_path), archive_dir / archive_path.name)
+
+        return SQLiteDatabase(str(target), archive_dir=str(archive_dir))
+
+    # ============= Helpers =============
+
+    def _snapshot_dir(self, name: str) -> Path:
+        snapshot_dir = self.backup_dir / name
+        if not name.startswith(SNAPSHOT_PREFIX) or "/" in name or not (snapshot_dir / MANIFEST_FILE).exists():
+            raise ValueError(f"Snapshot {name} not found")
+        return snapshot_dir
+
+    def _snapshot_files(self, snapshot_dir: Path) -> List[Path]:
+        return [snapshot_dir / SNAPSHOT_DB_FILE] + sorted((snapshot_dir / "archive").glob("*.db"))
+
+    def _copy_database(self, source_path: str, target_path: Path):
+        """Copy a database page-by-page with the online backup API"""
+        source = sqlite3.connect(source_path)
+        target = sqlite3.connect(str(target_path))
+        try:
+            source.backup(target, pages=self.pages_per_step, sleep=self.step_sleep)
+        finally:
+            target.close()
+            source.close()
+
+    def _compute_checksums(self, snapshot_dir: Path) -> Dict[str, str]:
+        """
+        Row counts for every table plus per-month rollups of expenses and budgets,
+        keyed by "<file>:<table>:count" / "<file>:<table>:rollup"
+        """
+        checksums = {}
+        for path in self._snapshot_files(snapshot_dir):
+            conn = sqlite3.connect(path.resolve().as_uri() + "?mode=ro", uri=True)
+            tables = [row[0] for row in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name"
+            )]
+
+            for table in tables:
+                count = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                checksums[f"{path.name}:{table}:count"] = str(count)
+
+            rollups = {
+                "expenses": "SELECT substr(date, 1, 7), COUNT(*), ROUND(SUM(amount), 2) FROM expenses GROUP BY 1 ORDER BY 1",
+                "budgets": "SELECT month, COUNT(*), ROUND(SUM(amount), 2) FROM budgets GROUP BY 1 ORDER BY 1",
+            }
+            for table, query in rollups.items():
+                if table in tables:
+                    digest = hashlib.sha256(repr(conn.execute(query).fetchall()).encode()).hexdigest()
+                    checksums[f"{path.name}:{table}:rollup"] = digest
+
+            conn.close()
+        return checksums
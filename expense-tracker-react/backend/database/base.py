@@ -0,0 +1,117 @@
+"""
+Storage interface for the expense, budget and recurring services
+Any backend implementing ExpenseStorage can be passed to ExpenseService,
+BudgetService and RecurringService in place of SQLiteDatabase
+"""
+
+from typing import Dict, Optional, Protocol, runtime_checkable
+
+import pandas as pd
+
+# Columns accepted by add_expenses_bulk (description and is_recurring are optional)
+BULK_EXPENSE_COLUMNS = ("date", "category", "subcategory", "amount", "description", "is_recurring")
+
+
+@runtime_checkable
+class ExpenseStorage(Protocol):
+    """
+    Methods the core expense-tracking services rely on.
+    Dates are "YYYY-MM-DD" strings and months "YYYY-MM"; DataFrames returned by
+    get_expenses have a datetime64 'date' column and are ordered newest first.
+    """
+
+    # ============= Expenses =============
+
+    def add_expense(self, date: str, category: str, subcategory: str, amount: float, description: str = "", is_recurring: bool = False) -> int:
+        ...
+
+    def add_expenses_bulk(self, expenses: pd.DataFrame) -> int:
+        """Insert many expenses in one transaction, returns the number of rows loaded"""
+        ...
+
+    def get_expenses(self, start_date: Optional[str] = None, end_date: Optional[str] = None, exclude_recurring: bool = False) -> pd.DataFrame:
+        ...
+
+    def get_expense_by_id(self, expense_id: int) -> Optional[dict]:
+        ...
+
+    def update_expense(self, expense_id: int, date: str, category: str, subcategory: str, amount: float, description: str = "") -> bool:
+        ...
+
+    def delete_expense(self, expense_id: int):
+        ...
+
+    def get_earliest_expense_date(self) -> Optional[str]:
+        ...
+
+    def get_category_totals(self, start_date: Optional[str] = None, end_date: Optional[str] = None, exclude_recurring: bool = False) -> Dict[str, float]:
+        """Total spending per category, aggregated by the storage backend"""
+        ...
+
+    # ============= Budgets =============
+
+    def set_budget(self, month: str, category: str, amount: float):
+        ...
+
+    def get_budget(self, month: str, category: str) -> Optional[float]:
+        ...
+
+    def get_all_budgets(self, month: str) -> dict:
+        ...
+
+    # ============= Recurring Transactions =============
+
+    def add_recurring_transaction(self, category: str, subcategory: str, amount: float, description: str = "") -> int:
+        ...
+
+    def get_recurring_transactions(self) -> pd.DataFrame:
+        ...
+
+    def get_active_recurring_transactions(self) -> pd.DataFrame:
+        ...
+
+    def update_recurring_amount(self, recurring_id: int, amount: float):
+        ...
+
+    def toggle_recurring_active(self, recurring_id: int, is_active: bool):
+        ...
+
+    def delete_recurring_transaction(self, recurring_id: int):
+        ...
+
+    def apply_recurring(self, recurring_id: int, month: str, date: str) -> Optional[int]:
+        """Atomically add the month's expense for a recurring transaction; None if already applied"""
+        ...
+
+    def is_recurring_applied(self, recurring_id: int, month: str) -> bool:
+        ...
+
+    def get_applied_recurring(self, month: str) -> pd.DataFrame:
+        ...
+
+    # ============= Change tracking =============
+
+    def data_version(self) -> int:
+        """Counter that changes when another worker commits (own writes excluded); 0 when not watching for changes"""
+        ...
+
+    def close(self):
+        """Release connections held between calls"""
+        ...
+
+
+def create_storage(database_url: str, tenant_id: Optional[str] = None, watch_changes: bool = False) -> ExpenseStorage:
+    """
+    Open the storage backend named by a DATABASE_URL.
+    postgresql:// URLs use PostgresDatabase (one schema per tenant), sqlite:///path uses SQLiteDatabase.
+    """
+    if database_url.startswith(("postgres://", "postgresql://")):
+        from database.postgres_impl import PostgresDatabase
+        schema = f"tenant_{tenant_id}" if tenant_id else "public"
+        return PostgresDatabase(database_url, schema=schema, watch_changes=watch_changes)
+
+    if database_url.startswith("sqlite:///"):
+        from database.sqlite_impl import SQLiteDatabase
+        return SQLiteDatabase(database_url[len("sqlite:///"):], watch_changes=watch_changes)
+
+    raise ValueError(f"Unsupported DATABASE_URL scheme: {database_url.split(':', 1)[0]}")
@@ -0,0 +1,401 @@
+"""
+PostgreSQL implementation of ExpenseStorage
+Requires the optional psycopg dependency; each tenant lives in its own schema
+"""
+
+import threading
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+import pandas as pd
+
+from database.base import BULK_EXPENSE_COLUMNS
+
+
+def _import_psycopg():
+    """Import psycopg lazily so the API runs without it"""
+    try:
+        from psycopg import sql
+        from psycopg.rows import dict_row
+        from psycopg_pool import ConnectionPool
+    except ImportError as e:
+        raise ImportError("The PostgreSQL backend requires psycopg: pip install 'psycopg[binary,pool]'") from e
+    return sql, dict_row, ConnectionPool
+
+
+SCHEMA_SQL = (
+    """
+    CREATE TABLE IF NOT EXISTS expenses (
+        id BIGSERIAL PRIMARY KEY,
+        date DATE NOT NULL,
+        category TEXT NOT NULL,
+        subcategory TEXT NOT NULL,
+        amount DOUBLE PRECISION NOT NULL,
+        description TEXT,
+        is_recurring INTEGER DEFAULT 0,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_expenses_date ON expenses(date)",
+    "CREATE INDEX IF NOT EXISTS idx_expenses_subcategory_date ON expenses(subcategory, date)",
+    """
+    CREATE TABLE IF NOT EXISTS budgets (
+        id BIGSERIAL PRIMARY KEY,
+        month TEXT NOT NULL,
+        category TEXT NOT NULL,
+        amount DOUBLE PRECISION NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        UNIQUE(month, category)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS recurring_transactions (
+        id BIGSERIAL PRIMARY KEY,
+        category TEXT NOT NULL,
+        subcategory TEXT NOT NULL,
+        amount DOUBLE PRECISION NOT NULL,
+        description TEXT,
+        is_active INTEGER DEFAULT 1,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS applied_recurring (
+        id BIGSERIAL PRIMARY KEY,
+        recurring_id BIGINT NOT NULL REFERENCES recurring_transactions(id) ON DELETE CASCADE,
+        month TEXT NOT NULL,
+        expense_id BIGINT NOT NULL,
+        applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        UNIQUE(recurring_id, month)
+    )
+    """,
+    # Single-row counter bumped by every committed write to expenses (see data_version)
+    """
+    CREATE TABLE IF NOT EXISTS data_version (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        version BIGINT NOT NULL
+    )
+    """,
+    "INSERT INTO data_version (id, version) VALUES (1, 0) ON CONFLICT (id) DO NOTHING",
+    """
+    CREATE OR REPLACE FUNCTION bump_data_version() RETURNS trigger AS $$
+    BEGIN
+        UPDATE data_version SET version = version + 1 WHERE id = 1;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    # Created last: its presence means the whole script has run (see _init_tables)
+    """
+    CREATE TRIGGER expenses_data_version AFTER INSERT OR UPDATE OR DELETE ON expenses
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_data_version()
+    """,
+)
+
+EXPENSE_SELECT = """
+    SELECT id, to_char(date, 'YYYY-MM-DD') AS date, category, subcategory, amount,
+           description, is_recurring, created_at
+    FROM expenses
+"""
+
+
+class PostgresDatabase:
+    """
+    PostgreSQL database for expense tracking.
+    Connections come from a pool and have search_path set to the tenant's schema,
+    so the queries match the SQLite ones table for table.
+    """
+
+    def __init__(self, dsn: str, schema: str = "public", watch_changes: bool = False, min_size: int = 1, max_size: int = 10):
+        """watch_changes: other processes write to the same schema (multi-worker mode)"""
+        self._sql, self._dict_row, ConnectionPool = _import_psycopg()
+        self.schema = schema
+        self.watch_changes = watch_changes
+        self._watch_lock = threading.Lock()
+        self._watch_seen = None  # data_version already accounted for
+        self._foreign_writes = 0
+
+        schema_ident = self._sql.Identifier(schema)
+
+        def configure(conn):
+            conn.execute(self._sql.SQL("SET search_path TO {}").format(schema_ident))
+            conn.commit()
+
+        self.pool = ConnectionPool(
+            dsn, min_size=min_size, max_size=max_size, configure=configure,
+            kwargs={"row_factory": self._dict_row}, open=True,
+        )
+        self._init_tables(schema_ident)
+
+    def _init_tables(self, schema_ident):
+        """
+        Create the tenant's schema and tables, once even when several workers open it together.
+        A transaction-scoped advisory lock per schema serializes the setup: concurrent
+        CREATE ... IF NOT EXISTS statements can still collide in the catalog.
+        """
+        with self.pool.connection() as conn:
+            with conn.transaction():
+                conn.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", (f"expense_tracker_schema:{self.schema}",))
+                conn.execute(self._sql.SQL("CREATE SCHEMA IF NOT EXISTS {}").format(schema_ident))
+
+                # Already set up: skip the DDL, which would lock the tables on every open
+                ready = conn.execute("""
+                    SELECT 1 FROM pg_trigger
+                    WHERE tgrelid = to_regclass('expenses') AND tgname = 'expenses_data_version'
+                """).fetchone()
+                if ready:
+                    return
+
+                for statement in SCHEMA_SQL:
+                    conn.execute(statement)
+
+    def close(self):
+        self.pool.close()
+
+    def data_version(self) -> int:
+        """
+        Counter that changes when another worker writes the tenant's expenses; this
+        instance's own writes are left out. Always 0 unless watch_changes is set.
+        """
+        if not self.watch_changes:
+            return 0
+
+        with self.pool.connection() as conn:
+            version = conn.execute("SELECT version FROM data_version WHERE id = 1").fetchone()['version']
+        with self._watch_lock:
+            if self._watch_seen is not None and version != self._watch_seen:
+                self._foreign_writes += 1
+            self._watch_seen = version
+            return self._foreign_writes
+
+    @contextmanager
+    def _expenses_write(self):
+        """
+        Pooled connection for a write to expenses. When watching, the data_version row is
+        locked first, so nobody else can bump it before this transaction commits: the bump
+        is this instance's own unless the counter had already moved since it was last seen.
+        """
+        if not self.watch_changes:
+            with self.pool.connection() as conn:
+                yield conn
+            return
+
+        with self.pool.connection() as conn:
+            before = conn.execute("SELECT version FROM data_version WHERE id = 1 FOR UPDATE").fetchone()['version']
+            yield conn
+            after = conn.execute("SELECT version FROM data_version WHERE id = 1").fetchone()['version']
+        with self._watch_lock:
+            if before == self._watch_seen:
+                self._watch_seen = after
+
+    def _read_frame(self, query: str, params: tuple = ()) -> pd.DataFrame:
+        with self.pool.connection() as conn:
+            cursor = conn.execute(query, params)
+            columns = [column.name for column in cursor.description]
+            return pd.DataFrame(cursor.fetchall(), columns=columns)
+
+    # ============= Expenses =============
+
+    def add_expense(self, date: str, category: str, subcategory: str, amount: float, description: str = "", is_recurring: bool = False):
+        """Add a new expense"""
+        with self._expenses_write() as conn:
+            row = conn.execute("""
+                INSERT INTO expenses (date, category, subcategory, amount, description, is_recurring)
+                VALUES (%s, %s, %s, %s, %s, %s)
+                RETURNING id
+            """, (date, category, subcategory, amount, description, 1 if is_recurring else 0)).fetchone()
+        return row['id']
+
+    def add_expenses_bulk(self, expenses: pd.DataFrame) -> int:
+        """Load many expenses with COPY in a single transaction"""
+        rows = expenses.reindex(columns=list(BULK_EXPENSE_COLUMNS))
+        rows['description'] = rows['description'].fillna("")
+        rows['is_recurring'] = rows['is_recurring'].fillna(0).astype(int)
+        rows['date'] = pd.to_datetime(rows['date']).dt.strftime("%Y-%m-%d")
+
+        with self._expenses_write() as conn:
+            with conn.cursor() as cursor:
+                with cursor.copy(f"COPY expenses ({', '.join(BULK_EXPENSE_COLUMNS)}) FROM STDIN") as copy:
+                    for row in rows.itertuples(index=False, name=None):
+                        copy.write_row(row)
+
+        return len(rows)
+
+    def _expense_filters(self, start_date: Optional[str], end_date: Optional[str], exclude_recurring: bool):
+        """WHERE clause and parameters shared by the expense queries"""
+        where_clauses = []
+        params = []
+
+        if start_date:
+            where_clauses.append("date >= %s")
+            params.append(start_date)
+        if end_date:
+            where_clauses.append("date <= %s")
+            params.append(end_date)
+        if exclude_recurring:
+            where_clauses.append("is_recurring = 0")
+
+        return (" AND ".join(where_clauses) if where_clauses else "TRUE"), params
+
+    def get_expenses(self, start_date: Optional[str] = None, end_date: Optional[str] = None, exclude_recurring: bool = False) -> pd.DataFrame:
+        """Get expenses with optional date filtering and recurring exclusion"""
+        where_clause, params = self._expense_filters(start_date, end_date, exclude_recurring)
+        df = self._read_frame(f"{EXPENSE_SELECT} WHERE {where_clause} ORDER BY date DESC, id", tuple(params))
+
+        if not df.empty:
+            df['date'] = pd.to_datetime(df['date'])
+
+        return df
+
+    def get_category_totals(self, start_date: Optional[str] = None, end_date: Optional[str] = None, exclude_recurring: bool = False) -> Dict[str, float]:
+        """Total spending per category, grouped by the server"""
+        where_clause, params = self._expense_filters(start_date, end_date, exclude_recurring)
+        with self.pool.connection() as conn:
+            rows = conn.execute(
+                f"SELECT category, SUM(amount) AS total FROM expenses WHERE {where_clause} GROUP BY category",
+                tuple(params)
+            ).fetchall()
+        return {row['category']: row['total'] for row in rows}
+
+    def delete_expense(self, expense_id: int):
+        """Delete an expense by ID"""
+        with self._expenses_write() as conn:
+            conn.execute("DELETE FROM expenses WHERE id = %s", (expense_id,))
+
+    def update_expense(self, expense_id: int, date: str, category: str, subcategory: str, amount: float, description: str = ""):
+        """Update an existing expense"""
+        with self._expenses_write() as conn:
+            cursor = conn.execute("""
+                UPDATE expenses
+                SET date = %s, category = %s, subcategory = %s, amount = %s, description = %s
+                WHERE id = %s
+            """, (date, category, subcategory, amount, description, expense_id))
+            return cursor.rowcount > 0
+
+    def get_expense_by_id(self, expense_id: int) -> Optional[dict]:
+        """Get a specific expense by ID"""
+        with self.pool.connection() as conn:
+            return conn.execute(f"{EXPENSE_SELECT} WHERE id = %s", (expense_id,)).fetchone()
+
+    def get_earliest_expense_date(self) -> Optional[str]:
+        """Get the earliest expense date"""
+        with self.pool.connection() as conn:
+            row = conn.execute("SELECT to_char(MIN(date), 'YYYY-MM-DD') AS earliest FROM expenses").fetchone()
+        return row['earliest']
+
+    # ============= Budgets =============
+
+    def set_budget(self, month: str, category: str, amount: float):
+        """Set budget for a category in a specific month"""
+        with self.pool.connection() as conn:
+            conn.execute("""
+                INSERT INTO budgets (month, category, amount)
+                VALUES (%s, %s, %s)
+                ON CONFLICT (month, category) DO UPDATE SET amount = EXCLUDED.amount
+            """, (month, category, amount))
+
+    def get_budget(self, month: str, category: str) -> Optional[float]:
+        """Get budget for a category in a specific month"""
+        with self.pool.connection() as conn:
+            row = conn.execute(
+                "SELECT amount FROM budgets WHERE month = %s AND category = %s", (month, category)
+            ).fetchone()
+        return row['amount'] if row else None
+
+    def get_all_budgets(self, month: str) -> dict:
+        """Get all budgets for a specific month"""
+        with self.pool.connection() as conn:
+            rows = conn.execute("SELECT category, amount FROM budgets WHERE month = %s", (month,)).fetchall()
+        return {row['category']: row['amount'] for row in rows}
+
+    # ============= Recurring Transactions =============
+
+    def add_recurring_transaction(self, category: str, subcategory: str, amount: float, description: str = ""):
+        """Add a new recurring transaction"""
+        with self.pool.connection() as conn:
+            row = conn.execute("""
+                INSERT INTO recurring_transactions (category, subcategory, amount, description)
+                VALUES (%s, %s, %s, %s)
+                RETURNING id
+            """, (category, subcategory, amount, description)).fetchone()
+        return row['id']
+
+    def get_recurring_transactions(self) -> pd.DataFrame:
+        """Get all recurring transactions"""
+        return self._read_frame("SELECT * FROM recurring_transactions ORDER BY category, subcategory")
+
+    def get_active_recurring_transactions(self) -> pd.DataFrame:
+        """Get only active recurring transactions"""
+        return self._read_frame(
+            "SELECT * FROM recurring_transactions WHERE is_active = 1 ORDER BY category, subcategory"
+        )
+
+    def update_recurring_amount(self, recurring_id: int, amount: float):
+        """Update recurring transaction amount"""
+        with self.pool.connection() as conn:
+            conn.execute("UPDATE recurring_transactions SET amount = %s WHERE id = %s", (amount, recurring_id))
+
+    def toggle_recurring_active(self, recurring_id: int, is_active: bool):
+        """Toggle recurring transaction active status"""
+        with self.pool.connection() as conn:
+            conn.execute(
+                "UPDATE recurring_transactions SET is_active = %s WHERE id = %s", (1 if is_active else 0, recurring_id)
+            )
+
+    def delete_recurring_transaction(self, recurring_id: int):
+        """Delete a recurring transaction (applied records cascade)"""
+        with self.pool.connection() as conn:
+            conn.execute("DELETE FROM recurring_transactions WHERE id = %s", (recurring_id,))
+
+    def get_applied_recurring(self, month: str) -> pd.DataFrame:
+        """Get applied recurring transactions for a month"""
+        return self._read_frame("""
+            SELECT ar.*, rt.category, rt.subcategory, rt.amount, rt.description
+            FROM applied_recurring ar
+            JOIN recurring_transactions rt ON ar.recurring_id = rt.id
+            WHERE ar.month = %s
+        """, (month,))
+
+    def apply_recurring(self, recurring_id: int, month: str, date: str) -> Optional[int]:
+        """
+        Add the expense for a recurring transaction and mark it applied in one transaction.
+        Returns the new expense id, or None if it was already applied for the month.
+        """
+        with self._expenses_write() as conn:
+            with conn.transaction():
+                # Locking the recurring row serializes concurrent applies of the same item
+                recurring = conn.execute("""
+                    SELECT category, subcategory, amount, description
+                    FROM recurring_transactions WHERE id = %s FOR UPDATE
+                """, (recurring_id,)).fetchone()
+                if recurring is None:
+                    return None
+
+                applied = conn.execute(
+                    "SELECT 1 FROM applied_recurring WHERE recurring_id = %s AND month = %s", (recurring_id, month)
+                ).fetchone()
+                if applied:
+                    return None
+
+                expense = conn.execute("""
+                    INSERT INTO expenses (date, category, subcategory, amount, description, is_recurring)
+                    VALUES (%s, %s, %s, %s, %s, 1)
+                    RETURNING id
+                """, (
+                    date, recurring['category'], recurring['subcategory'], recurring['amount'],
+                    f"[Recurring] {recurring['description'] or ''}",
+                )).fetchone()
+
+                conn.execute(
+                    "INSERT INTO applied_recurring (recurring_id, month, expense_id) VALUES (%s, %s, %s)",
+                    (recurring_id, month, expense['id'])
+                )
+        return expense['id']
+
+    def is_recurring_applied(self, recurring_id: int, month: str) -> bool:
+        """Check if a recurring transaction has been applied for a specific month"""
+        with self.pool.connection() as conn:
+            row = conn.execute(
+                "SELECT 1 FROM applied_recurring WHERE recurring_id = %s AND month = %s", (recurring_id, month)
+            ).fetchone()
+        return row is not None
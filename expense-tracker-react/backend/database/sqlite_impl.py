@@ -2,31 +2,290 @@
 SQLite Database Implementation for Expense Tracker
 """
 
+import functools
+import json
+import random
 import sqlite3
-import pandas as pd
+import threading
+import time
+from contextlib import contextmanager, nullcontext
 from pathlib import Path
-from typing import Optional
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from database.base import BULK_EXPENSE_COLUMNS
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process only, the init lock becomes a no-op
+    fcntl = None
+
+# Columns shared by the hot expenses table and the per-year archive files
+EXPENSE_COLUMNS = "id, date, category, subcategory, amount, description, is_recurring, created_at"
+
+# Archived rows also keep their sync row_version, so a row moved back is unchanged for /sync clients
+ARCHIVE_COLUMNS = f"{EXPENSE_COLUMNS}, row_version"
+
+EXPENSES_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS {table} (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        date TEXT NOT NULL,
+        category TEXT NOT NULL,
+        subcategory TEXT NOT NULL,
+        amount REAL NOT NULL,
+        description TEXT,
+        is_recurring INTEGER DEFAULT 0,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        row_version INTEGER
+    )
+"""
+
+# Seconds a connection waits on a locked database before SQLITE_BUSY is raised
+BUSY_TIMEOUT = 5.0
+
+# Write methods that still hit SQLITE_BUSY are retried with jittered exponential backoff
+BUSY_RETRIES = 5
+BUSY_RETRY_DELAY = 0.05
+
+
+def _is_busy(error: sqlite3.OperationalError) -> bool:
+    code = getattr(error, "sqlite_errorcode", None)
+    return code in (sqlite3.SQLITE_BUSY, sqlite3.SQLITE_LOCKED) or "locked" in str(error)
+
+
+def retry_on_busy(method):
+    """
+    Re-run a write method when the database stays locked past BUSY_TIMEOUT.
+    Only safe for methods that commit once at the end: a failed attempt's
+    transaction is rolled back when its connection is released.
+    """
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        delay = BUSY_RETRY_DELAY
+        for attempt in range(BUSY_RETRIES):
+            try:
+                return method(*args, **kwargs)
+            except sqlite3.OperationalError as e:
+                if not _is_busy(e) or attempt == BUSY_RETRIES - 1:
+                    raise
+            time.sleep(delay * (1 + random.random()))
+            delay *= 2
+    return wrapper
+
+
+# Keep the full-text index and the per-day mood counts in step with journal_entries
+JOURNAL_TRIGGERS_SQL = [
+    """
+    CREATE TRIGGER IF NOT EXISTS journal_entries_ai AFTER INSERT ON journal_entries BEGIN
+        INSERT INTO journal_fts (rowid, title, content) VALUES (new.id, new.title, new.content);
+        INSERT INTO journal_mood_daily (date, mood, count)
+        SELECT new.date, new.mood, 1 WHERE new.mood IS NOT NULL
+        ON CONFLICT(date, mood) DO UPDATE SET count = count + 1;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS journal_entries_ad AFTER DELETE ON journal_entries BEGIN
+        INSERT INTO journal_fts (journal_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content);
+        UPDATE journal_mood_daily SET count = count - 1 WHERE date = old.date AND mood = old.mood;
+        DELETE FROM journal_mood_daily WHERE date = old.date AND mood = old.mood AND count <= 0;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS journal_entries_au AFTER UPDATE ON journal_entries BEGIN
+        INSERT INTO journal_fts (journal_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content);
+        INSERT INTO journal_fts (rowid, title, content) VALUES (new.id, new.title, new.content);
+        UPDATE journal_mood_daily SET count = count - 1 WHERE date = old.date AND mood = old.mood;
+        DELETE FROM journal_mood_daily WHERE date = old.date AND mood = old.mood AND count <= 0;
+        INSERT INTO journal_mood_daily (date, mood, count)
+        SELECT new.date, new.mood, 1 WHERE new.mood IS NOT NULL
+        ON CONFLICT(date, mood) DO UPDATE SET count = count + 1;
+    END
+    """,
+]
+
+# Tables served by /sync; each row carries the sync version of its last change in row_version
+SYNC_TABLES = ("expenses", "budgets", "recurring_transactions")
+
+# Every insert/update/delete bumps the global sync version and stamps it on the row, or on a
+# tombstone for deletes. The update trigger skips the stamping update itself (row_version changes).
+# Archiving puts a row in sync_suppress inside its transaction so moved rows don't look deleted.
+SYNC_TRIGGERS_SQL = [
+    """
+    CREATE TRIGGER IF NOT EXISTS {table}_sync_ai AFTER INSERT ON {table}
+    WHEN NOT EXISTS (SELECT 1 FROM sync_suppress) BEGIN
+        UPDATE sync_version SET version = version + 1 WHERE id = 1;
+        UPDATE {table} SET row_version = (SELECT version FROM sync_version WHERE id = 1) WHERE id = new.id;
+        DELETE FROM sync_tombstones WHERE table_name = '{table}' AND row_id = new.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS {table}_sync_au AFTER UPDATE ON {table}
+    WHEN new.row_version IS old.row_version AND NOT EXISTS (SELECT 1 FROM sync_suppress) BEGIN
+        UPDATE sync_version SET version = version + 1 WHERE id = 1;
+        UPDATE {table} SET row_version = (SELECT version FROM sync_version WHERE id = 1) WHERE id = new.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS {table}_sync_ad AFTER DELETE ON {table}
+    WHEN NOT EXISTS (SELECT 1 FROM sync_suppress) BEGIN
+        UPDATE sync_version SET version = version + 1 WHERE id = 1;
+        INSERT OR REPLACE INTO sync_tombstones (table_name, row_id, version)
+        VALUES ('{table}', old.id, (SELECT version FROM sync_version WHERE id = 1));
+    END
+    """,
+]
+
+
+class _WatchedConnection(sqlite3.Connection):
+    """
+    Connection of a watch_changes database that reports its own commits on close, so
+    data_version() counts only the writes of other connections (other workers)
+    """
+
+    def watch(self, db: "SQLiteDatabase"):
+        self._db = db
+        # Taken before data_version() catches up, so any commit from here on shows up below
+        self.start_version = self.data_version()
+        db.data_version()
+
+    def data_version(self) -> int:
+        return self.execute("PRAGMA data_version").fetchone()[0]
+
+    def close(self):
+        db, self._db = getattr(self, "_db", None), None
+        # Uncommitted writes are rolled back by close; a commit already made then counts as foreign
+        if db is not None and self.total_changes and not self.in_transaction:
+            db._absorb_own_commits(self)
+        super().close()
 
 
 class SQLiteDatabase:
     """SQLite database for expense tracking"""
 
-    def __init__(self, db_path: str):
-        """Initialize database with path"""
+    def __init__(self, db_path: str, archive_dir: Optional[str] = None, watch_changes: bool = False):
+        """
+        Initialize database with path; closed months can be archived into archive_dir.
+        watch_changes enables data_version() for processes sharing the file with other workers.
+        """
         self.db_path = db_path
+        self.archive_dir = Path(archive_dir) if archive_dir else Path(db_path).parent / "archive"
+        self.watch_changes = watch_changes
+        self._watch_conn = None
+        self._watch_lock = threading.Lock()
+        self._watch_seen = None  # PRAGMA data_version of _watch_conn already accounted for
+        self._foreign_writes = 0
 
         # Create directory if it doesn't exist
         Path(db_path).parent.mkdir(parents=True, exist_ok=True)
 
-        # Initialize tables
-        self._init_tables()
+        # Initialize tables (once, even when several workers start together)
+        with self.init_lock():
+            self._init_tables()
+            self._migrate_archives()
 
     def _get_connection(self):
         """Get database connection"""
-        conn = sqlite3.connect(self.db_path)
+        factory = _WatchedConnection if self.watch_changes else sqlite3.Connection
+        conn = sqlite3.connect(self.db_path, uri=True, timeout=BUSY_TIMEOUT, factory=factory)
         conn.row_factory = sqlite3.Row
+        if self.watch_changes:
+            conn.watch(self)
         return conn
 
+    def init_lock(self):
+        """Exclusive cross-process lock for one-time setup (schema, default rows)"""
+        return self._file_lock(".lock")
+
+    def archive_lock(self):
+        """
+        Exclusive cross-process lock held while rows move between the hot table and the
+        archive files, and while a backup copies them, so a snapshot never sees a row in
+        both places (or in neither)
+        """
+        return self._file_lock(".archive.lock")
+
+    @contextmanager
+    def _file_lock(self, suffix: str):
+        if fcntl is None:
+            yield
+            return
+
+        with open(str(self.db_path) + suffix, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    @contextmanager
+    def _transaction(self, archives: List[dict] = ()):
+        """
+        Cursor inside a BEGIN IMMEDIATE transaction, committed on success and rolled back on error.
+        The given archive partitions are attached first (as archive_<year>), since SQLite
+        can't attach inside a transaction, and the archive lock is held throughout.
+        """
+        with self.archive_lock() if archives else nullcontext():
+            conn = self._get_connection()
+            conn.isolation_level = None
+            cursor = conn.cursor()
+
+            try:
+                for partition in archives:
+                    cursor.execute(
+                        f"ATTACH DATABASE ? AS archive_{partition['year']}",
+                        (str(self._archive_path(partition['file_name'])),)
+                    )
+                cursor.execute("BEGIN IMMEDIATE")
+                yield cursor
+                cursor.execute("COMMIT")
+            except Exception:
+                if conn.in_transaction:
+                    cursor.execute("ROLLBACK")
+                raise
+            finally:
+                conn.close()
+
+    def data_version(self) -> int:
+        """
+        Counter that changes whenever another worker (or a connection of this instance
+        overlapping the change) commits; this instance's own commits are left out.
+        Caches compare it to the value seen when they were built. Always 0 unless
+        watch_changes is set, since a single process keeps its caches current itself.
+        """
+        if not self.watch_changes:
+            return 0
+
+        with self._watch_lock:
+            if self._watch_conn is None:
+                # data_version is per connection, so the same one must be polled every time
+                self._watch_conn = sqlite3.connect(self.db_path, uri=True, timeout=BUSY_TIMEOUT, check_same_thread=False)
+            seen = self._watch_conn.execute("PRAGMA data_version").fetchone()[0]
+            if self._watch_seen is not None and seen != self._watch_seen:
+                self._foreign_writes += 1
+            self._watch_seen = seen
+            return self._foreign_writes
+
+    def _absorb_own_commits(self, conn: _WatchedConnection):
+        """
+        Account for the commits of conn (closing) as seen, unless anything else committed
+        since it opened: conn's own data_version only moves for other connections' commits,
+        so read after the watch connection's it proves every change that one sees is conn's
+        """
+        with self._watch_lock:
+            if self._watch_conn is None:
+                return
+            seen = self._watch_conn.execute("PRAGMA data_version").fetchone()[0]
+            if conn.data_version() == conn.start_version:
+                self._watch_seen = seen
+
+    def close(self):
+        """Close the data_version watch connection; every other connection is per call"""
+        with self._watch_lock:
+            if self._watch_conn is not None:
+                self._watch_conn.close()
+                self._watch_conn = None
+
     def _init_tables(self):
         """Initialize database tables"""
         conn = self._get_connection()
@@ -41,19 +300,13 @@ class SQLiteDatabase:
             cursor.execute("ALTER TABLE expenses ADD COLUMN is_recurring INTEGER DEFAULT 0")
             conn.commit()
 
+        # WAL lets readers in other workers run while one process writes (persists in the file)
+        cursor.execute("PRAGMA journal_mode=WAL")
+
         # Expenses table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS expenses (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                date TEXT NOT NULL,
-                category TEXT NOT NULL,
-                subcategory TEXT NOT NULL,
-                amount REAL NOT NULL,
-                description TEXT,
-                is_recurring INTEGER DEFAULT 0,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
+        cursor.execute(EXPENSES_TABLE_SQL.format(table="expenses"))
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_expenses_date ON expenses(date)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_expenses_subcategory_date ON expenses(subcategory, date)")
 
         # Budgets table
         cursor.execute("""
@@ -94,32 +347,255 @@ class SQLiteDatabase:
             )
         """)
 
-        conn.commit()
-        conn.close()
+        # Change log: every mutation of expenses, budgets and recurring transactions, appended
+        # in the mutation's own transaction (AUTOINCREMENT so ids are never reused after pruning)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS change_log (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                table_name TEXT NOT NULL,
+                op TEXT NOT NULL,
+                row_id INTEGER,
+                old TEXT,
+                new TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
 
-    # ============= Expenses =============
+        # Sync versions: one global counter, a row_version on every synced row, tombstones for deletes
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS sync_version (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                version INTEGER NOT NULL
+            )
+        """)
+        cursor.execute("INSERT OR IGNORE INTO sync_version (id, version) VALUES (1, 1)")
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS sync_tombstones (
+                table_name TEXT NOT NULL,
+                row_id INTEGER NOT NULL,
+                version INTEGER NOT NULL,
+                PRIMARY KEY (table_name, row_id)
+            ) WITHOUT ROWID
+        """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_sync_tombstones_version ON sync_tombstones(version)")
+        cursor.execute("CREATE TABLE IF NOT EXISTS sync_suppress (flag INTEGER)")
+
+        for table in SYNC_TABLES:
+            cursor.execute(f"PRAGMA table_info({table})")
+            if 'row_version' not in [row[1] for row in cursor.fetchall()]:
+                # Migration: existing rows start at version 1, so a sync from 0 returns them all
+                cursor.execute(f"ALTER TABLE {table} ADD COLUMN row_version INTEGER")
+                cursor.execute(f"UPDATE {table} SET row_version = 1")
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_row_version ON {table}(row_version)")
+            for statement in SYNC_TRIGGERS_SQL:
+                cursor.execute(statement.format(table=table))
+
+        # Expense anomalies table (probable duplicates and statistical outliers)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS expense_anomalies (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                expense_id INTEGER NOT NULL,
+                kind TEXT NOT NULL,
+                score REAL NOT NULL,
+                related_expense_id INTEGER,
+                detected_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                UNIQUE(expense_id, kind)
+            )
+        """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_expense_anomalies_related ON expense_anomalies(related_expense_id)")
 
-    def add_expense(self, date: str, category: str, subcategory: str, amount: float, description: str = "", is_recurring: bool = False):
-        """Add a new expense"""
-        conn = self._get_connection()
-        cursor = conn.cursor()
+        # Habits table
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS habits (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT NOT NULL,
+                description TEXT,
+                frequency TEXT NOT NULL DEFAULT 'daily',
+                is_active INTEGER DEFAULT 1,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+
+        # Habit completions table (one bitset per habit per year, bit n = day-of-year n + 1)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS habit_completions (
+                habit_id INTEGER NOT NULL,
+                year INTEGER NOT NULL,
+                bits BLOB NOT NULL,
+                PRIMARY KEY (habit_id, year),
+                FOREIGN KEY (habit_id) REFERENCES habits(id)
+            ) WITHOUT ROWID
+        """)
+
+        # Savings assets table (accounts and investments, with their running current value)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS savings_assets (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                kind TEXT NOT NULL CHECK (kind IN ('account', 'investment')),
+                name TEXT NOT NULL,
+                asset_type TEXT NOT NULL,
+                quantity REAL NOT NULL DEFAULT 1,
+                cost_basis REAL NOT NULL DEFAULT 0,
+                current_value REAL NOT NULL DEFAULT 0,
+                value_date TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+
+        # Savings ledger table (append-only balance/price snapshots, value per unit)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS savings_ledger (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                asset_id INTEGER NOT NULL,
+                date TEXT NOT NULL,
+                unit_value REAL NOT NULL,
+                recorded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (asset_id) REFERENCES savings_assets(id)
+            )
+        """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_savings_ledger_asset_date ON savings_ledger(asset_id, date)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_savings_ledger_date ON savings_ledger(date, id)")
+
+        # Net worth totals table (running aggregates per asset type)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS net_worth_totals (
+                asset_type TEXT PRIMARY KEY,
+                current_value REAL NOT NULL DEFAULT 0,
+                cost_basis REAL NOT NULL DEFAULT 0
+            )
+        """)
+
+        # Net worth daily table (one precomputed point per day from the first snapshot on)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS net_worth_daily (
+                date TEXT PRIMARY KEY,
+                net_worth REAL NOT NULL
+            ) WITHOUT ROWID
+        """)
+
+        # Journal entries table
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS journal_entries (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                date TEXT NOT NULL,
+                title TEXT NOT NULL DEFAULT '',
+                content TEXT NOT NULL,
+                mood TEXT,
+                entry_type TEXT NOT NULL DEFAULT 'entry',
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_journal_entries_date ON journal_entries(date, id)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_journal_entries_mood_date ON journal_entries(mood, date)")
+
+        # Journal tags table
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS journal_tags (
+                tag TEXT NOT NULL,
+                entry_id INTEGER NOT NULL,
+                PRIMARY KEY (tag, entry_id),
+                FOREIGN KEY (entry_id) REFERENCES journal_entries(id)
+            ) WITHOUT ROWID
+        """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_journal_tags_entry ON journal_tags(entry_id)")
+
+        # Journal full-text index (trigram tokens also match CJK text and substrings)
+        cursor.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS journal_fts USING fts5(
+                title, content, content='journal_entries', content_rowid='id', tokenize='trigram'
+            )
+        """)
+
+        # Journal mood counts table (per-day aggregates kept current by triggers)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS journal_mood_daily (
+                date TEXT NOT NULL,
+                mood TEXT NOT NULL,
+                count INTEGER NOT NULL,
+                PRIMARY KEY (date, mood)
+            ) WITHOUT ROWID
+        """)
+
+        for statement in JOURNAL_TRIGGERS_SQL:
+            cursor.execute(statement)
+
+        # Forecast models table (fitted month-end projection curves, one per month)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS forecast_models (
+                month TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                fitted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
 
+        # Archive partitions table (closed months moved into per-year SQLite files)
         cursor.execute("""
-            INSERT INTO expenses (date, category, subcategory, amount, description, is_recurring)
-            VALUES (?, ?, ?, ?, ?, ?)
-        """, (date, category, subcategory, amount, description, 1 if is_recurring else 0))
+            CREATE TABLE IF NOT EXISTS archive_partitions (
+                year INTEGER PRIMARY KEY,
+                file_name TEXT NOT NULL,
+                min_date TEXT NOT NULL,
+                max_date TEXT NOT NULL,
+                min_id INTEGER NOT NULL,
+                max_id INTEGER NOT NULL,
+                row_count INTEGER NOT NULL,
+                archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
 
-        expense_id = cursor.lastrowid
         conn.commit()
         conn.close()
 
+    # ============= Expenses =============
+
+    @retry_on_busy
+    def add_expense(self, date: str, category: str, subcategory: str, amount: float, description: str = "", is_recurring: bool = False):
+        """Add a new expense"""
+        with self._transaction() as cursor:
+            cursor.execute("""
+                INSERT INTO expenses (date, category, subcategory, amount, description, is_recurring)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (date, category, subcategory, amount, description, 1 if is_recurring else 0))
+            expense_id = cursor.lastrowid
+            self._log_change(cursor, "expenses", "insert", expense_id, new=self._get_row(cursor, "expenses", expense_id))
+
         return expense_id
 
     def get_expenses(self, start_date: Optional[str] = None, end_date: Optional[str] = None, exclude_recurring: bool = False) -> pd.DataFrame:
         """Get expenses, optionally filtered by date range and excluding recurring"""
         conn = self._get_connection()
+        where_clause, params = self._expense_filters(start_date, end_date, exclude_recurring)
+
+        # Only mount the archive files whose date range overlaps the request
+        partitions = self._get_archive_partitions(conn, start_date, end_date)
+
+        if not partitions:
+            query = f"SELECT {EXPENSE_COLUMNS} FROM expenses WHERE {where_clause} ORDER BY date DESC"
+            df = pd.read_sql_query(query, conn, params=tuple(params))
+        else:
+            frames = []
+            max_attached = conn.getlimit(sqlite3.SQLITE_LIMIT_ATTACHED)
+            for i in range(0, len(partitions), max_attached):
+                group = partitions[i:i + max_attached]
+                source = self._attach_archives(conn, group, include_hot=(i == 0))
+                query = f"SELECT * FROM {source} WHERE {where_clause} ORDER BY date DESC"
+                frames.append(pd.read_sql_query(query, conn, params=tuple(params)))
+                self._detach_archives(conn, group)
+
+            df = frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True)
+            if len(frames) > 1:
+                df = df.sort_values('date', ascending=False, kind='stable', ignore_index=True)
+
+        conn.close()
+
+        # Convert date column to datetime
+        if not df.empty:
+            df['date'] = pd.to_datetime(df['date'])
 
-        # Build WHERE clause
+        return df
+
+    def _expense_filters(self, start_date: Optional[str], end_date: Optional[str], exclude_recurring: bool):
+        """WHERE clause and parameters shared by the expense queries"""
         where_clauses = []
         params = []
 
@@ -136,48 +612,84 @@ class SQLiteDatabase:
         if exclude_recurring:
             where_clauses.append("is_recurring = 0")
 
-        where_clause = " AND ".join(where_clauses) if where_clauses else "1=1"
-        query = f"SELECT * FROM expenses WHERE {where_clause} ORDER BY date DESC"
+        return (" AND ".join(where_clauses) if where_clauses else "1=1"), params
 
-        if params:
-            df = pd.read_sql_query(query, conn, params=tuple(params))
+    def get_category_totals(self, start_date: Optional[str] = None, end_date: Optional[str] = None, exclude_recurring: bool = False) -> Dict[str, float]:
+        """Total spending per category, grouped in SQL (archives included)"""
+        conn = self._get_connection()
+        where_clause, params = self._expense_filters(start_date, end_date, exclude_recurring)
+        query = "SELECT category, SUM(amount) AS total FROM {source} WHERE {where} GROUP BY category"
+
+        totals: Dict[str, float] = {}
+        partitions = self._get_archive_partitions(conn, start_date, end_date)
+        if not partitions:
+            rows = conn.execute(query.format(source="expenses", where=where_clause), params).fetchall()
         else:
-            df = pd.read_sql_query(query, conn)
+            rows = []
+            max_attached = conn.getlimit(sqlite3.SQLITE_LIMIT_ATTACHED)
+            for i in range(0, len(partitions), max_attached):
+                group = partitions[i:i + max_attached]
+                source = self._attach_archives(conn, group, include_hot=(i == 0))
+                rows += conn.execute(query.format(source=source, where=where_clause), params).fetchall()
+                self._detach_archives(conn, group)
 
         conn.close()
+        for row in rows:
+            totals[row['category']] = totals.get(row['category'], 0.0) + row['total']
+        return totals
+
+    @retry_on_busy
+    def add_expenses_bulk(self, expenses: pd.DataFrame) -> int:
+        """Insert many expenses with one executemany in a single transaction"""
+        rows = expenses.reindex(columns=list(BULK_EXPENSE_COLUMNS))
+        rows['description'] = rows['description'].fillna("")
+        rows['is_recurring'] = rows['is_recurring'].fillna(0).astype(int)
+        rows['date'] = pd.to_datetime(rows['date']).dt.strftime("%Y-%m-%d")
+
+        with self._transaction() as cursor:
+            cursor.executemany(
+                f"INSERT INTO expenses ({', '.join(BULK_EXPENSE_COLUMNS)}) VALUES (?, ?, ?, ?, ?, ?)",
+                rows.itertuples(index=False, name=None)
+            )
+            # One summary entry instead of one per row; clients refetch the affected range
+            if len(rows):
+                self._log_change(cursor, "expenses", "bulk_insert", None, new={
+                    "count": len(rows), "min_date": rows['date'].min(), "max_date": rows['date'].max(),
+                })
 
-        # Convert date column to datetime
-        if not df.empty:
-            df['date'] = pd.to_datetime(df['date'])
-
-        return df
+        return len(rows)
 
+    @retry_on_busy
     def delete_expense(self, expense_id: int):
         """Delete an expense by ID"""
-        conn = self._get_connection()
-        cursor = conn.cursor()
-
-        cursor.execute("DELETE FROM expenses WHERE id = ?", (expense_id,))
+        archives = self._archives_holding([expense_id])
 
-        conn.commit()
-        conn.close()
+        with self._transaction(archives) as cursor:
+            old = self._get_row(cursor, "expenses", expense_id) or self._unarchive_expense(cursor, expense_id, archives)
+            if old is None:
+                return
+            cursor.execute("DELETE FROM expenses WHERE id = ?", (expense_id,))
+            self._log_change(cursor, "expenses", "delete", expense_id, old=old)
 
+    @retry_on_busy
     def update_expense(self, expense_id: int, date: str, category: str, subcategory: str, amount: float, description: str = ""):
         """Update an existing expense"""
-        conn = self._get_connection()
-        cursor = conn.cursor()
+        archives = self._archives_holding([expense_id])
 
-        cursor.execute("""
-            UPDATE expenses
-            SET date = ?, category = ?, subcategory = ?, amount = ?, description = ?
-            WHERE id = ?
-        """, (date, category, subcategory, amount, description, expense_id))
+        with self._transaction(archives) as cursor:
+            old = self._get_row(cursor, "expenses", expense_id) or self._unarchive_expense(cursor, expense_id, archives)
+            if old is None:
+                return False
 
-        conn.commit()
-        rows_affected = cursor.rowcount
-        conn.close()
+            cursor.execute("""
+                UPDATE expenses
+                SET date = ?, category = ?, subcategory = ?, amount = ?, description = ?
+                WHERE id = ?
+            """, (date, category, subcategory, amount, description, expense_id))
+            new = self._get_row(cursor, "expenses", expense_id)
+            self._log_change(cursor, "expenses", "update", expense_id, old=old, new=new)
 
-        return rows_affected > 0
+        return True
 
     def get_expense_by_id(self, expense_id: int) -> Optional[dict]:
         """Get a specific expense by ID"""
@@ -187,6 +699,9 @@ class SQLiteDatabase:
         cursor.execute("SELECT * FROM expenses WHERE id = ?", (expense_id,))
         row = cursor.fetchone()
 
+        if row is None:
+            row = self._get_archived_expense(conn, expense_id)
+
         conn.close()
 
         if row:
@@ -195,18 +710,26 @@ class SQLiteDatabase:
 
     # ============= Budgets =============
 
+    @retry_on_busy
     def set_budget(self, month: str, category: str, amount: float):
         """Set budget for a category in a specific month"""
-        conn = self._get_connection()
-        cursor = conn.cursor()
-
-        cursor.execute("""
-            INSERT OR REPLACE INTO budgets (month, category, amount)
-            VALUES (?, ?, ?)
-        """, (month, category, amount))
-
-        conn.commit()
-        conn.close()
+        with self._transaction() as cursor:
+            cursor.execute("SELECT * FROM budgets WHERE month = ? AND category = ?", (month, category))
+            old = cursor.fetchone()
+
+            # Upsert in place so the budget keeps its id across changes
+            cursor.execute("""
+                INSERT INTO budgets (month, category, amount)
+                VALUES (?, ?, ?)
+                ON CONFLICT(month, category) DO UPDATE SET amount = excluded.amount
+            """, (month, category, amount))
+            cursor.execute("SELECT * FROM budgets WHERE month = ? AND category = ?", (month, category))
+            new = dict(cursor.fetchone())
+
+            if old is None:
+                self._log_change(cursor, "budgets", "insert", new['id'], new=new)
+            else:
+                self._log_change(cursor, "budgets", "update", new['id'], old=dict(old), new=new)
 
     def get_budget(self, month: str, category: str) -> Optional[float]:
         """Get budget for a category in a specific month"""
@@ -242,19 +765,19 @@ class SQLiteDatabase:
 
     # ============= Recurring Transactions =============
 
+    @retry_on_busy
     def add_recurring_transaction(self, category: str, subcategory: str, amount: float, description: str = ""):
         """Add a new recurring transaction"""
-        conn = self._get_connection()
-        cursor = conn.cursor()
-
-        cursor.execute("""
-            INSERT INTO recurring_transactions (category, subcategory, amount, description)
-            VALUES (?, ?, ?, ?)
-        """, (category, subcategory, amount, description))
-
-        recurring_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
+        with self._transaction() as cursor:
+            cursor.execute("""
+                INSERT INTO recurring_transactions (category, subcategory, amount, description)
+                VALUES (?, ?, ?, ?)
+            """, (category, subcategory, amount, description))
+            recurring_id = cursor.lastrowid
+            self._log_change(
+                cursor, "recurring_transactions", "insert", recurring_id,
+                new=self._get_row(cursor, "recurring_transactions", recurring_id)
+            )
 
         return recurring_id
 
@@ -278,45 +801,39 @@ class SQLiteDatabase:
         conn.close()
         return df
 
+    @retry_on_busy
     def update_recurring_amount(self, recurring_id: int, amount: float):
         """Update recurring transaction amount"""
-        conn = self._get_connection()
-        cursor = conn.cursor()
-
-        cursor.execute("""
-            UPDATE recurring_transactions
-            SET amount = ?
-            WHERE id = ?
-        """, (amount, recurring_id))
-
-        conn.commit()
-        conn.close()
+        self._update_recurring(recurring_id, "amount", amount)
 
+    @retry_on_busy
     def toggle_recurring_active(self, recurring_id: int, is_active: bool):
         """Toggle recurring transaction active status"""
-        conn = self._get_connection()
-        cursor = conn.cursor()
+        self._update_recurring(recurring_id, "is_active", 1 if is_active else 0)
 
-        cursor.execute("""
-            UPDATE recurring_transactions
-            SET is_active = ?
-            WHERE id = ?
-        """, (1 if is_active else 0, recurring_id))
+    def _update_recurring(self, recurring_id: int, column: str, value):
+        """Set one column of a recurring transaction and log the change"""
+        with self._transaction() as cursor:
+            old = self._get_row(cursor, "recurring_transactions", recurring_id)
+            if old is None:
+                return
 
-        conn.commit()
-        conn.close()
+            cursor.execute(f"UPDATE recurring_transactions SET {column} = ? WHERE id = ?", (value, recurring_id))
+            new = self._get_row(cursor, "recurring_transactions", recurring_id)
+            self._log_change(cursor, "recurring_transactions", "update", recurring_id, old=old, new=new)
 
+    @retry_on_busy
     def delete_recurring_transaction(self, recurring_id: int):
         """Delete a recurring transaction"""
-        conn = self._get_connection()
-        cursor = conn.cursor()
+        with self._transaction() as cursor:
+            old = self._get_row(cursor, "recurring_transactions", recurring_id)
 
-        # Also delete any applied records
-        cursor.execute("DELETE FROM applied_recurring WHERE recurring_id = ?", (recurring_id,))
-        cursor.execute("DELETE FROM recurring_transactions WHERE id = ?", (recurring_id,))
+            # Also delete any applied records
+            cursor.execute("DELETE FROM applied_recurring WHERE recurring_id = ?", (recurring_id,))
+            cursor.execute("DELETE FROM recurring_transactions WHERE id = ?", (recurring_id,))
 
-        conn.commit()
-        conn.close()
+            if old is not None:
+                self._log_change(cursor, "recurring_transactions", "delete", recurring_id, old=old)
 
     def get_applied_recurring(self, month: str) -> pd.DataFrame:
         """Get applied recurring transactions for a month"""
@@ -331,6 +848,7 @@ class SQLiteDatabase:
         conn.close()
         return df
 
+    @retry_on_busy
     def mark_recurring_applied(self, recurring_id: int, month: str, expense_id: int):
         """Mark a recurring transaction as applied for a specific month"""
         conn = self._get_connection()
@@ -344,6 +862,52 @@ class SQLiteDatabase:
         conn.commit()
         conn.close()
 
+    @retry_on_busy
+    def apply_recurring(self, recurring_id: int, month: str, date: str) -> Optional[int]:
+        """
+        Add the expense for a recurring transaction and mark it applied in one transaction.
+        Returns the new expense id, or None if it was already applied for the month
+        (by this or any other process).
+        """
+        conn = self._get_connection()
+        conn.isolation_level = None
+        cursor = conn.cursor()
+
+        try:
+            # The write lock makes check-then-insert atomic across processes
+            cursor.execute("BEGIN IMMEDIATE")
+            cursor.execute("""
+                SELECT 1 FROM applied_recurring WHERE recurring_id = ? AND month = ?
+            """, (recurring_id, month))
+            if cursor.fetchone():
+                cursor.execute("ROLLBACK")
+                return None
+
+            cursor.execute("""
+                INSERT INTO expenses (date, category, subcategory, amount, description, is_recurring)
+                SELECT ?, category, subcategory, amount, '[Recurring] ' || COALESCE(description, ''), 1
+                FROM recurring_transactions WHERE id = ?
+            """, (date, recurring_id))
+            if cursor.rowcount == 0:
+                cursor.execute("ROLLBACK")
+                return None
+            expense_id = cursor.lastrowid
+            self._log_change(cursor, "expenses", "insert", expense_id, new=self._get_row(cursor, "expenses", expense_id))
+
+            cursor.execute("""
+                INSERT INTO applied_recurring (recurring_id, month, expense_id)
+                VALUES (?, ?, ?)
+            """, (recurring_id, month, expense_id))
+            cursor.execute("COMMIT")
+        except Exception:
+            if conn.in_transaction:
+                cursor.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+        return expense_id
+
     def is_recurring_applied(self, recurring_id: int, month: str) -> bool:
         """Check if a recurring transaction has been applied for a specific month"""
         conn = self._get_connection()
@@ -358,3 +922,1244 @@ class SQLiteDatabase:
         conn.close()
 
         return row['count'] > 0
+
+    # ============= Habits =============
+
+    @retry_on_busy
+    def add_habit(self, name: str, description: str = "", frequency: str = "daily"):
+        """Add a new habit"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute("""
+            INSERT INTO habits (name, description, frequency)
+            VALUES (?, ?, ?)
+        """, (name, description, frequency))
+
+        habit_id = cursor.lastrowid
+        conn.commit()
+        conn.close()
+
+        return habit_id
+
+    def get_habits(self, active_only: bool = False) -> pd.DataFrame:
+        """Get all habits"""
+        conn = self._get_connection()
+        query = "SELECT * FROM habits"
+        if active_only:
+            query += " WHERE is_active = 1"
+        df = pd.read_sql_query(query + " ORDER BY id", conn)
+        conn.close()
+        return df
+
+    def get_habit_by_id(self, habit_id: int) -> Optional[dict]:
+        """Get a specific habit by ID"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute("SELECT * FROM habits WHERE id = ?", (habit_id,))
+        row = cursor.fetchone()
+        conn.close()
+
+        if row:
+            return dict(row)
+        return None
+
+    @retry_on_busy
+    def update_habit(self, habit_id: int, name: Optional[str] = None, description: Optional[str] = None, is_active: Optional[bool] = None) -> bool:
+        """Update habit fields that are not None"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute("""
+            UPDATE habits
+            SET name = COALESCE(?, name),
+                description = COALESCE(?, description),
+                is_active = COALESCE(?, is_active)
+            WHERE id = ?
+        """, (name, description, None if is_active is None else (1 if is_active else 0), habit_id))
+
+        rows_affected = cursor.rowcount
+        conn.commit()
+        conn.close()
+
+        return rows_affected > 0
+
+    @retry_on_busy
+    def delete_habit(self, habit_id: int):
+        """Delete a habit and its completion history"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute("DELETE FROM habit_completions WHERE habit_id = ?", (habit_id,))
+        cursor.execute("DELETE FROM habits WHERE id = ?", (habit_id,))
+
+        conn.commit()
+        conn.close()
+
+    def get_habit_bitsets(self, habit_id: int, start_year: Optional[int] = None, end_year: Optional[int] = None) -> Dict[int, int]:
+        """Get completion bitsets for a habit as {year: int}"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute("""
+            SELECT year, bits FROM habit_completions
+            WHERE habit_id = ? AND (? IS NULL OR year >= ?) AND (? IS NULL OR year <= ?)
+            ORDER BY year
+        """, (habit_id, start_year, start_year, end_year, end_year))
+
+        bitsets = {row['year']: int.from_bytes(row['bits'], "little") for row in cursor.fetchall()}
+        conn.close()
+        return bitsets
+
+    @retry_on_busy
+    def update_habit_bitsets(self, updates: Dict[tuple, tuple]):
+        """
+        Apply {(habit_id, year): (set_mask, clear_mask)} in a single write transaction.
+        Each bitset is read, modified and written back once regardless of how many days changed.
+        """
+        conn = self._get_connection()
+        conn.isolation_level = None
+        cursor = conn.cursor()
+
+        try:
+            # Take the write lock up front so concurrent batches can't lose each other's bits
+            cursor.execute("BEGIN IMMEDIATE")
+            for (habit_id, year), (set_mask, clear_mask) in updates.items():
+                cursor.execute("""
+                    SELECT bits FROM habit_completions
+                    WHERE habit_id = ? AND year = ?
+                """, (habit_id, year))
+                row = cursor.fetchone()
+
+                bits = int.from_bytes(row['bits'], "little") if row else 0
+                bits = (bits | set_mask) & ~clear_mask
+
+                cursor.execute("""
+                    INSERT OR REPLACE INTO habit_completions (habit_id, year, bits)
+                    VALUES (?, ?, ?)
+                """, (habit_id, year, bits.to_bytes(46, "little")))
+            cursor.execute("COMMIT")
+        except Exception:
+            if conn.in_transaction:
+                cursor.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    # ============= Savings & Investments =============
+
+    @retry_on_busy
+    def add_savings_asset(self, kind: str, name: str, asset_type: str, quantity: float, cost_basis: float, unit_value: float, date: str):
+        """Add an account or investment together with its first ledger snapshot"""
+        conn = self._get_connection()
+        conn.isolation_level = None
+        cursor = conn.cursor()
+
+        try:
+            cursor.execute("BEGIN IMMEDIATE")
+            cursor.execute("""
+                INSERT INTO savings_assets (kind, name, asset_type, quantity, cost_basis)
+                VALUES (?, ?, ?, ?, ?)
+            """, (kind, name, asset_type, quantity, cost_basis))
+            asset_id = cursor.lastrowid
+
+            cursor.execute("""
+                INSERT INTO net_worth_totals (asset_type, cost_basis) VALUES (?, ?)
+                ON CONFLICT(asset_type) DO UPDATE SET cost_basis = cost_basis + excluded.cost_basis
+            """, (asset_type, cost_basis))
+
+            self._apply_ledger_entries(cursor, [(asset_id, date, unit_value)])
+            cursor.execute("COMMIT")
+        except Exception:
+            if conn.in_transaction:
+                cursor.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+        return asset_id
+
+    def get_savings_assets(self, kind: Optional[str] = None) -> pd.DataFrame:
+        """Get accounts and/or investments with their current values"""
+        conn = self._get_connection()
+        if kind:
+            df = pd.read_sql_query("SELECT * FROM savings_assets WHERE kind = ? ORDER BY id", conn, params=(kind,))
+        else:
+            df = pd.read_sql_query("SELECT * FROM savings_assets ORDER BY id", conn)
+        conn.close()
+        return df
+
+    def get_savings_asset_by_id(self, asset_id: int) -> Optional[dict]:
+        """Get a specific account or investment by ID"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute("SELECT * FROM savings_assets WHERE id = ?", (asset_id,))
+        row = cursor.fetchone()
+        conn.close()
+
+        if row:
+            return dict(row)
+        return None
+
+    @retry_on_busy
+    def record_asset_values(self, entries: List[tuple]):
+        """Append [(asset_id, date, unit_value)] snapshots in a single write transaction"""
+        conn = self._get_connection()
+        conn.isolation_level = None
+        cursor = conn.cursor()
+
+        try:
+            cursor.execute("BEGIN IMMEDIATE")
+            self._apply_ledger_entries(cursor, entries)
+            cursor.execute("COMMIT")
+        except Exception:
+            if conn.in_transaction:
+                cursor.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def _apply_ledger_entries(self, cursor, entries: List[tuple]):
+        """
+        Append snapshots and fold their effect into the running aggregates.
+        A snapshot dated D changes the asset's value on every day from D up to its next
+        snapshot, so the daily points only need one range update per distinct range;
+        current values and per-type totals change only when D is the asset's latest date.
+        """
+        range_deltas = {}
+        type_deltas = {}
+        dates = []
+
+        for asset_id, date, unit_value in entries:
+            cursor.execute("""
+                SELECT asset_type, quantity, current_value, value_date
+                FROM savings_assets WHERE id = ?
+            """, (asset_id,))
+            asset = cursor.fetchone()
+
+            cursor.execute("""
+                SELECT unit_value FROM savings_ledger
+                WHERE asset_id = ? AND date <= ?
+                ORDER BY date DESC, id DESC LIMIT 1
+            """, (asset_id, date))
+            previous = cursor.fetchone()
+            cursor.execute("""
+                SELECT MIN(date) AS next_date FROM savings_ledger
+                WHERE asset_id = ? AND date > ?
+            """, (asset_id, date))
+            next_date = cursor.fetchone()['next_date']
+
+            cursor.execute("""
+                INSERT INTO savings_ledger (asset_id, date, unit_value)
+                VALUES (?, ?, ?)
+            """, (asset_id, date, unit_value))
+
+            value = asset['quantity'] * unit_value
+            delta = value - (asset['quantity'] * previous['unit_value'] if previous else 0.0)
+            range_deltas[(date, next_date)] = range_deltas.get((date, next_date), 0.0) + delta
+            dates.append(date)
+
+            if asset['value_date'] is None or date >= asset['value_date']:
+                cursor.execute("""
+                    UPDATE savings_assets SET current_value = ?, value_date = ?
+                    WHERE id = ?
+                """, (value, date, asset_id))
+                type_deltas[asset['asset_type']] = type_deltas.get(asset['asset_type'], 0.0) + value - asset['current_value']
+
+        for asset_type, delta in type_deltas.items():
+            cursor.execute("""
+                INSERT INTO net_worth_totals (asset_type, current_value) VALUES (?, ?)
+                ON CONFLICT(asset_type) DO UPDATE SET current_value = current_value + excluded.current_value
+            """, (asset_type, delta))
+
+        if dates:
+            self._extend_net_worth_daily(cursor, min(dates), max(dates))
+        for (start, end), delta in range_deltas.items():
+            cursor.execute("""
+                UPDATE net_worth_daily SET net_worth = net_worth + ?
+                WHERE date >= ? AND (? IS NULL OR date < ?)
+            """, (delta, start, end, end))
+
+    def _extend_net_worth_daily(self, cursor, start: str, end: str):
+        """Make sure there is a daily point for every day from start (or the first point) to end"""
+        cursor.execute("SELECT MIN(date) AS first, MAX(date) AS last FROM net_worth_daily")
+        bounds = cursor.fetchone()
+        fill = """
+            INSERT INTO net_worth_daily (date, net_worth)
+            WITH RECURSIVE days(day) AS (
+                SELECT ? UNION ALL SELECT date(day, '+1 day') FROM days WHERE day < ?
+            )
+            SELECT day, ? FROM days
+        """
+
+        if bounds['first'] is None:
+            cursor.execute(fill, (start, end, 0.0))
+            return
+
+        # Nothing was tracked before the first point; after the last one values carry forward
+        if start < bounds['first']:
+            cursor.execute(fill.replace("day < ?", "day < date(?, '-1 day')"), (start, bounds['first'], 0.0))
+        if end > bounds['last']:
+            cursor.execute("SELECT net_worth FROM net_worth_daily WHERE date = ?", (bounds['last'],))
+            last_value = cursor.fetchone()['net_worth']
+            cursor.execute(fill.replace("SELECT ? UNION", "SELECT date(?, '+1 day') UNION"), (bounds['last'], end, last_value))
+
+    def get_net_worth_totals(self) -> pd.DataFrame:
+        """Get running current value and cost basis per asset type"""
+        conn = self._get_connection()
+        df = pd.read_sql_query("SELECT * FROM net_worth_totals ORDER BY asset_type", conn)
+        conn.close()
+        return df
+
+    def get_net_worth_daily(self, start_date: Optional[str] = None, end_date: Optional[str] = None) -> pd.DataFrame:
+        """Get precomputed daily net worth points, optionally filtered by date range"""
+        conn = self._get_connection()
+        query = "SELECT date, net_worth FROM net_worth_daily WHERE 1=1"
+        params = []
+        if start_date:
+            query += " AND date >= ?"
+            params.append(start_date)
+        if end_date:
+            query += " AND date <= ?"
+            params.append(end_date)
+        df = pd.read_sql_query(query + " ORDER BY date", conn, params=params)
+        conn.close()
+        return df
+
+    def get_last_net_worth_point(self, before_date: str) -> Optional[float]:
+        """Get the latest daily net worth strictly before a date"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute("""
+            SELECT net_worth FROM net_worth_daily
+            WHERE date < ? ORDER BY date DESC LIMIT 1
+        """, (before_date,))
+        row = cursor.fetchone()
+        conn.close()
+
+        return row['net_worth'] if row else None
+
+    # ============= Journal =============
+
+    @retry_on_busy
+    def add_journal_entry(self, date: str, title: str, content: str, mood: Optional[str] = None, tags: Optional[List[str]] = None, entry_type: str = "entry"):
+        """Add a journal entry with its tags"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute("""
+            INSERT INTO journal_entries (date, title, content, mood, entry_type)
+            VALUES (?, ?, ?, ?, ?)
+        """, (date, title, content, mood, entry_type))
+        entry_id = cursor.lastrowid
+
+        cursor.executemany(
+            "INSERT OR IGNORE INTO journal_tags (tag, entry_id) VALUES (?, ?)",
+            [(tag, entry_id) for tag in tags or []]
+        )
+
+        conn.commit()
+        conn.close()
+
+        return entry_id
+
+    @retry_on_busy
+    def update_journal_entry(self, entry_id: int, title: str, content: str, mood: Optional[str] = None, tags: Optional[List[str]] = None) -> bool:
+        """Update a journal entry; tags are replaced only when given"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute("""
+            UPDATE journal_entries
+            SET title = ?, content = ?, mood = ?, updated_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+        """, (title, content, mood, entry_id))
+        rows_affected = cursor.rowcount
+
+        if rows_affected and tags is not None:
+            cursor.execute("DELETE FROM journal_tags WHERE entry_id = ?", (entry_id,))
+            cursor.executemany(
+                "INSERT OR IGNORE INTO journal_tags (tag, entry_id) VALUES (?, ?)",
+                [(tag, entry_id) for tag in tags]
+            )
+
+        conn.commit()
+        conn.close()
+
+        return rows_affected > 0
+
+    @retry_on_busy
+    def delete_journal_entry(self, entry_id: int):
+        """Delete a journal entry and its tags"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute("DELETE FROM journal_tags WHERE entry_id = ?", (entry_id,))
+        cursor.execute("DELETE FROM journal_entries WHERE id = ?", (entry_id,))
+
+        conn.commit()
+        conn.close()
+
+    def get_journal_entries(
+        self,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+        tags: Optional[List[str]] = None,
+        mood: Optional[str] = None,
+        before: Optional[tuple] = None,
+        limit: int = 50,
+    ) -> pd.DataFrame:
+        """
+        Get journal entries newest first, at most limit rows.
+        before=(date, id) continues after the last row of the previous page (keyset pagination);
+        tags keeps entries that have all of the given tags.
+        """
+        conn = self._get_connection()
+        query = "SELECT * FROM journal_entries WHERE 1=1"
+        params = []
+
+        if start_date:
+            query += " AND date >= ?"
+            params.append(start_date)
+        if end_date:
+            query += " AND date <= ?"
+            params.append(end_date)
+        if mood:
+            query += " AND mood = ?"
+            params.append(mood)
+        if tags:
+            query += f"""
+                AND id IN (
+                    SELECT entry_id FROM journal_tags WHERE tag IN ({", ".join("?" * len(tags))})
+                    GROUP BY entry_id HAVING COUNT(*) = ?
+                )
+            """
+            params.extend(tags)
+            params.append(len(tags))
+        if before:
+            query += " AND (date < ? OR (date = ? AND id < ?))"
+            params.extend([before[0], before[0], before[1]])
+
+        query += " ORDER BY date DESC, id DESC LIMIT ?"
+        params.append(limit)
+
+        df = pd.read_sql_query(query, conn, params=params)
+        df['tags'] = self._get_journal_tags(conn, df['id'].tolist())
+        conn.close()
+        return df
+
+    def get_journal_entry_by_id(self, entry_id: int) -> Optional[dict]:
+        """Get a specific journal entry by ID"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute("SELECT * FROM journal_entries WHERE id = ?", (entry_id,))
+        row = cursor.fetchone()
+        entry = dict(row) if row else None
+        if entry:
+            entry['tags'] = self._get_journal_tags(conn, [entry_id])[0]
+        conn.close()
+
+        return entry
+
+    def search_journal_entries(self, phrases: List[str], filters: List[str], limit: int = 50) -> pd.DataFrame:
+        """
+        Full-text search ranked by bm25.
+        phrases are matched through the FTS index (each needs at least 3 characters);
+        filters are shorter terms checked with instr() on the matching rows.
+        """
+        conn = self._get_connection()
+        params = []
+
+        if phrases:
+            query = """
+                SELECT e.*, snippet(journal_fts, 1, '[', ']', '…', 32) AS snippet
+                FROM journal_fts
+                JOIN journal_entries e ON e.id = journal_fts.rowid
+                WHERE journal_fts MATCH ?
+            """
+            params.append(" AND ".join('"' + phrase.replace('"', '""') + '"' for phrase in phrases))
+        else:
+            query = "SELECT e.*, NULL AS snippet FROM journal_entries e WHERE 1=1"
+
+        for term in filters:
+            query += " AND (instr(lower(e.title), ?) > 0 OR instr(lower(e.content), ?) > 0)"
+            params.extend([term, term])
+
+        query += " ORDER BY bm25(journal_fts), e.date DESC LIMIT ?" if phrases else " ORDER BY e.date DESC, e.id DESC LIMIT ?"
+        params.append(limit)
+
+        df = pd.read_sql_query(query, conn, params=params)
+        df['tags'] = self._get_journal_tags(conn, df['id'].tolist())
+        conn.close()
+        return df
+
+    def get_journal_mood_counts(self, start_date: Optional[str] = None, end_date: Optional[str] = None) -> pd.DataFrame:
+        """Get pre-aggregated mood counts per day"""
+        conn = self._get_connection()
+        query = "SELECT date, mood, count FROM journal_mood_daily WHERE 1=1"
+        params = []
+        if start_date:
+            query += " AND date >= ?"
+            params.append(start_date)
+        if end_date:
+            query += " AND date <= ?"
+            params.append(end_date)
+        df = pd.read_sql_query(query + " ORDER BY date, mood", conn, params=params)
+        conn.close()
+        return df
+
+    def _get_journal_tags(self, conn, entry_ids: List[int]) -> List[List[str]]:
+        """Tags for each entry id, in the same order"""
+        if not entry_ids:
+            return []
+
+        tags = {entry_id: [] for entry_id in entry_ids}
+        rows = conn.execute(f"""
+            SELECT entry_id, tag FROM journal_tags
+            WHERE entry_id IN ({", ".join("?" * len(entry_ids))})
+            ORDER BY tag
+        """, entry_ids)
+        for entry_id, tag in rows:
+            tags[entry_id].append(tag)
+        return [tags[entry_id] for entry_id in entry_ids]
+
+    # ============= Anomalies =============
+
+    def get_expenses_for_scan(self) -> pd.DataFrame:
+        """Get id, date, subcategory and amount of every expense, archives included (a lean load for batch analysis)"""
+        conn = self._get_connection()
+        frames = self._read_expense_sources(conn, "SELECT id, date, subcategory, amount FROM {source}")
+        conn.close()
+
+        df = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+
+        if not df.empty:
+            df['date'] = pd.to_datetime(df['date'], format="%Y-%m-%d")
+        return df
+
+    def find_matching_expenses(self, start_date: str, end_date: str, subcategory: str, amount: float, exclude_id: Optional[int] = None) -> pd.DataFrame:
+        """Get expenses with the same subcategory and amount (to the cent) within a date range, archives included"""
+        conn = self._get_connection()
+        query = """
+            SELECT id, date FROM {source}
+            WHERE subcategory = ? AND date BETWEEN ? AND ?
+              AND ROUND(amount * 100) = ROUND(? * 100) AND id != ?
+            ORDER BY date, id
+        """
+        frames = self._read_expense_sources(
+            conn, query, (subcategory, start_date, end_date, amount, exclude_id or -1), start_date, end_date
+        )
+        conn.close()
+
+        if len(frames) == 1:
+            return frames[0]
+        return pd.concat(frames, ignore_index=True).sort_values(['date', 'id'], ignore_index=True)
+
+    def get_recent_amounts(self, subcategory: str, before_date: str, before_id: int, limit: int) -> List[float]:
+        """Get the amounts of the latest expenses in a subcategory preceding (date, id), archives included"""
+        conn = self._get_connection()
+        query = """
+            SELECT date, id, amount FROM {source}
+            WHERE subcategory = ? AND (date < ? OR (date = ? AND id < ?))
+            ORDER BY date DESC, id DESC
+            LIMIT ?
+        """
+        params = (subcategory, before_date, before_date, before_id, limit)
+        rows = [tuple(row) for row in conn.execute(query.format(source="expenses"), params).fetchall()]
+
+        # Archives only matter when the hot table can't fill the history, or holds rows older than theirs
+        oldest = rows[-1][0] if len(rows) == limit else None
+        if self._get_archive_partitions(conn, oldest, before_date):
+            for frame in self._read_expense_sources(conn, query, params, oldest, before_date, include_hot=False):
+                rows += list(frame.itertuples(index=False, name=None))
+            rows = sorted(rows, reverse=True)[:limit]
+        conn.close()
+
+        return [amount for _, _, amount in rows]
+
+    @retry_on_busy
+    def save_anomalies(self, anomalies: List[tuple], replace_all: bool = False):
+        """
+        Store anomalies as (expense_id, kind, score, related_expense_id) tuples.
+        replace_all clears previous results first (used by batch scans).
+        """
+        conn = self._get_connection()
+        cursor = conn.cursor()
+
+        if replace_all:
+            cursor.execute("DELETE FROM expense_anomalies")
+
+        cursor.executemany("""
+            INSERT OR REPLACE INTO expense_anomalies (expense_id, kind, score, related_expense_id)
+            VALUES (?, ?, ?, ?)
+        """, anomalies)
+
+        conn.commit()
+        conn.close()
+
+    @retry_on_busy
+    def delete_anomalies_for_expense(self, expense_id: int):
+        """Remove anomalies flagged on, or pointing at, an expense"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute("""
+            DELETE FROM expense_anomalies
+            WHERE expense_id = ? OR related_expense_id = ?
+        """, (expense_id, expense_id))
+
+        conn.commit()
+        conn.close()
+
+    def get_anomalies(self, kind: Optional[str] = None, start_date: Optional[str] = None, end_date: Optional[str] = None) -> pd.DataFrame:
+        """Get stored anomalies joined with their expenses (archived ones included), newest first"""
+        conn = self._get_connection()
+        query = """
+            SELECT a.expense_id, a.kind, a.score, a.related_expense_id, a.detected_at,
+                   e.date, e.category, e.subcategory, e.amount, e.description
+            FROM expense_anomalies a
+            JOIN {source} e ON e.id = a.expense_id
+            WHERE (? IS NULL OR a.kind = ?)
+              AND (? IS NULL OR e.date >= ?)
+              AND (? IS NULL OR e.date <= ?)
+            ORDER BY e.date DESC, a.expense_id DESC
+        """
+        frames = self._read_expense_sources(
+            conn, query, (kind, kind, start_date, start_date, end_date, end_date), start_date, end_date
+        )
+        conn.close()
+
+        if len(frames) == 1:
+            return frames[0]
+        df = pd.concat(frames, ignore_index=True)
+        return df.sort_values(['date', 'expense_id'], ascending=False, ignore_index=True)
+
+    # ============= Forecast Models =============
+
+    @retry_on_busy
+    def save_forecast_model(self, month: str, model: str):
+        """Store a fitted forecast model (JSON) for a month"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute("""
+            INSERT OR REPLACE INTO forecast_models (month, model)
+            VALUES (?, ?)
+        """, (month, model))
+
+        conn.commit()
+        conn.close()
+
+    def get_forecast_model(self, month: str) -> Optional[str]:
+        """Get the fitted forecast model (JSON) for a month"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute("SELECT model FROM forecast_models WHERE month = ?", (month,))
+        row = cursor.fetchone()
+        conn.close()
+
+        if row:
+            return row['model']
+        return None
+
+    # ============= Archive =============
+
+    def _archive_path(self, file_name: str) -> Path:
+        return self.archive_dir / file_name
+
+    def _get_archive_partitions(self, conn, start_date: Optional[str] = None, end_date: Optional[str] = None) -> List[dict]:
+        """Get archive partitions whose date range overlaps [start_date, end_date]"""
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT * FROM archive_partitions
+            WHERE (? IS NULL OR max_date >= ?) AND (? IS NULL OR min_date <= ?)
+            ORDER BY year DESC
+        """, (start_date, start_date, end_date, end_date))
+        return [dict(row) for row in cursor.fetchall()]
+
+    def _attach_archives(self, conn, partitions: List[dict], include_hot: bool = True) -> str:
+        """Attach archive files read-only and return a temp view over them (plus the hot table)"""
+        cursor = conn.cursor()
+        selects = [f"SELECT {EXPENSE_COLUMNS} FROM main.expenses"] if include_hot else []
+
+        for partition in partitions:
+            alias = f"archive_{partition['year']}"
+            uri = self._archive_path(partition['file_name']).resolve().as_uri() + "?mode=ro"
+            cursor.execute("ATTACH DATABASE ? AS " + alias, (uri,))
+            selects.append(f"SELECT {EXPENSE_COLUMNS} FROM {alias}.expenses")
+
+        cursor.execute("DROP VIEW IF EXISTS temp.expenses_all")
+        cursor.execute("CREATE TEMP VIEW expenses_all AS " + " UNION ALL ".join(selects))
+        return "expenses_all"
+
+    def _read_expense_sources(self, conn, query: str, params: tuple = (), start_date: Optional[str] = None,
+                              end_date: Optional[str] = None, include_hot: bool = True) -> List[pd.DataFrame]:
+        """
+        Run a query reading expenses FROM {source} over the hot table and the archive files
+        overlapping [start_date, end_date]; one frame per batch of attached archives
+        """
+        partitions = self._get_archive_partitions(conn, start_date, end_date)
+        if not partitions:
+            return [pd.read_sql_query(query.format(source="expenses"), conn, params=params)] if include_hot else []
+
+        frames = []
+        max_attached = conn.getlimit(sqlite3.SQLITE_LIMIT_ATTACHED)
+        for i in range(0, len(partitions), max_attached):
+            group = partitions[i:i + max_attached]
+            source = self._attach_archives(conn, group, include_hot=include_hot and i == 0)
+            frames.append(pd.read_sql_query(query.format(source=source), conn, params=params))
+            self._detach_archives(conn, group)
+        return frames
+
+    def _detach_archives(self, conn, partitions: List[dict]):
+        cursor = conn.cursor()
+        cursor.execute("DROP VIEW IF EXISTS temp.expenses_all")
+        for partition in partitions:
+            cursor.execute(f"DETACH DATABASE archive_{partition['year']}")
+
+    def _get_archived_expense(self, conn, expense_id: int) -> Optional[sqlite3.Row]:
+        """Look up an expense in the archive files whose id range covers it"""
+        found = self._locate_archived_expense(conn, expense_id)
+        return found[1] if found else None
+
+    def _locate_archived_expense(self, conn, expense_id: int) -> Optional[tuple]:
+        """(partition, row) of the archive file holding an expense, or None"""
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT * FROM archive_partitions
+            WHERE ? BETWEEN min_id AND max_id
+            ORDER BY year DESC
+        """, (expense_id,))
+
+        for partition in cursor.fetchall():
+            archive_conn = sqlite3.connect(
+                self._archive_path(partition['file_name']).resolve().as_uri() + "?mode=ro", uri=True
+            )
+            archive_conn.row_factory = sqlite3.Row
+            row = archive_conn.execute(
+                f"SELECT {ARCHIVE_COLUMNS} FROM expenses WHERE id = ?", (expense_id,)
+            ).fetchone()
+            archive_conn.close()
+
+            if row:
+                return dict(partition), row
+        return None
+
+    def _archives_holding(self, expense_ids: List[int]) -> List[dict]:
+        """Archive partitions holding any of the expenses that are no longer in the hot table"""
+        conn = self._get_connection()
+        try:
+            partitions = {}
+            for expense_id in expense_ids:
+                if conn.execute("SELECT 1 FROM expenses WHERE id = ?", (expense_id,)).fetchone():
+                    continue
+                found = self._locate_archived_expense(conn, expense_id)
+                if found:
+                    partitions[found[0]['year']] = found[0]
+
+            if len(partitions) > conn.getlimit(sqlite3.SQLITE_LIMIT_ATTACHED):
+                raise ValueError("Too many archived years in one batch; split the changes into smaller batches")
+            return list(partitions.values())
+        finally:
+            conn.close()
+
+    def _get_attached_archived_row(self, cursor, expense_id: int, archives: List[dict]) -> Optional[tuple]:
+        """(partition, row) of an expense in the archives attached by _transaction"""
+        for partition in archives:
+            cursor.execute(
+                f"SELECT {ARCHIVE_COLUMNS} FROM archive_{partition['year']}.expenses WHERE id = ?", (expense_id,)
+            )
+            row = cursor.fetchone()
+            if row:
+                return partition, dict(row)
+        return None
+
+    def _unarchive_expense(self, cursor, expense_id: int, archives: List[dict], found: Optional[tuple] = None) -> Optional[dict]:
+        """
+        Move an archived expense back into the hot table so it can be modified, inside the
+        caller's transaction. The row keeps its row_version: the sync triggers are suppressed
+        while it is copied, so it only gets a new version if the caller then changes it.
+        """
+        found = found or self._get_attached_archived_row(cursor, expense_id, archives)
+        if found is None:
+            return None
+
+        partition, row = found
+        alias = f"archive_{partition['year']}"
+        cursor.execute("INSERT INTO sync_suppress (flag) VALUES (1)")
+        cursor.execute(f"""
+            INSERT INTO main.expenses ({ARCHIVE_COLUMNS})
+            SELECT {ARCHIVE_COLUMNS} FROM {alias}.expenses WHERE id = ?
+        """, (expense_id,))
+        cursor.execute("DELETE FROM sync_suppress")
+        cursor.execute(f"DELETE FROM {alias}.expenses WHERE id = ?", (expense_id,))
+        cursor.execute("""
+            UPDATE archive_partitions SET row_count = row_count - 1
+            WHERE year = ?
+        """, (partition['year'],))
+        return row
+
+    def _migrate_archives(self):
+        """Add row_version to archive files written before archived rows kept it"""
+        conn = self._get_connection()
+        partitions = self._get_archive_partitions(conn)
+        conn.close()
+
+        for partition in partitions:
+            archive_conn = sqlite3.connect(str(self._archive_path(partition['file_name'])))
+            columns = [row[1] for row in archive_conn.execute("PRAGMA table_info(expenses)")]
+            if columns and 'row_version' not in columns:
+                # Same starting version as the hot tables' migration
+                archive_conn.execute("ALTER TABLE expenses ADD COLUMN row_version INTEGER")
+                archive_conn.execute("UPDATE expenses SET row_version = 1")
+                archive_conn.commit()
+            archive_conn.close()
+
+    def archive_closed_months(self, before_month: str) -> Dict[int, int]:
+        """
+        Move expenses dated before the given month (YYYY-MM) into per-year archive files.
+        Each year is moved in one transaction spanning the hot and archive databases.
+        Returns number of rows moved per year.
+        """
+        cutoff = f"{before_month}-01"
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+
+        conn = self._get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute("""
+            SELECT DISTINCT substr(date, 1, 4) AS year FROM expenses
+            WHERE date < ?
+        """, (cutoff,))
+        years = [int(row['year']) for row in cursor.fetchall()]
+
+        moved = {}
+        for year in years:
+            file_name = f"expenses_{year}.db"
+            year_start = f"{year:04d}-01-01"
+            year_end = min(f"{year + 1:04d}-01-01", cutoff)
+
+            # Under the archive lock so a backup never copies a year halfway through its move
+            with self.archive_lock():
+                cursor.execute("ATTACH DATABASE ? AS archive", (str(self._archive_path(file_name)),))
+                try:
+                    cursor.execute(EXPENSES_TABLE_SQL.format(table="archive.expenses"))
+                    cursor.execute("CREATE INDEX IF NOT EXISTS archive.idx_expenses_date ON expenses(date)")
+
+                    cursor.execute(f"""
+                        INSERT OR REPLACE INTO archive.expenses ({ARCHIVE_COLUMNS})
+                        SELECT {ARCHIVE_COLUMNS} FROM main.expenses
+                        WHERE date >= ? AND date < ?
+                    """, (year_start, year_end))
+                    moved[year] = cursor.rowcount
+
+                    # Archived rows are moved, not deleted: no sync tombstones
+                    cursor.execute("INSERT INTO sync_suppress (flag) VALUES (1)")
+                    cursor.execute("""
+                        DELETE FROM main.expenses
+                        WHERE date >= ? AND date < ?
+                    """, (year_start, year_end))
+                    cursor.execute("DELETE FROM sync_suppress")
+
+                    cursor.execute("""
+                        INSERT OR REPLACE INTO archive_partitions
+                            (year, file_name, min_date, max_date, min_id, max_id, row_count)
+                        SELECT ?, ?, MIN(date), MAX(date), MIN(id), MAX(id), COUNT(*)
+                        FROM archive.expenses
+                    """, (year, file_name))
+
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    raise
+                finally:
+                    cursor.execute("DETACH DATABASE archive")
+
+        conn.close()
+        return moved
+
+    def compact_archives(self, include_hot: bool = False) -> Dict[str, int]:
+        """
+        VACUUM and ANALYZE the archive files (and optionally the hot database).
+        Meant to run offline; returns file sizes in bytes after compaction.
+        """
+        conn = self._get_connection()
+        partitions = self._get_archive_partitions(conn)
+        conn.close()
+
+        paths = [self._archive_path(partition['file_name']) for partition in partitions]
+        if include_hot:
+            paths.append(Path(self.db_path))
+
+        sizes = {}
+        for path in paths:
+            compact_conn = sqlite3.connect(str(path))
+            compact_conn.execute("ANALYZE")
+            compact_conn.execute("VACUUM")
+            compact_conn.close()
+            sizes[path.name] = path.stat().st_size
+
+        return sizes
+
+    def get_earliest_expense_date(self) -> Optional[str]:
+        """Get the earliest expense date across the hot table and the archives"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute("""
+            SELECT MIN(date) AS earliest FROM (
+                SELECT MIN(date) AS date FROM expenses
+                UNION ALL
+                SELECT MIN(min_date) AS date FROM archive_partitions
+            )
+        """)
+        row = cursor.fetchone()
+        conn.close()
+
+        return row['earliest']
+
+    # ============= Change Log =============
+
+    def _get_row(self, cursor, table: str, row_id: int) -> Optional[dict]:
+        cursor.execute(f"SELECT * FROM {table} WHERE id = ?", (row_id,))
+        row = cursor.fetchone()
+        return dict(row) if row else None
+
+    def _log_change(self, cursor, table: str, op: str, row_id: Optional[int], old: Optional[dict] = None, new: Optional[dict] = None):
+        """Append a change; callers run this inside the mutation's transaction"""
+        cursor.execute("""
+            INSERT INTO change_log (table_name, op, row_id, old, new)
+            VALUES (?, ?, ?, ?, ?)
+        """, (
+            table, op, row_id,
+            json.dumps(old) if old is not None else None,
+            json.dumps(new) if new is not None else None,
+        ))
+
+    def get_changes(self, after_id: int, limit: int = 500) -> List[dict]:
+        """Changes with id > after_id, oldest first"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute("""
+            SELECT * FROM change_log
+            WHERE id > ?
+            ORDER BY id
+            LIMIT ?
+        """, (after_id, limit))
+        rows = cursor.fetchall()
+        conn.close()
+
+        changes = []
+        for row in rows:
+            change = dict(row)
+            change['old'] = json.loads(change['old']) if change['old'] else None
+            change['new'] = json.loads(change['new']) if change['new'] else None
+            changes.append(change)
+        return changes
+
+    def get_change_log_bounds(self) -> tuple:
+        """(oldest retained id, latest id ever assigned); oldest is latest + 1 when the log is empty"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = 'change_log'")
+        row = cursor.fetchone()
+        latest = row['seq'] if row else 0
+        cursor.execute("SELECT MIN(id) AS oldest FROM change_log")
+        oldest = cursor.fetchone()['oldest']
+        conn.close()
+
+        return (oldest if oldest is not None else latest + 1), latest
+
+    @retry_on_busy
+    def prune_change_log(self, keep_days: int) -> int:
+        """Delete changes older than keep_days, returns the number removed"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute("DELETE FROM change_log WHERE created_at < datetime('now', ?)", (f"-{keep_days} days",))
+        removed = cursor.rowcount
+        conn.commit()
+        conn.close()
+
+        return removed
+
+    # ============= Sync =============
+
+    def get_sync_version(self) -> int:
+        """Version of the latest change to any synced table"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute("SELECT version FROM sync_version WHERE id = 1")
+        version = cursor.fetchone()['version']
+        conn.close()
+
+        return version
+
+    def get_sync_changes(self, since: int, limit: int) -> Dict:
+        """
+        Up to `limit` changed rows and tombstones with version > since, oldest first.
+        Read in one snapshot; writers serialize, so versions commit in order and
+        `version` (the last one returned) is a safe watermark for the next call.
+        """
+        conn = self._get_connection()
+        conn.isolation_level = None
+        cursor = conn.cursor()
+
+        try:
+            cursor.execute("BEGIN")
+            changes = []
+            for table in SYNC_TABLES:
+                cursor.execute(f"""
+                    SELECT * FROM {table}
+                    WHERE row_version > ?
+                    ORDER BY row_version
+                    LIMIT ?
+                """, (since, limit + 1))
+                changes += [(row['row_version'], table, dict(row)) for row in cursor.fetchall()]
+
+            cursor.execute("""
+                SELECT table_name, row_id, version FROM sync_tombstones
+                WHERE version > ?
+                ORDER BY version
+                LIMIT ?
+            """, (since, limit + 1))
+            changes += [(row['version'], row['table_name'], row['row_id']) for row in cursor.fetchall()]
+
+            cursor.execute("SELECT version FROM sync_version WHERE id = 1")
+            current = cursor.fetchone()['version']
+            cursor.execute("COMMIT")
+        finally:
+            conn.close()
+
+        changes.sort(key=lambda change: change[0])
+        more = len(changes) > limit
+        changes = changes[:limit]
+
+        rows = {table: [] for table in SYNC_TABLES}
+        deleted = {table: [] for table in SYNC_TABLES}
+        for _, table, change in changes:
+            if isinstance(change, dict):
+                rows[table].append(change)
+            else:
+                deleted[table].append(change)
+
+        return {
+            "version": changes[-1][0] if more else max(current, since),
+            "rows": rows,
+            "deleted": deleted,
+            "more": more,
+        }
+
+    @retry_on_busy
+    def apply_sync_mutations(self, mutations: List[dict]) -> List[dict]:
+        """
+        Apply a client's batch in one transaction. update/delete only apply when the row's
+        row_version still equals the client's base_version; otherwise the mutation is reported
+        as a conflict with the server's current row and the rest of the batch goes ahead.
+        """
+        # Archived expenses are checked in place and only moved back once a change applies
+        archives = self._archives_holding([
+            mutation['id'] for mutation in mutations if mutation['table'] == "expenses" and mutation['op'] != "insert"
+        ])
+
+        results = []
+        with self._transaction(archives) as cursor:
+            for mutation in mutations:
+                results.append(self._apply_sync_mutation(cursor, mutation, archives))
+        return results
+
+    def _apply_sync_mutation(self, cursor, mutation: dict, archives: List[dict]) -> dict:
+        table, op, values = mutation['table'], mutation['op'], mutation.get('values') or {}
+
+        if op == "insert":
+            columns = list(values)
+            try:
+                cursor.execute(
+                    f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                    [values[column] for column in columns]
+                )
+            except sqlite3.IntegrityError:
+                # Only budgets can collide (one per month and category)
+                cursor.execute("SELECT * FROM budgets WHERE month = ? AND category = ?", (values.get('month'), values.get('category')))
+                current = cursor.fetchone()
+                return {"status": "conflict", "reason": "exists", "current": dict(current) if current else None}
+            row = self._get_row(cursor, table, cursor.lastrowid)
+            self._log_change(cursor, table, "insert", row['id'], new=row)
+            return {"status": "applied", "id": row['id'], "row_version": row['row_version']}
+
+        old = self._get_row(cursor, table, mutation['id'])
+        archived = None
+        if old is None and table == "expenses":
+            archived = self._get_attached_archived_row(cursor, mutation['id'], archives)
+            old = archived[1] if archived else None
+        if old is None:
+            return {"status": "conflict", "reason": "deleted", "current": None}
+        if old['row_version'] != mutation.get('base_version'):
+            return {"status": "conflict", "reason": "changed", "current": old}
+        if archived:
+            self._unarchive_expense(cursor, mutation['id'], archives, archived)
+
+        if op == "delete":
+            cursor.execute(f"DELETE FROM {table} WHERE id = ?", (mutation['id'],))
+            if table == "recurring_transactions":
+                cursor.execute("DELETE FROM applied_recurring WHERE recurring_id = ?", (mutation['id'],))
+            self._log_change(cursor, table, "delete", mutation['id'], old=old)
+            return {"status": "applied", "id": mutation['id']}
+
+        assignments = ", ".join(f"{column} = ?" for column in values)
+        try:
+            cursor.execute(f"UPDATE {table} SET {assignments} WHERE id = ?", [*values.values(), mutation['id']])
+        except sqlite3.IntegrityError:
+            return {"status": "conflict", "reason": "exists", "current": old}
+        new = self._get_row(cursor, table, mutation['id'])
+        self._log_change(cursor, table, "update", mutation['id'], old=old, new=new)
+        return {"status": "applied", "id": mutation['id'], "row_version": new['row_version']}
+
+    # ============= Timeline =============
+
+    # Per source: SELECT producing (date, id, ...), the date expression and a sargable date bound
+    TIMELINE_QUERIES = {
+        "expense": (
+            "SELECT date, id, category, subcategory, amount, description, is_recurring FROM expenses",
+            "date", "id", "date <= ?",
+        ),
+        "budget": (
+            "SELECT month || '-01' AS date, id, month, category, amount FROM budgets",
+            "month || '-01'", "id", "month <= substr(?, 1, 7)",
+        ),
+        "recurring": (
+            "SELECT date(created_at) AS date, id, category, subcategory, amount, description, is_active FROM recurring_transactions",
+            "date(created_at)", "id", "date(created_at) <= ?",
+        ),
+        "journal": (
+            "SELECT date, id, title, mood, entry_type, substr(content, 1, 200) AS excerpt FROM journal_entries",
+            "date", "id", "date <= ?",
+        ),
+        "savings": (
+            """SELECT l.date, l.id, l.asset_id, a.name, a.kind, a.asset_type, l.unit_value, a.quantity * l.unit_value AS value
+               FROM savings_ledger l JOIN savings_assets a ON a.id = l.asset_id""",
+            "l.date", "l.id", "l.date <= ?",
+        ),
+    }
+
+    def get_archived_years(self, before_date: Optional[str] = None) -> List[int]:
+        """Years of archive files holding expenses on or before before_date, newest first"""
+        conn = self._get_connection()
+        partitions = self._get_archive_partitions(conn, end_date=before_date)
+        conn.close()
+        return [partition['year'] for partition in partitions]
+
+    def iter_timeline_rows(self, source: str, before: tuple, batch_size: int = 100, archive_year: Optional[int] = None):
+        """
+        Yield rows of a timeline source as dicts, newest first, strictly before (date, id).
+        Rows are fetched in keyset-paginated batches of batch_size, so a consumer that stops
+        early never reads more than one batch past what it used.
+        archive_year reads expenses from that year's archive file instead of the hot table.
+        """
+        select, date_expr, id_expr, bound = self.TIMELINE_QUERIES[source]
+        query = f"""
+            {select}
+            WHERE {bound} AND ({date_expr} < ? OR ({date_expr} = ? AND {id_expr} < ?))
+            ORDER BY {date_expr} DESC, {id_expr} DESC
+            LIMIT ?
+        """
+
+        if archive_year is not None:
+            conn = self._get_connection()
+            partition = next(p for p in self._get_archive_partitions(conn) if p['year'] == archive_year)
+            conn.close()
+            uri = self._archive_path(partition['file_name']).resolve().as_uri() + "?mode=ro"
+            conn = sqlite3.connect(uri, uri=True)
+            conn.row_factory = sqlite3.Row
+        else:
+            conn = self._get_connection()
+
+        try:
+            last_date, last_id = before
+            while True:
+                rows = conn.execute(query, (last_date, last_date, last_date, last_id, batch_size)).fetchall()
+                for row in rows:
+                    yield dict(row)
+
+                if len(rows) < batch_size:
+                    break
+                last_date, last_id = rows[-1]['date'], rows[-1]['id']
+        finally:
+            conn.close()
+
+    # ============= Export =============
+
+    # Column an export is incremental on: synced tables by row_version, so updated rows are
+    # exported again; applied_recurring rows are never updated (a re-apply inserts a new id)
+    EXPORT_KEYS = {"expenses": "row_version", "budgets": "row_version", "applied_recurring": "id"}
+
+    def get_export_watermark(self, table: str) -> int:
+        """Highest export key committed so far; rows written later get a higher one"""
+        if table not in self.EXPORT_KEYS:
+            raise ValueError(f"Table {table} cannot be exported")
+        if self.EXPORT_KEYS[table] == "row_version":
+            return self.get_sync_version()
+
+        conn = self._get_connection()
+        try:
+            return conn.execute(f"SELECT COALESCE(MAX(id), 0) FROM {table}").fetchone()[0]
+        finally:
+            conn.close()
+
+    def iter_table_chunks(self, table: str, since: int = 0, until: Optional[int] = None, chunk_size: int = 10000):
+        """
+        Yield rows of a table whose export key (EXPORT_KEYS) is in (since, until] as DataFrames
+        of at most chunk_size rows. Uses keyset pagination on the primary key so memory stays
+        bounded by chunk_size. Rows changed during the export get a key above until and are
+        left for the next one.
+        """
+        if table not in self.EXPORT_KEYS:
+            raise ValueError(f"Table {table} cannot be exported")
+        key = self.EXPORT_KEYS[table]
+        if until is None:
+            until = self.get_export_watermark(table)
+
+        # Expenses name their columns so hot and archived rows come out alike
+        columns = ARCHIVE_COLUMNS if table == "expenses" else "*"
+        conn = self._get_connection()
+        try:
+            yield from self._iter_chunks(conn, table, columns, key, since, until, chunk_size)
+            archive_paths = []
+            if table == "expenses":
+                # Archived rows are exported too, listed after the hot table so rows archived
+                # meanwhile are still found; each file is paged on its own id order
+                archive_paths = [self._archive_path(p['file_name']) for p in self._get_archive_partitions(conn)]
+        finally:
+            conn.close()
+
+        for path in archive_paths:
+            archive_conn = sqlite3.connect(path.resolve().as_uri() + "?mode=ro", uri=True)
+            try:
+                yield from self._iter_chunks(archive_conn, table, columns, key, since, until, chunk_size)
+            finally:
+                archive_conn.close()
+
+    def _iter_chunks(self, conn, table: str, columns: str, key: str, since: int, until: int, chunk_size: int):
+        last_id = since if key == "id" else 0
+        while True:
+            df = pd.read_sql_query(
+                f"SELECT {columns} FROM {table} WHERE id > ? AND {key} > ? AND {key} <= ? ORDER BY id LIMIT ?",
+                conn,
+                params=(last_id, since, until, chunk_size)
+            )
+            if df.empty:
+                break
+
+            last_id = int(df['id'].iloc[-1])
+            yield df
+
+            if len(df) < chunk_size:
+                break
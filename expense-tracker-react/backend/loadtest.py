@@ -0,0 +1,178 @@
+"""
+Load test for multi-worker mode
+Starts the API with 1..N uvicorn workers against a throwaway data directory, drives it
+with concurrent clients and checks that no write was lost and no recurring transaction
+was applied twice
+
+Usage:
+  python loadtest.py --workers 1 2 4 --clients 16 --duration 10
+"""
+
+import argparse
+import json
+import os
+import random
+import socket
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from datetime import date
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def request(base_url: str, method: str, path: str, body: dict = None):
+    data = json.dumps(body).encode() if body is not None else None
+    req = urllib.request.Request(base_url + path, data=data, method=method, headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(req, timeout=30) as response:
+        return json.loads(response.read())
+
+
+def start_server(workers: int, port: int, data_dir: str) -> subprocess.Popen:
+    env = dict(os.environ, WEB_CONCURRENCY=str(workers), DATA_DIR=data_dir)
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "api:app", "--port", str(port), "--workers", str(workers), "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+        env=env,
+    )
+
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            request(base_url, "GET", "/")
+            return server
+        except (urllib.error.URLError, ConnectionError):
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError(f"Server with {workers} worker(s) did not start")
+
+
+def run_clients(base_url: str, clients: int, duration: float, month: str) -> dict:
+    """Mixed traffic: mostly reads, a quarter expense inserts and a few concurrent recurring applies"""
+    latencies = []
+    counts = {"added": 0, "applied": 0, "errors": 0}
+    lock = threading.Lock()
+    stop_at = time.monotonic() + duration
+
+    def client(seed: int):
+        rng = random.Random(seed)
+        while time.monotonic() < stop_at:
+            roll = rng.random()
+            started = time.monotonic()
+            try:
+                if roll < 0.25:
+                    request(base_url, "POST", "/expenses", {
+                        "date": f"{month}-{rng.randint(1, 28):02d}",
+                        "category": "Load Test",
+                        "subcategory": "Load Test",
+                        "amount": round(rng.uniform(1, 100), 2),
+                    })
+                    outcome = "added"
+                elif roll < 0.30:
+                    result = request(base_url, "POST", f"/recurring/apply/{month}")
+                    with lock:
+                        counts["applied"] += len(result["applied"])
+                    outcome = None
+                elif roll < 0.65:
+                    request(base_url, "GET", f"/expenses/summary?start_date={month}-01&end_date={month}-28")
+                    outcome = None
+                else:
+                    request(base_url, "GET", "/timeline?limit=20")
+                    outcome = None
+            except (urllib.error.URLError, ConnectionError):
+                outcome = "errors"
+
+            elapsed = time.monotonic() - started
+            with lock:
+                latencies.append(elapsed)
+                if outcome:
+                    counts[outcome] += 1
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    latencies.sort()
+    return {
+        **counts,
+        "requests": len(latencies),
+        "throughput": len(latencies) / duration,
+        "p50_ms": statistics.median(latencies) * 1000 if latencies else 0.0,
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1] * 1000 if latencies else 0.0,
+    }
+
+
+def check_consistency(db_path: str, month: str, stats: dict) -> list:
+    """Every acknowledged insert is stored and every recurring item is applied exactly once"""
+    conn = sqlite3.connect(db_path)
+    problems = []
+
+    stored = conn.execute("SELECT COUNT(*) FROM expenses WHERE category = 'Load Test'").fetchone()[0]
+    if stored != stats["added"]:
+        problems.append(f"{stats['added']} expenses acknowledged but {stored} stored")
+
+    active = conn.execute("SELECT COUNT(*) FROM recurring_transactions WHERE is_active = 1").fetchone()[0]
+    if active != 3:
+        problems.append(f"expected the 3 default recurring transactions, found {active}")
+
+    applied = conn.execute("SELECT COUNT(*) FROM applied_recurring WHERE month = ?", (month,)).fetchone()[0]
+    recurring_expenses = conn.execute(
+        "SELECT COUNT(*) FROM expenses WHERE is_recurring = 1 AND date = ?", (f"{month}-01",)
+    ).fetchone()[0]
+    if stats["applied"] and (applied != active or recurring_expenses != active or stats["applied"] != active):
+        problems.append(
+            f"recurring applied {stats['applied']} time(s) by clients, {applied} marks, {recurring_expenses} expenses"
+        )
+
+    conn.close()
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scale the API from 1 to N workers under concurrent load")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds of traffic per worker count")
+    args = parser.parse_args()
+
+    month = date.today().strftime("%Y-%m")
+    print(f"{'workers':>7} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'errors':>6}  consistency")
+
+    failed = False
+    for workers in args.workers:
+        with tempfile.TemporaryDirectory() as data_dir:
+            server = start_server(workers, free_port(), data_dir)
+            try:
+                base_url = f"http://127.0.0.1:{server.args[server.args.index('--port') + 1]}"
+                stats = run_clients(base_url, args.clients, args.duration, month)
+            finally:
+                server.terminate()
+                server.wait()
+
+            problems = check_consistency(os.path.join(data_dir, "expenses.db"), month, stats)
+            failed |= bool(problems) or stats["errors"] > 0
+            print(
+                f"{workers:>7} {stats['throughput']:>8.1f} {stats['p50_ms']:>8.1f} {stats['p95_ms']:>8.1f} "
+                f"{stats['errors']:>6}  {'; '.join(problems) or 'ok'}"
+            )
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
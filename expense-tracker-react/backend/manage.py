@@ -0,0 +1,209 @@
+"""
+Maintenance commands for the Life Dashboard backend
+Runs directly against the SQLite database, without going through the API
+
+Usage:
+  python manage.py export data/export --format parquet
+  python manage.py export data/export --full --tables expenses
+  python manage.py archive --before 2025-01
+  python manage.py compact --include-hot
+  python manage.py forecast --months 2025-01 2025-02
+  python manage.py backup create --keep 7
+  python manage.py backup schedule --interval 3600 --keep 24
+  python manage.py backup verify snapshot-20250101T000000
+  python manage.py backup restore --at 2025-01-01T12:00:00 --target restored/expenses.db
+  python manage.py prune-changes --keep-days 30
+  python manage.py load expenses.csv --database-url postgresql://localhost/life
+  python manage.py --tenant alice archive --before 2025-01
+"""
+
+import argparse
+import logging
+import os
+from datetime import datetime
+
+import pandas as pd
+
+from database.backup import BackupManager
+from database.base import BULK_EXPENSE_COLUMNS, create_storage
+from database.sqlite_impl import SQLiteDatabase
+from services.budget_service import BudgetService
+from services.change_feed_service import ChangeFeedService
+from services.forecast_service import ForecastService
+from services.export_service import ExportService, FILE_EXTENSIONS, PARTITION_COLUMNS
+from tenants import DEFAULT_TENANT, tenant_data_dir, validate_tenant_id
+
+# Database path
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+DB_PATH = os.path.join(DATA_DIR, "expenses.db")
+BACKUP_DIR = os.path.join(DATA_DIR, "backups")
+
+
+def export(args):
+    db = SQLiteDatabase(args.db)
+    service = ExportService(db, chunk_size=args.chunk_size)
+
+    results = service.export(
+        args.output_dir,
+        tables=args.tables,
+        file_format=args.format,
+        incremental=not args.full,
+    )
+
+    for table, stats in results.items():
+        print(f"  {table}: exported {stats['rows']} rows into {len(stats['files'])} files "
+              f"(watermark {stats['key']} {stats['watermark']['last_' + stats['key']]})")
+
+
+def archive(args):
+    db = SQLiteDatabase(args.db)
+    before_month = args.before or datetime.now().strftime("%Y-%m")
+
+    moved = db.archive_closed_months(before_month)
+    if not moved:
+        print(f"  No expenses before {before_month} to archive")
+    for year, count in sorted(moved.items()):
+        print(f"  Archived {count} expenses from {year}")
+
+
+def compact(args):
+    db = SQLiteDatabase(args.db)
+    sizes = db.compact_archives(include_hot=args.include_hot)
+
+    for name, size in sizes.items():
+        print(f"  {name}: {size / 1024:.1f} KB")
+
+
+def forecast(args):
+    db = SQLiteDatabase(args.db)
+    service = ForecastService(db, BudgetService(db), history_months=args.history_months)
+
+    for month in args.months or [datetime.now().strftime("%Y-%m")]:
+        model = service.fit_month(month)
+        print(f"  Fitted {month}: {len(model.categories)} categories over {model.days} days")
+
+
+def prune_changes(args):
+    removed = ChangeFeedService(SQLiteDatabase(args.db)).prune(args.keep_days)
+    print(f"  Removed {removed} changes older than {args.keep_days} days")
+
+
+def load(args):
+    if args.database_url:
+        store = create_storage(args.database_url, None if args.tenant in (None, DEFAULT_TENANT) else args.tenant)
+    else:
+        store = SQLiteDatabase(args.db)
+
+    missing = {"date", "category", "subcategory", "amount"} - set(pd.read_csv(args.csv_path, nrows=0).columns)
+    if missing:
+        raise SystemExit(f"CSV is missing columns: {sorted(missing)}")
+
+    total = 0
+    # One transaction (COPY on PostgreSQL) per chunk keeps memory flat for large files
+    for chunk in pd.read_csv(args.csv_path, chunksize=args.chunk_size, usecols=lambda c: c in BULK_EXPENSE_COLUMNS):
+        total += store.add_expenses_bulk(chunk)
+        print(f"  Loaded {total} expenses")
+
+
+def backup(args):
+    manager = BackupManager(SQLiteDatabase(args.db), args.backup_dir)
+
+    if args.action == "create":
+        manifest = manager.create_snapshot()
+        print(f"  Created {manifest['name']} in {manifest['duration_seconds']}s")
+        if args.keep:
+            for name in manager.apply_retention(args.keep):
+                print(f"  Deleted {name}")
+
+    elif args.action == "schedule":
+        logging.basicConfig(level=logging.INFO, format="  %(asctime)s %(message)s")
+        manager.run_schedule(args.interval, args.keep or 7)
+
+    elif args.action == "list":
+        for snapshot in manager.list_snapshots():
+            print(f"  {snapshot['name']}  {snapshot['created_at']}  archives: {len(snapshot['archives'])}")
+
+    elif args.action == "verify":
+        result = manager.verify_snapshot(args.name)
+        print(f"  {result['name']}: {'OK' if result['ok'] else 'FAILED'}")
+        for file_name, integrity in result["integrity"].items():
+            print(f"    {file_name}: integrity {integrity}")
+        for key in result["mismatches"]:
+            print(f"    checksum mismatch: {key}")
+        if not result["ok"]:
+            raise SystemExit(1)
+
+    elif args.action == "restore":
+        name = manager.find_snapshot_at(args.at) if args.at else args.name
+        if name is None:
+            raise SystemExit("No matching snapshot: pass a snapshot name or --at TIMESTAMP")
+        if args.target is None:
+            raise SystemExit("--target (a fresh database path) is required")
+        try:
+            manager.restore_snapshot(name, args.target, args.archive_dir)
+        except ValueError as e:
+            raise SystemExit(str(e))
+        print(f"  Restored {name} into {args.target}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Life Dashboard maintenance commands")
+    parser.add_argument("--db", default=DB_PATH, help="Path to the SQLite database")
+    parser.add_argument("--tenant", help="Run against a tenant's database instead of --db")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = subparsers.add_parser("export", help="Export tables to partitioned Parquet/Arrow files")
+    export_parser.add_argument("output_dir", help="Directory to write the export into")
+    export_parser.add_argument("--format", choices=list(FILE_EXTENSIONS), default="parquet")
+    export_parser.add_argument("--tables", nargs="+", choices=list(PARTITION_COLUMNS))
+    export_parser.add_argument("--full", action="store_true", help="Re-export everything instead of since the last watermark")
+    export_parser.add_argument("--chunk-size", type=int, default=10000)
+    export_parser.set_defaults(func=export)
+
+    archive_parser = subparsers.add_parser("archive", help="Move closed months into per-year archive databases")
+    archive_parser.add_argument("--before", help="Archive expenses before this month (YYYY-MM), defaults to the current month")
+    archive_parser.set_defaults(func=archive)
+
+    compact_parser = subparsers.add_parser("compact", help="VACUUM the archive databases (run offline)")
+    compact_parser.add_argument("--include-hot", action="store_true", help="Also VACUUM the main database")
+    compact_parser.set_defaults(func=compact)
+
+    forecast_parser = subparsers.add_parser("forecast", help="Fit month-end forecast models (defaults to the current month)")
+    forecast_parser.add_argument("--months", nargs="+", help="Months to fit (YYYY-MM)")
+    forecast_parser.add_argument("--history-months", type=int, default=12)
+    forecast_parser.set_defaults(func=forecast)
+
+    prune_parser = subparsers.add_parser("prune-changes", help="Trim the change log behind /events")
+    prune_parser.add_argument("--keep-days", type=int, default=30)
+    prune_parser.set_defaults(func=prune_changes)
+
+    load_parser = subparsers.add_parser("load", help="Bulk-load expenses from a CSV file")
+    load_parser.add_argument("csv_path", help="CSV with date, category, subcategory, amount[, description, is_recurring]")
+    load_parser.add_argument("--database-url", default=os.environ.get("DATABASE_URL"),
+                             help="Load into this database (defaults to DATABASE_URL, then --db)")
+    load_parser.add_argument("--chunk-size", type=int, default=50000)
+    load_parser.set_defaults(func=load)
+
+    backup_parser = subparsers.add_parser("backup", help="Online snapshots: create, schedule, list, verify, restore")
+    backup_parser.add_argument("action", choices=["create", "schedule", "list", "verify", "restore"])
+    backup_parser.add_argument("name", nargs="?", help="Snapshot name (verify/restore)")
+    backup_parser.add_argument("--backup-dir", default=BACKUP_DIR)
+    backup_parser.add_argument("--keep", type=int, help="Number of snapshots to retain")
+    backup_parser.add_argument("--interval", type=float, default=3600, help="Seconds between scheduled snapshots")
+    backup_parser.add_argument("--at", help="Restore the newest snapshot taken at or before this ISO timestamp")
+    backup_parser.add_argument("--target", help="Fresh database path to restore into")
+    backup_parser.add_argument("--archive-dir", help="Directory for the restored archive files (default: archive/ next to --target)")
+    backup_parser.set_defaults(func=backup)
+
+    args = parser.parse_args()
+    if args.tenant:
+        args.tenant = validate_tenant_id(args.tenant)
+        tenant_dir = tenant_data_dir(DATA_DIR, args.tenant)
+        args.db = str(tenant_dir / "expenses.db")
+        if getattr(args, "backup_dir", None) == BACKUP_DIR:
+            args.backup_dir = str(tenant_dir / "backups")
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""
+Anomaly Service - Duplicate and outlier detection for expenses
+"""
+
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from database.sqlite_impl import SQLiteDatabase
+
+DUPLICATE = "duplicate"
+OUTLIER = "outlier"
+
+# Scales the median absolute deviation to a standard deviation for normal data
+MAD_SCALE = 0.6745
+
+
+class AnomalyService:
+    """
+    Flags probable duplicate entries and unusually large/small amounts.
+
+    Duplicates: same subcategory and amount (to the cent) within duplicate_window_days.
+    Outliers: robust z-score of the amount against the median/MAD of the previous
+    history_size expenses in the same subcategory.
+    """
+
+    def __init__(
+        self,
+        db: SQLiteDatabase,
+        duplicate_window_days: int = 1,
+        history_size: int = 50,
+        min_history: int = 8,
+        z_threshold: float = 3.5,
+    ):
+        self.db = db
+        self.duplicate_window_days = duplicate_window_days
+        self.history_size = history_size
+        self.min_history = min_history
+        self.z_threshold = z_threshold
+
+    # ============= Batch =============
+
+    def scan_history(self) -> Dict[str, int]:
+        """Re-detect anomalies over all expenses (archived ones included) and replace the stored results"""
+        df = self.db.get_expenses_for_scan()
+        if df.empty:
+            self.db.save_anomalies([], replace_all=True)
+            return {DUPLICATE: 0, OUTLIER: 0}
+
+        duplicates = self._detect_duplicates(df)
+        outliers = self._detect_outliers(df)
+        self.db.save_anomalies(duplicates + outliers, replace_all=True)
+
+        return {DUPLICATE: len(duplicates), OUTLIER: len(outliers)}
+
+    def _detect_duplicates(self, df: pd.DataFrame) -> List[tuple]:
+        """
+        Hash every expense on (subcategory, amount in cents) and sort by (key, day):
+        a duplicate is then simply a row whose predecessor has the same key and is
+        at most duplicate_window_days earlier. No pairwise comparison is needed.
+        """
+        cents = np.round(df['amount'].values * 100).astype(np.int64)
+        cents -= cents.min()
+        subcategory_codes = pd.factorize(df['subcategory'])[0].astype(np.int64)
+        key_codes = subcategory_codes * (int(cents.max()) + 1) + cents
+        days = df['date'].values.astype('datetime64[D]').astype(np.int64)
+        ids = df['id'].values.astype(np.int64)
+
+        order = np.lexsort((ids, days, key_codes))
+        key_codes, days, ids = key_codes[order], days[order], ids[order]
+
+        same_key = key_codes[1:] == key_codes[:-1]
+        close = (days[1:] - days[:-1]) <= self.duplicate_window_days
+        matches = np.flatnonzero(same_key & close) + 1
+
+        return [(int(ids[i]), DUPLICATE, float(days[i] - days[i - 1]), int(ids[i - 1])) for i in matches]
+
+    def _detect_outliers(self, df: pd.DataFrame) -> List[tuple]:
+        """
+        Rolling robust z-scores per subcategory, computed with grouped rolling medians.
+        The MAD is approximated by the rolling median of each prior point's deviation
+        from its own rolling median, which keeps the whole pass vectorized.
+        """
+        df = df[['id', 'date', 'subcategory', 'amount']].sort_values(['subcategory', 'date', 'id'], ignore_index=True)
+        groups = df['subcategory']
+
+        # History strictly before each expense
+        previous = df.groupby(groups)['amount'].shift()
+        median = self._grouped_rolling_median(previous, groups)
+        deviation = (df['amount'] - median).abs()
+        mad = self._grouped_rolling_median(deviation.groupby(groups).shift(), groups)
+
+        z = self._robust_z(df['amount'].values, median.values, mad.values)
+        flagged = np.flatnonzero(np.abs(np.nan_to_num(z)) > self.z_threshold)
+
+        ids = df['id'].values
+        return [(int(ids[i]), OUTLIER, round(float(z[i]), 3), None) for i in flagged]
+
+    def _grouped_rolling_median(self, values: pd.Series, groups: pd.Series) -> pd.Series:
+        rolling = values.groupby(groups).rolling(self.history_size, min_periods=self.min_history).median()
+        return rolling.reset_index(level=0, drop=True).sort_index()
+
+    def _robust_z(self, amounts: np.ndarray, median: np.ndarray, mad: np.ndarray) -> np.ndarray:
+        # Floor the MAD so identical historical amounts don't produce infinite scores
+        floor = np.maximum(np.abs(median) * 0.01, 0.01)
+        return MAD_SCALE * (amounts - median) / np.maximum(mad, floor)
+
+    # ============= Incremental =============
+
+    def check_expense(self, expense_id: int) -> List[dict]:
+        """Detect anomalies for one newly added or updated expense using indexed lookups"""
+        expense = self.db.get_expense_by_id(expense_id)
+        if expense is None:
+            return []
+
+        expense_date = pd.Timestamp(expense['date'])
+        window = pd.Timedelta(days=self.duplicate_window_days)
+        anomalies = []
+
+        matches = self.db.find_matching_expenses(
+            (expense_date - window).strftime("%Y-%m-%d"),
+            (expense_date + window).strftime("%Y-%m-%d"),
+            expense['subcategory'],
+            expense['amount'],
+            exclude_id=expense_id,
+        )
+        if not matches.empty:
+            # Point at the closest match, preferring an earlier entry
+            gaps = (pd.to_datetime(matches['date']) - expense_date).dt.days.abs()
+            nearest = matches.loc[gaps.idxmin()]
+            anomalies.append((expense_id, DUPLICATE, float(gaps.min()), int(nearest['id'])))
+
+        history = np.array(self.db.get_recent_amounts(
+            expense['subcategory'], expense_date.strftime("%Y-%m-%d"), expense_id, self.history_size
+        ))
+        if len(history) >= self.min_history:
+            median = np.median(history)
+            mad = np.median(np.abs(history - median))
+            z = float(self._robust_z(np.array([expense['amount']]), np.array([median]), np.array([mad]))[0])
+            if abs(z) > self.z_threshold:
+                anomalies.append((expense_id, OUTLIER, round(z, 3), None))
+
+        self.db.save_anomalies(anomalies)
+        return [
+            {"expense_id": a[0], "kind": a[1], "score": a[2], "related_expense_id": a[3]}
+            for a in anomalies
+        ]
+
+    def forget_expense(self, expense_id: int):
+        """Drop anomalies involving an expense that was deleted or is about to be re-checked"""
+        self.db.delete_anomalies_for_expense(expense_id)
+
+    # ============= Queries =============
+
+    def get_anomalies(self, kind: Optional[str] = None, start_date: Optional[str] = None, end_date: Optional[str] = None) -> pd.DataFrame:
+        """Get stored anomalies, optionally filtered by kind and expense date"""
+        if kind is not None and kind not in (DUPLICATE, OUTLIER):
+            raise ValueError(f"Invalid anomaly kind: {kind}. Expected '{DUPLICATE}' or '{OUTLIER}'")
+        return self.db.get_anomalies(kind, start_date, end_date)
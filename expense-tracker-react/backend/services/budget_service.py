@@ -3,14 +3,14 @@ Budget Service - Business logic for budget management
 """
 
 from typing import Dict, Optional
-from database.sqlite_impl import SQLiteDatabase
+from database.base import ExpenseStorage
 from config import DEFAULT_BUDGETS
 
 
 class BudgetService:
     """Service for managing budgets"""
 
-    def __init__(self, db: SQLiteDatabase):
+    def __init__(self, db: ExpenseStorage):
         self.db = db
 
     def set_budget(self, month: str, category: str, amount: float):
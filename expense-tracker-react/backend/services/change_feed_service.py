@@ -0,0 +1,52 @@
+"""
+Change Feed Service - Ordered deltas of expenses, budgets and recurring transactions
+Backs the /events stream so dashboards can patch their aggregates instead of refetching
+"""
+
+from typing import Dict, List, Optional
+from database.sqlite_impl import SQLiteDatabase
+
+TABLES = ("expenses", "budgets", "recurring_transactions")
+
+
+class ChangeFeedService:
+    """Reads the change log written by SQLiteDatabase in the same transaction as each mutation"""
+
+    def __init__(self, db: SQLiteDatabase):
+        self.db = db
+
+    def latest_event_id(self) -> int:
+        """Id of the newest change; a new subscriber starts here"""
+        return self.db.get_change_log_bounds()[1]
+
+    def read_after(self, last_event_id: int, limit: int = 500, tables: Optional[List[str]] = None) -> Dict:
+        """
+        Up to `limit` changes after last_event_id, oldest first.
+        reset is True when the client can't be caught up from the log (the changes it missed
+        were pruned, or its id is from another database) and should refetch everything;
+        position is the id to resume from and more is True when further changes are ready.
+        """
+        if limit < 1:
+            raise ValueError("Limit must be at least 1")
+        if tables:
+            unknown = set(tables) - set(TABLES)
+            if unknown:
+                raise ValueError(f"Invalid tables: {sorted(unknown)}. Expected any of {list(TABLES)}")
+
+        oldest, latest = self.db.get_change_log_bounds()
+        if last_event_id < oldest - 1 or last_event_id > latest:
+            return {"changes": [], "reset": True, "position": latest, "more": False}
+
+        changes = self.db.get_changes(last_event_id, limit)
+        more = len(changes) == limit
+        position = changes[-1]['id'] if changes else last_event_id
+        if tables:
+            changes = [change for change in changes if change['table_name'] in tables]
+
+        return {"changes": changes, "reset": False, "position": position, "more": more}
+
+    def prune(self, keep_days: int) -> int:
+        """Drop changes older than keep_days; clients further behind get a reset"""
+        if keep_days < 1:
+            raise ValueError("Must keep at least one day of changes")
+        return self.db.prune_change_log(keep_days)
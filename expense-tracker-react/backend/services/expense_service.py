@@ -5,13 +5,13 @@ Expense Service - Business logic for expense management
 import pandas as pd
 from typing import Optional, List
 from datetime import datetime
-from database.sqlite_impl import SQLiteDatabase
+from database.base import ExpenseStorage
 
 
 class ExpenseService:
     """Service for managing expenses"""
 
-    def __init__(self, db: SQLiteDatabase):
+    def __init__(self, db: ExpenseStorage):
         self.db = db
 
     def add_expense(self, date: str, category: str, subcategory: str, amount: float, description: str = "", is_recurring: bool = False):
@@ -25,6 +25,10 @@ class ExpenseService:
         """Get expenses, optionally filtered by date range and excluding recurring"""
         return self.db.get_expenses(start_date, end_date, exclude_recurring)
 
+    def get_expense_by_id(self, expense_id: int) -> Optional[dict]:
+        """Get a specific expense by ID"""
+        return self.db.get_expense_by_id(expense_id)
+
     def delete_expense(self, expense_id: int):
         """Delete an expense"""
         return self.db.delete_expense(expense_id)
@@ -66,6 +70,10 @@ class ExpenseService:
         spending = df.groupby('category')['amount'].sum()
         return spending.to_dict()
 
+    def get_category_totals(self, start_date: Optional[str] = None, end_date: Optional[str] = None, exclude_recurring: bool = False) -> dict:
+        """Get total spending per category, aggregated by the database instead of in pandas"""
+        return self.db.get_category_totals(start_date, end_date, exclude_recurring)
+
     def get_spending_by_subcategory(self, df: pd.DataFrame) -> pd.DataFrame:
         """Get spending grouped by category and subcategory"""
         if df.empty:
@@ -89,8 +97,8 @@ class ExpenseService:
         if df.empty:
             return pd.DataFrame(columns=['month', 'amount'])
 
-        df['month'] = df['date'].dt.to_period('M')
-        monthly = df.groupby('month')['amount'].sum().reset_index()
+        # Group on a derived key rather than adding a column to the caller's DataFrame
+        monthly = df.groupby(df['date'].dt.to_period('M').rename('month'))['amount'].sum().reset_index()
         monthly['month'] = monthly['month'].astype(str)
         monthly.columns = ['month', 'amount']
         return monthly.sort_values('month', ascending=False)
@@ -100,8 +108,7 @@ class ExpenseService:
         if df.empty:
             return pd.DataFrame(columns=['day_of_week', 'average_amount'])
 
-        df['day_of_week'] = df['date'].dt.day_name()
-        dow = df.groupby('day_of_week')['amount'].mean().reset_index()
+        dow = df.groupby(df['date'].dt.day_name().rename('day_of_week'))['amount'].mean().reset_index()
         dow.columns = ['day_of_week', 'average_amount']
 
         # Order by day of week
@@ -135,10 +142,10 @@ class ExpenseService:
         Get list of available months from earliest expense to current month.
         Returns list of dicts with 'value' (YYYY-MM) and 'display' (e.g., 'October 25')
         """
-        # Get all expenses
-        df = self.db.get_expenses()
+        # Only the earliest date is needed, so avoid loading (and un-archiving) every expense
+        earliest = self.db.get_earliest_expense_date()
 
-        if df.empty:
+        if earliest is None:
             # If no expenses, return just current month
             current = datetime.now()
             month_str = current.strftime("%Y-%m")
@@ -148,7 +155,7 @@ class ExpenseService:
             }]
 
         # Find earliest expense date
-        earliest_date = pd.to_datetime(df['date']).min()
+        earliest_date = pd.to_datetime(earliest)
         current_date = datetime.now()
 
         # Generate all months from earliest to current
@@ -0,0 +1,232 @@
+"""
+Export Service - Columnar export of expense history to Parquet / Arrow IPC
+Requires the optional pyarrow dependency
+
+Incremental exports append the rows changed since the last one: expenses and budgets are
+tracked by their sync row_version, so an updated row is written again with a higher
+row_version (readers keep the highest per id). Deletes are not exported; run a full
+export to drop deleted rows.
+"""
+
+import json
+import os
+import shutil
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import pandas as pd
+from database.sqlite_impl import SQLiteDatabase
+
+# Table -> column used to derive the year/month partition
+PARTITION_COLUMNS = {
+    "expenses": "date",
+    "budgets": "month",
+    "applied_recurring": "month",
+}
+
+FILE_EXTENSIONS = {
+    "parquet": ".parquet",
+    "arrow": ".arrow",
+}
+
+WATERMARK_FILE = "_watermarks.json"
+
+
+def _import_pyarrow():
+    """Import pyarrow lazily so the API runs without it"""
+    try:
+        import pyarrow as pa
+        import pyarrow.ipc  # noqa: F401
+        import pyarrow.parquet  # noqa: F401
+    except ImportError as e:
+        raise ImportError("Columnar export requires pyarrow: pip install pyarrow") from e
+    return pa
+
+
+def _table_schema(pa, table: str):
+    """Fixed Arrow schema per table so every chunk and partition is written identically"""
+    schemas = {
+        "expenses": [
+            ("id", pa.int64()),
+            ("date", pa.date32()),
+            ("category", pa.string()),
+            ("subcategory", pa.string()),
+            ("amount", pa.float64()),
+            ("description", pa.string()),
+            ("is_recurring", pa.bool_()),
+            ("created_at", pa.timestamp("s")),
+            ("row_version", pa.int64()),
+        ],
+        "budgets": [
+            ("id", pa.int64()),
+            ("month", pa.string()),
+            ("category", pa.string()),
+            ("amount", pa.float64()),
+            ("created_at", pa.timestamp("s")),
+            ("row_version", pa.int64()),
+        ],
+        "applied_recurring": [
+            ("id", pa.int64()),
+            ("recurring_id", pa.int64()),
+            ("month", pa.string()),
+            ("expense_id", pa.int64()),
+            ("applied_at", pa.timestamp("s")),
+        ],
+    }
+    return pa.schema(schemas[table])
+
+
+class ExportService:
+    """Service for streaming database tables into partitioned columnar files"""
+
+    def __init__(self, db: SQLiteDatabase, chunk_size: int = 10000):
+        self.db = db
+        self.chunk_size = chunk_size
+
+    def load_watermarks(self, output_dir: str) -> Dict[str, dict]:
+        """Load the last exported key (id or row_version) and created_at per table"""
+        path = Path(output_dir) / WATERMARK_FILE
+        if not path.exists():
+            return {}
+
+        with open(path, "r") as f:
+            return json.load(f)
+
+    def _save_watermarks(self, output_dir: str, watermarks: Dict[str, dict]):
+        """Write watermarks atomically so a crashed export is simply re-run"""
+        path = Path(output_dir) / WATERMARK_FILE
+        tmp_path = path.with_suffix(".tmp")
+
+        with open(tmp_path, "w") as f:
+            json.dump(watermarks, f, indent=2)
+        os.replace(tmp_path, path)
+
+    def export(
+        self,
+        output_dir: str,
+        tables: Optional[List[str]] = None,
+        file_format: str = "parquet",
+        incremental: bool = True,
+    ) -> Dict[str, dict]:
+        """
+        Export tables into output_dir/<table>/year=YYYY/month=MM/part-<first key>.<ext>
+        Incremental exports only write rows whose export key (row_version for expenses and
+        budgets, id for applied_recurring) is above the stored watermark; updated rows are
+        written again, deleted ones are not removed.
+        A full export, or the first one since a table's watermark key changed, replaces the
+        table's existing files.
+        Returns per-table stats: rows, files, the export key and the new watermark.
+        """
+        if file_format not in FILE_EXTENSIONS:
+            raise ValueError(f"Unsupported export format: {file_format}. Expected one of {list(FILE_EXTENSIONS)}")
+
+        tables = tables or list(PARTITION_COLUMNS)
+        for table in tables:
+            if table not in PARTITION_COLUMNS:
+                raise ValueError(f"Unknown export table: {table}")
+
+        pa = _import_pyarrow()
+        Path(output_dir).mkdir(parents=True, exist_ok=True)
+        watermarks = self.load_watermarks(output_dir)
+        results = {}
+
+        for table in tables:
+            key = self.db.EXPORT_KEYS[table]
+            previous = watermarks.get(table, {})
+            if incremental and f"last_{key}" in previous:
+                since = previous[f"last_{key}"]
+            else:
+                # Watermarks written before expenses/budgets were tracked by row_version hold
+                # ids, so those tables are exported in full once
+                since = 0
+                shutil.rmtree(Path(output_dir) / table, ignore_errors=True)
+
+            until = self.db.get_export_watermark(table)
+            stats = self._export_table(pa, table, output_dir, file_format, since, until)
+            if stats["rows"] == 0:
+                stats["watermark"]["last_created_at"] = previous.get("last_created_at")
+            watermarks[table] = stats["watermark"]
+            results[table] = stats
+
+        self._save_watermarks(output_dir, watermarks)
+        return results
+
+    def _export_table(self, pa, table: str, output_dir: str, file_format: str, since: int, until: int) -> dict:
+        """Stream one table's rows with export key in (since, until], keeping one open writer per partition"""
+        export_key = self.db.EXPORT_KEYS[table]
+        schema = _table_schema(pa, table)
+        writers = {}
+        files = []
+        rows = 0
+        last_key = since
+        last_created_at = None
+
+        try:
+            for df in self.db.iter_table_chunks(table, since, until, self.chunk_size):
+                df = self._prepare_chunk(table, df)
+                rows += len(df)
+                # Chunks are in id order (and archived expenses come after the hot table),
+                # so the row with the highest key can be in any of them
+                chunk_max = int(df[export_key].max())
+                if chunk_max > last_key:
+                    last_key = chunk_max
+                    last_created_at = str(df.loc[df[export_key].idxmax(), self._created_column(table)])
+
+                for (year, month), part in df.groupby(['_year', '_month'], sort=False):
+                    key = (int(year), int(month))
+                    if key not in writers:
+                        path = self._partition_path(output_dir, table, key, int(part[export_key].iloc[0]), file_format)
+                        writers[key] = self._open_writer(pa, path, schema, file_format)
+                        files.append(str(path))
+
+                    arrow_table = pa.Table.from_pandas(part, schema=schema, preserve_index=False)
+                    writers[key].write_table(arrow_table)
+        finally:
+            for writer in writers.values():
+                writer.close()
+
+        return {
+            "rows": rows,
+            "files": files,
+            "key": export_key,
+            "watermark": {
+                # Everything up to until was read, even if the rows holding it were deleted
+                f"last_{export_key}": until,
+                "last_created_at": last_created_at,
+                "exported_at": datetime.now().isoformat(timespec="seconds"),
+            },
+        }
+
+    def _prepare_chunk(self, table: str, df: pd.DataFrame) -> pd.DataFrame:
+        """Convert SQLite text columns to typed columns and add partition keys"""
+        created_column = self._created_column(table)
+        df[created_column] = pd.to_datetime(df[created_column], errors="coerce")
+
+        if table == "expenses":
+            dates = pd.to_datetime(df['date'])
+            df['date'] = dates.dt.date
+            df['is_recurring'] = df['is_recurring'].fillna(0).astype(bool)
+            df['_year'] = dates.dt.year
+            df['_month'] = dates.dt.month
+        else:
+            column = PARTITION_COLUMNS[table]
+            df['_year'] = df[column].str.slice(0, 4).astype(int)
+            df['_month'] = df[column].str.slice(5, 7).astype(int)
+
+        return df
+
+    def _created_column(self, table: str) -> str:
+        return "applied_at" if table == "applied_recurring" else "created_at"
+
+    def _partition_path(self, output_dir: str, table: str, key: tuple, first_key: int, file_format: str) -> Path:
+        """Partition file path; named by the first export key so re-running an export overwrites it"""
+        year, month = key
+        directory = Path(output_dir) / table / f"year={year:04d}" / f"month={month:02d}"
+        directory.mkdir(parents=True, exist_ok=True)
+        return directory / f"part-{first_key:010d}{FILE_EXTENSIONS[file_format]}"
+
+    def _open_writer(self, pa, path: Path, schema, file_format: str):
+        if file_format == "parquet":
+            return pa.parquet.ParquetWriter(str(path), schema, compression="zstd")
+        return pa.ipc.new_file(str(path), schema)
@@ -0,0 +1,253 @@
+"""
+Forecast Service - Month-end spending projections per category
+"""
+
+import calendar
+import json
+import threading
+from datetime import date, datetime
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+from database.base import ExpenseStorage
+from database.sqlite_impl import SQLiteDatabase
+from services.budget_service import BudgetService
+
+
+class ForecastModel:
+    """
+    Expected cumulative floating spend for every category and day of one month.
+    cumulative[c, d] is the spend expected in the first d days (cumulative[:, 0] == 0).
+    """
+
+    def __init__(self, month: str, categories: list, cumulative: np.ndarray):
+        self.month = month
+        self.categories = categories
+        self.cumulative = cumulative
+
+    @property
+    def days(self) -> int:
+        return self.cumulative.shape[1] - 1
+
+    def to_json(self) -> str:
+        return json.dumps({
+            "month": self.month,
+            "categories": self.categories,
+            "cumulative": np.round(self.cumulative, 4).tolist(),
+        })
+
+    @classmethod
+    def from_json(cls, payload: str) -> "ForecastModel":
+        data = json.loads(payload)
+        cumulative = np.array(data["cumulative"], dtype=float).reshape(len(data["categories"]), -1)
+        return cls(data["month"], data["categories"], cumulative)
+
+
+class ForecastService:
+    """
+    Projects month-end spend from seasonal daily curves fitted on past months.
+    Fitting is done once per month (offline via manage.py or lazily on first request)
+    and stored; serving a forecast is a handful of vector ops over categories.
+    """
+
+    def __init__(self, db: SQLiteDatabase, budget_service: BudgetService, history_months: int = 12, smoothing: float = 4.0, store: Optional[ExpenseStorage] = None):
+        """store: where expenses and recurring transactions live, if not in db (fitted models always are)"""
+        self.db = db
+        self.store = store or db
+        self.budget_service = budget_service
+        self.history_months = history_months
+        # Pseudo-observations pulling noisy day-of-month/day-of-week factors towards 1
+        self.smoothing = smoothing
+        self._models: Dict[str, ForecastModel] = {}
+        self._version = 0
+        self._lock = threading.Lock()
+
+    # ============= Fitting =============
+
+    def fit_month(self, month: str) -> ForecastModel:
+        """Fit and store the expected daily curves for a month from the preceding history"""
+        year, month_num = self._parse_month(month)
+        days_in_month = calendar.monthrange(year, month_num)[1]
+
+        history_end = pd.Timestamp(year, month_num, 1) - pd.Timedelta(days=1)
+        history_start = (pd.Timestamp(year, month_num, 1) - pd.DateOffset(months=self.history_months)).normalize()
+        df = self.store.get_expenses(
+            history_start.strftime("%Y-%m-%d"), history_end.strftime("%Y-%m-%d"), exclude_recurring=True
+        )
+
+        categories = sorted(set(self.budget_service.get_all_budgets(month)) | set(df['category'] if not df.empty else []))
+        n_categories = len(categories)
+        history_days = pd.date_range(history_start, history_end, freq="D")
+        month_days = pd.date_range(pd.Timestamp(year, month_num, 1), periods=days_in_month, freq="D")
+
+        # Per-category totals by day-of-month (1..31) and day-of-week (0..6) in one bincount each
+        if df.empty:
+            codes = np.zeros(0, dtype=np.int64)
+            amounts = np.zeros(0)
+            dom = np.zeros(0, dtype=np.int64)
+            dow = np.zeros(0, dtype=np.int64)
+        else:
+            codes = pd.Categorical(df['category'], categories=categories).codes.astype(np.int64)
+            amounts = df['amount'].values.astype(float)
+            dom = df['date'].dt.day.values.astype(np.int64)
+            dow = df['date'].dt.dayofweek.values.astype(np.int64)
+
+        totals = np.bincount(codes, weights=amounts, minlength=n_categories)
+        level = totals / max(len(history_days), 1)
+        dom_totals = np.bincount(codes * 32 + dom, weights=amounts, minlength=n_categories * 32).reshape(n_categories, 32)
+        dow_totals = np.bincount(codes * 7 + dow, weights=amounts, minlength=n_categories * 7).reshape(n_categories, 7)
+        dom_counts = np.bincount(history_days.day, minlength=32)
+        dow_counts = np.bincount(history_days.dayofweek, minlength=7)
+
+        k = self.smoothing
+        with np.errstate(divide="ignore", invalid="ignore"):
+            dom_factor = (dom_totals + k * level[:, None]) / ((dom_counts + k) * level[:, None])
+            dow_factor = (dow_totals + k * level[:, None]) / ((dow_counts + k) * level[:, None])
+        dom_factor = np.nan_to_num(dom_factor, nan=1.0, posinf=1.0)
+        dow_factor = np.nan_to_num(dow_factor, nan=1.0, posinf=1.0)
+
+        # Expected spend for each day of the target month, rescaled to the historical monthly level
+        expected = dom_factor[:, month_days.day] * dow_factor[:, month_days.dayofweek]
+        expected_sum = expected.sum(axis=1, keepdims=True)
+        expected = np.divide(expected, expected_sum, out=np.full_like(expected, 1.0 / days_in_month), where=expected_sum > 0)
+        expected *= (level * days_in_month)[:, None]
+
+        cumulative = np.hstack([np.zeros((n_categories, 1)), np.cumsum(expected, axis=1)])
+        model = ForecastModel(month, categories, cumulative)
+
+        self.db.save_forecast_model(month, model.to_json())
+        with self._lock:
+            self._models[month] = model
+        return model
+
+    def get_model(self, month: str) -> ForecastModel:
+        """Cached model for a month, loading or fitting it on first use"""
+        with self._lock:
+            # Models may have been refitted by another worker
+            version = self.db.data_version()
+            if version != self._version:
+                self._models.clear()
+                self._version = version
+            model = self._models.get(month)
+        if model is not None:
+            return model
+
+        payload = self.db.get_forecast_model(month)
+        if payload is None:
+            return self.fit_month(month)
+
+        model = ForecastModel.from_json(payload)
+        with self._lock:
+            self._models[month] = model
+        return model
+
+    # ============= Forecast =============
+
+    def get_forecast(self, month: str, exclude_recurring: bool = True, today: Optional[date] = None) -> Dict:
+        """
+        Project month-end spend per category against budget.
+        Floating spend is extrapolated from spend-to-date along the fitted curve; recurring
+        items already applied plus those still scheduled are added when exclude_recurring is False.
+        """
+        year, month_num = self._parse_month(month)
+        model = self.get_model(month)
+        days = model.days
+        today = today or date.today()
+
+        month_start = date(year, month_num, 1)
+        if today < month_start:
+            elapsed = 0
+        elif today.year == year and today.month == month_num:
+            elapsed = today.day
+        else:
+            elapsed = days
+
+        df = self.store.get_expenses(
+            month_start.strftime("%Y-%m-%d"), date(year, month_num, days).strftime("%Y-%m-%d")
+        )
+        pending = self._pending_recurring(month)
+        categories = list(model.categories)
+        seen = set(df['category']) if not df.empty else set()
+        if not exclude_recurring and not pending.empty:
+            seen |= set(pending['category'])
+        extra = sorted(seen - set(categories))
+        categories += extra
+
+        cumulative = np.vstack([model.cumulative, np.zeros((len(extra), days + 1))])
+        floating_spent = self._totals_by_category(df[df['is_recurring'] == 0] if not df.empty else df, categories)
+        recurring_applied = self._totals_by_category(df[df['is_recurring'] == 1] if not df.empty else df, categories)
+        recurring_pending = self._totals_by_category(pending, categories)
+        budgets = self.budget_service.get_all_budgets(month)
+        budget = np.array([budgets.get(category, 0.0) for category in categories])
+
+        # Credibility-weighted pace: early in the month trust the curve, later trust actual spend
+        expected_to_date = cumulative[:, elapsed]
+        expected_remaining = cumulative[:, days] - expected_to_date
+        weight = elapsed / days
+        with np.errstate(divide="ignore", invalid="ignore"):
+            pace = np.where(expected_to_date > 0, floating_spent / expected_to_date, 1.0)
+        pace = weight * pace + (1 - weight)
+        projected_floating = floating_spent + expected_remaining * pace
+
+        if exclude_recurring:
+            spent = floating_spent
+            projected = projected_floating
+        else:
+            spent = floating_spent + recurring_applied
+            projected = projected_floating + recurring_applied + recurring_pending
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            percentage = np.where(budget > 0, projected / budget * 100, 0.0)
+
+        forecast = {
+            category: {
+                "budget": float(budget[i]),
+                "spent": round(float(spent[i]), 2),
+                "projected": round(float(projected[i]), 2),
+                "recurring_pending": round(float(recurring_pending[i]), 2),
+                "projected_remaining": round(float(budget[i] - projected[i]), 2),
+                "projected_percentage": round(float(percentage[i]), 2),
+                "will_exceed": bool(budget[i] > 0 and projected[i] > budget[i]),
+            }
+            for i, category in enumerate(categories)
+        }
+
+        total_budget = float(budget.sum())
+        total_projected = float(projected.sum())
+        return {
+            "month": month,
+            "days_elapsed": elapsed,
+            "days_in_month": days,
+            "forecast": forecast,
+            "total_summary": {
+                "total_budget": total_budget,
+                "total_spent": round(float(spent.sum()), 2),
+                "total_projected": round(total_projected, 2),
+                "total_projected_remaining": round(total_budget - total_projected, 2),
+                "total_projected_percentage": round(total_projected / total_budget * 100, 2) if total_budget > 0 else 0,
+            },
+        }
+
+    def _totals_by_category(self, df: pd.DataFrame, categories: list) -> np.ndarray:
+        if df.empty:
+            return np.zeros(len(categories))
+        totals = df.groupby('category')['amount'].sum()
+        return totals.reindex(categories, fill_value=0.0).values.astype(float)
+
+    def _pending_recurring(self, month: str) -> pd.DataFrame:
+        """Active recurring transactions not yet applied for the month"""
+        active = self.store.get_active_recurring_transactions()
+        if active.empty:
+            return active
+
+        applied = self.store.get_applied_recurring(month)
+        applied_ids = set(applied['recurring_id']) if not applied.empty else set()
+        return active[~active['id'].isin(applied_ids)]
+
+    def _parse_month(self, month: str):
+        try:
+            parsed = datetime.strptime(month, "%Y-%m")
+        except ValueError:
+            raise ValueError(f"Invalid month format: {month}. Expected YYYY-MM")
+        return parsed.year, parsed.month
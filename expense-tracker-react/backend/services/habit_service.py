@@ -1,13 +1,50 @@
 """
 Habit Service - Business logic for habit tracking
-PLACEHOLDER - To be implemented
+Completions are stored as one bitset per habit per year; streaks and rates use bit operations
 """
 
 import pandas as pd
-from typing import Optional, List
-from datetime import datetime
+from typing import Optional, List, Dict
+from datetime import date, datetime
 from database.sqlite_impl import SQLiteDatabase
 
+FREQUENCIES = ("daily",)
+
+
+def _longest_run(bits: int) -> int:
+    """
+    Length of the longest run of set bits.
+    After `run` rounds, bit i of `starts` is set iff bits i..i+run-1 are all set;
+    doubling then binary-searching the run length needs O(log n) big-int ops.
+    """
+    if bits == 0:
+        return 0
+
+    starts, run = bits, 1
+    while True:
+        longer = starts & (starts >> run)
+        if not longer:
+            break
+        starts, run = longer, run * 2
+
+    step = run // 2
+    while step:
+        longer = starts & (starts >> step)
+        if longer:
+            starts, run = longer, run + step
+        step //= 2
+    return run
+
+
+def _run_ending_at(bits: int, position: int) -> int:
+    """Length of the run of set bits ending at (and including) position"""
+    width = position + 1
+    window = bits & ((1 << width) - 1)
+    gaps = ~window & ((1 << width) - 1)
+    if gaps == 0:
+        return width
+    return position - (gaps.bit_length() - 1)
+
 
 class HabitService:
     """Service for managing habits and tracking"""
@@ -15,20 +52,141 @@ class HabitService:
     def __init__(self, db: SQLiteDatabase):
         self.db = db
 
-    # Placeholder methods - to be implemented
-
     def add_habit(self, name: str, description: str = "", frequency: str = "daily"):
         """Add a new habit to track"""
-        raise NotImplementedError("Habit tracking feature coming soon")
+        if not name.strip():
+            raise ValueError("Habit name cannot be empty")
+        if frequency not in FREQUENCIES:
+            raise ValueError(f"Invalid frequency: {frequency}. Expected one of {list(FREQUENCIES)}")
+
+        return self.db.add_habit(name.strip(), description, frequency)
+
+    def get_habits(self, active_only: bool = False) -> pd.DataFrame:
+        """Get all habits"""
+        return self.db.get_habits(active_only)
+
+    def update_habit(self, habit_id: int, name: Optional[str] = None, description: Optional[str] = None, is_active: Optional[bool] = None):
+        """Update a habit"""
+        if name is not None and not name.strip():
+            raise ValueError("Habit name cannot be empty")
+
+        if not self.db.update_habit(habit_id, name, description, is_active):
+            raise ValueError(f"Habit with id {habit_id} not found")
+
+    def delete_habit(self, habit_id: int):
+        """Delete a habit and its history"""
+        self.db.delete_habit(habit_id)
 
     def log_habit_completion(self, habit_id: int, date: str, completed: bool = True):
         """Log habit completion for a specific date"""
-        raise NotImplementedError("Habit tracking feature coming soon")
+        self.log_completions([{"habit_id": habit_id, "dates": [date], "completed": completed}])
+
+    def log_completions(self, entries: List[Dict]) -> int:
+        """
+        Log many habits and days at once.
+        entries: [{"habit_id": int, "dates": ["YYYY-MM-DD", ...], "completed": bool}]
+        Changes are folded into one set/clear mask per (habit, year) and written in one transaction.
+        Returns the number of days logged.
+        """
+        known_ids = set(self.db.get_habits()['id'])
+        updates = {}
+        logged = 0
 
-    def get_habit_streak(self, habit_id: int):
-        """Get current streak for a habit"""
-        raise NotImplementedError("Habit tracking feature coming soon")
+        for entry in entries:
+            habit_id = entry["habit_id"]
+            if habit_id not in known_ids:
+                raise ValueError(f"Habit with id {habit_id} not found")
+
+            for day in entry["dates"]:
+                parsed = self._parse_date(day)
+                bit = 1 << (parsed.timetuple().tm_yday - 1)
+                set_mask, clear_mask = updates.get((habit_id, parsed.year), (0, 0))
+                if entry.get("completed", True):
+                    set_mask, clear_mask = set_mask | bit, clear_mask & ~bit
+                else:
+                    set_mask, clear_mask = set_mask & ~bit, clear_mask | bit
+                updates[(habit_id, parsed.year)] = (set_mask, clear_mask)
+                logged += 1
+
+        if updates:
+            self.db.update_habit_bitsets(updates)
+        return logged
+
+    def get_habit_streak(self, habit_id: int, as_of: Optional[str] = None):
+        """
+        Get current and longest streak for a habit.
+        The current streak still counts if today isn't logged yet but yesterday was.
+        """
+        today = self._parse_date(as_of) if as_of else date.today()
+        timeline, origin = self._load_timeline(habit_id, end_year=today.year)
+        if origin is None:
+            return {"current_streak": 0, "longest_streak": 0}
+
+        position = (today - origin).days
+        if position < 0:
+            return {"current_streak": 0, "longest_streak": 0}
+
+        current = _run_ending_at(timeline, position)
+        if current == 0 and position > 0:
+            current = _run_ending_at(timeline, position - 1)
+
+        return {
+            "current_streak": current,
+            "longest_streak": _longest_run(timeline & ((1 << (position + 1)) - 1)),
+        }
 
     def get_habit_statistics(self, habit_id: int, start_date: Optional[str] = None, end_date: Optional[str] = None):
-        """Get statistics for a habit"""
-        raise NotImplementedError("Habit tracking feature coming soon")
+        """Get completion count, rate and streaks for a habit over a date range"""
+        habit = self.db.get_habit_by_id(habit_id)
+        if habit is None:
+            raise ValueError(f"Habit with id {habit_id} not found")
+
+        end = self._parse_date(end_date) if end_date else date.today()
+        start = self._parse_date(start_date) if start_date else pd.Timestamp(habit['created_at']).date()
+        if start > end:
+            raise ValueError("start_date must be on or before end_date")
+
+        timeline, origin = self._load_timeline(habit_id, start.year, end.year)
+        total_days = (end - start).days + 1
+
+        if origin is None:
+            completed = 0
+            longest = 0
+        else:
+            window = (timeline >> (start - origin).days) & ((1 << total_days) - 1)
+            completed = window.bit_count()
+            longest = _longest_run(window)
+
+        streak = self.get_habit_streak(habit_id, end.strftime("%Y-%m-%d"))
+        return {
+            "habit_id": habit_id,
+            "start_date": start.strftime("%Y-%m-%d"),
+            "end_date": end.strftime("%Y-%m-%d"),
+            "total_days": total_days,
+            "completed_days": completed,
+            "completion_rate": round(completed / total_days * 100, 2),
+            "current_streak": streak["current_streak"],
+            "longest_streak_in_range": longest,
+        }
+
+    def _load_timeline(self, habit_id: int, start_year: Optional[int] = None, end_year: Optional[int] = None):
+        """
+        Concatenate the yearly bitsets into one integer where bit n is day n after
+        Jan 1 of the first year. Returns (timeline, origin date) or (0, None).
+        """
+        bitsets = self.db.get_habit_bitsets(habit_id, start_year, end_year)
+        if not bitsets:
+            return 0, None
+
+        first_year = start_year if start_year is not None else min(bitsets)
+        origin = date(first_year, 1, 1)
+        timeline = 0
+        for year, bits in bitsets.items():
+            timeline |= bits << (date(year, 1, 1) - origin).days
+        return timeline, origin
+
+    def _parse_date(self, value: str) -> date:
+        try:
+            return datetime.strptime(value, "%Y-%m-%d").date()
+        except ValueError:
+            raise ValueError(f"Invalid date format: {value}. Expected YYYY-MM-DD")
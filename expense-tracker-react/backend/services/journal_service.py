@@ -1,6 +1,5 @@
 """
 Journal Service - Business logic for journaling and reflections
-PLACEHOLDER - To be implemented
 """
 
 import pandas as pd
@@ -8,39 +7,132 @@ from typing import Optional, List
 from datetime import datetime
 from database.sqlite_impl import SQLiteDatabase
 
+# Same mood vocabulary as the journal app
+MOODS = ("amazing", "happy", "okay", "sad", "angry", "excited", "tired", "grateful")
+
+ENTRY = "entry"
+GRATITUDE = "gratitude"
+
+# Shortest term the trigram full-text index can match
+MIN_INDEXED_TERM = 3
+
 
 class JournalService:
     """Service for managing journal entries and reflections"""
 
-    def __init__(self, db: SQLiteDatabase):
+    def __init__(self, db: SQLiteDatabase, page_size: int = 50):
         self.db = db
-
-    # Placeholder methods - to be implemented
+        self.page_size = page_size
 
     def create_entry(self, date: str, title: str, content: str, mood: Optional[str] = None, tags: Optional[List[str]] = None):
         """Create a new journal entry"""
-        raise NotImplementedError("Journaling feature coming soon")
+        self._validate_entry(date, content, mood)
+        return self.db.add_journal_entry(date, title.strip(), content, mood, self._clean_tags(tags))
 
-    def update_entry(self, entry_id: int, title: str, content: str, mood: Optional[str] = None):
-        """Update an existing journal entry"""
-        raise NotImplementedError("Journaling feature coming soon")
+    def update_entry(self, entry_id: int, title: str, content: str, mood: Optional[str] = None, tags: Optional[List[str]] = None):
+        """Update an existing journal entry; tags are left unchanged when None"""
+        if not content.strip():
+            raise ValueError("Content cannot be empty")
+        self._validate_mood(mood)
+
+        cleaned = self._clean_tags(tags) if tags is not None else None
+        if not self.db.update_journal_entry(entry_id, title.strip(), content, mood, cleaned):
+            raise ValueError(f"Journal entry with id {entry_id} not found")
 
     def delete_entry(self, entry_id: int):
         """Delete a journal entry"""
-        raise NotImplementedError("Journaling feature coming soon")
+        self.db.delete_journal_entry(entry_id)
+
+    def get_entry(self, entry_id: int) -> Optional[dict]:
+        """Get a single journal entry"""
+        return self.db.get_journal_entry_by_id(entry_id)
+
+    def get_entries(
+        self,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+        tags: Optional[List[str]] = None,
+        mood: Optional[str] = None,
+        cursor: Optional[str] = None,
+        limit: Optional[int] = None,
+    ):
+        """
+        Get journal entries newest first, one page at a time.
+        Returns (entries, next_cursor); pass next_cursor back to get the following page.
+        """
+        self._validate_mood(mood)
+        limit = limit or self.page_size
+        if limit < 1:
+            raise ValueError("Limit must be at least 1")
+
+        df = self.db.get_journal_entries(
+            start_date, end_date, self._clean_tags(tags), mood, self._decode_cursor(cursor), limit + 1
+        )
 
-    def get_entries(self, start_date: Optional[str] = None, end_date: Optional[str] = None, tags: Optional[List[str]] = None):
-        """Get journal entries with optional filters"""
-        raise NotImplementedError("Journaling feature coming soon")
+        next_cursor = None
+        if len(df) > limit:
+            df = df.iloc[:limit]
+            last = df.iloc[-1]
+            next_cursor = f"{last['date']}:{last['id']}"
+        return df, next_cursor
 
-    def search_entries(self, search_term: str):
-        """Search journal entries by content"""
-        raise NotImplementedError("Journal search feature coming soon")
+    def search_entries(self, search_term: str, limit: Optional[int] = None) -> pd.DataFrame:
+        """Search journal entries by title and content, best matches first"""
+        terms = search_term.lower().split()
+        if not terms:
+            raise ValueError("Search term cannot be empty")
+
+        phrases = [term for term in terms if len(term) >= MIN_INDEXED_TERM]
+        filters = [term for term in terms if len(term) < MIN_INDEXED_TERM]
+        return self.db.search_journal_entries(phrases, filters, limit or self.page_size)
 
     def get_mood_statistics(self, start_date: Optional[str] = None, end_date: Optional[str] = None):
         """Get mood tracking statistics"""
-        raise NotImplementedError("Mood statistics feature coming soon")
+        df = self.db.get_journal_mood_counts(start_date, end_date)
+        if df.empty:
+            return {"total_entries": 0, "mood_counts": {}, "mood_percentages": {}, "most_common_mood": None, "daily": []}
+
+        counts = df.groupby('mood')['count'].sum().sort_values(ascending=False)
+        total = int(counts.sum())
+        daily = df.pivot_table(index='date', columns='mood', values='count', aggfunc='sum', fill_value=0)
+
+        return {
+            "total_entries": total,
+            "mood_counts": {mood: int(count) for mood, count in counts.items()},
+            "mood_percentages": {mood: round(count / total * 100, 2) for mood, count in counts.items()},
+            "most_common_mood": counts.index[0],
+            "daily": [
+                {"date": day, "moods": {mood: int(count) for mood, count in row.items() if count}}
+                for day, row in daily.iterrows()
+            ],
+        }
 
     def add_gratitude(self, date: str, gratitude_text: str):
         """Add a gratitude entry"""
-        raise NotImplementedError("Gratitude log feature coming soon")
+        self._validate_entry(date, gratitude_text, None)
+        return self.db.add_journal_entry(date, "Gratitude", gratitude_text, "grateful", [GRATITUDE], entry_type=GRATITUDE)
+
+    def _validate_entry(self, date: str, content: str, mood: Optional[str]):
+        try:
+            datetime.strptime(date, "%Y-%m-%d")
+        except ValueError:
+            raise ValueError(f"Invalid date format: {date}. Expected YYYY-MM-DD")
+        if not content.strip():
+            raise ValueError("Content cannot be empty")
+        self._validate_mood(mood)
+
+    def _validate_mood(self, mood: Optional[str]):
+        if mood is not None and mood not in MOODS:
+            raise ValueError(f"Invalid mood: {mood}. Expected one of {list(MOODS)}")
+
+    def _clean_tags(self, tags: Optional[List[str]]) -> List[str]:
+        return sorted({tag.strip().lower() for tag in tags or [] if tag.strip()})
+
+    def _decode_cursor(self, cursor: Optional[str]):
+        if not cursor:
+            return None
+        try:
+            day, entry_id = cursor.rsplit(":", 1)
+            return day, int(entry_id)
+        except ValueError:
+            raise ValueError(f"Invalid cursor: {cursor}")
@@ -5,13 +5,13 @@ Recurring Service - Business logic for recurring transactions
 import pandas as pd
 from datetime import datetime
 from typing import List, Dict
-from database.sqlite_impl import SQLiteDatabase
+from database.base import ExpenseStorage
 
 
 class RecurringService:
     """Service for managing recurring transactions"""
 
-    def __init__(self, db: SQLiteDatabase):
+    def __init__(self, db: ExpenseStorage):
         self.db = db
 
     def add_recurring_transaction(self, category: str, subcategory: str, amount: float, description: str = ""):
@@ -99,29 +99,20 @@ class RecurringService:
             raise ValueError(f"Invalid month format: {month}. Expected YYYY-MM")
 
         for _, rec in active_recurring.iterrows():
-            # Check if already applied
-            if not self.db.is_recurring_applied(rec['id'], month):
-                # Add as expense with recurring flag
-                expense_id = self.db.add_expense(
-                    date=date,
-                    category=rec['category'],
-                    subcategory=rec['subcategory'],
-                    amount=rec['amount'],
-                    description=f"[Recurring] {rec['description']}",
-                    is_recurring=True
-                )
-
-                # Mark as applied
-                self.db.mark_recurring_applied(rec['id'], month, expense_id)
-
-                applied.append({
-                    "recurring_id": int(rec['id']),
-                    "expense_id": expense_id,
-                    "category": rec['category'],
-                    "subcategory": rec['subcategory'],
-                    "amount": float(rec['amount']),
-                    "description": rec['description']
-                })
+            # Add as expense with recurring flag and mark as applied atomically;
+            # None means another request or worker already applied it
+            expense_id = self.db.apply_recurring(int(rec['id']), month, date)
+            if expense_id is None:
+                continue
+
+            applied.append({
+                "recurring_id": int(rec['id']),
+                "expense_id": expense_id,
+                "category": rec['category'],
+                "subcategory": rec['subcategory'],
+                "amount": float(rec['amount']),
+                "description": rec['description']
+            })
 
         return applied
 
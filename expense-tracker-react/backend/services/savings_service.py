@@ -1,13 +1,17 @@
 """
 Savings & Investment Service - Business logic for savings and investment tracking
-PLACEHOLDER - To be implemented
+Balances and prices are kept in an append-only ledger; net worth, allocation and ROI
+are read from running aggregates maintained as snapshots are recorded
 """
 
 import pandas as pd
 from typing import Optional, List, Dict
-from datetime import datetime
+from datetime import date, datetime
 from database.sqlite_impl import SQLiteDatabase
 
+ACCOUNT = "account"
+INVESTMENT = "investment"
+
 
 class SavingsService:
     """Service for managing savings accounts and investments"""
@@ -15,32 +19,134 @@ class SavingsService:
     def __init__(self, db: SQLiteDatabase):
         self.db = db
 
-    # Placeholder methods - to be implemented
+    # ============= Accounts & Investments =============
 
-    def add_savings_account(self, name: str, account_type: str, initial_balance: float):
+    def add_savings_account(self, name: str, account_type: str, initial_balance: float, date: Optional[str] = None):
         """Add a new savings account"""
-        raise NotImplementedError("Savings tracking feature coming soon")
+        if not name.strip():
+            raise ValueError("Account name cannot be empty")
+
+        return self.db.add_savings_asset(
+            ACCOUNT, name.strip(), account_type, 1.0, initial_balance, initial_balance, self._date_or_today(date)
+        )
+
+    def add_investment(self, name: str, investment_type: str, amount: float, purchase_price: float, date: Optional[str] = None):
+        """Add a new investment (stocks, crypto, funds, etc); amount is the number of units held"""
+        if not name.strip():
+            raise ValueError("Investment name cannot be empty")
+        if amount <= 0:
+            raise ValueError("Amount must be greater than 0")
+        if purchase_price < 0:
+            raise ValueError("Purchase price cannot be negative")
+
+        return self.db.add_savings_asset(
+            INVESTMENT, name.strip(), investment_type, amount, amount * purchase_price, purchase_price, self._date_or_today(date)
+        )
+
+    def get_accounts(self) -> pd.DataFrame:
+        """Get all savings accounts with current balances"""
+        return self.db.get_savings_assets(ACCOUNT)
 
-    def add_investment(self, name: str, investment_type: str, amount: float, purchase_price: float):
-        """Add a new investment (stocks, crypto, funds, etc)"""
-        raise NotImplementedError("Investment tracking feature coming soon")
+    def get_investments(self) -> pd.DataFrame:
+        """Get all investments with current values"""
+        return self.db.get_savings_assets(INVESTMENT)
+
+    # ============= Snapshots =============
 
     def update_account_balance(self, account_id: int, new_balance: float, date: str):
         """Update savings account balance"""
-        raise NotImplementedError("Savings tracking feature coming soon")
+        self._record([(account_id, date, new_balance)], ACCOUNT)
 
     def update_investment_value(self, investment_id: int, current_price: float, date: str):
         """Update investment current value"""
-        raise NotImplementedError("Investment tracking feature coming soon")
+        self._record([(investment_id, date, current_price)], INVESTMENT)
+
+    def update_investment_prices(self, prices: List[Dict]) -> int:
+        """
+        Record many price snapshots in one transaction.
+        prices: [{"investment_id": int, "price": float, "date": "YYYY-MM-DD"}]
+        """
+        entries = [(p["investment_id"], p["date"], p["price"]) for p in prices]
+        self._record(entries, INVESTMENT)
+        return len(entries)
+
+    def _record(self, entries: List[tuple], kind: str):
+        assets = self.db.get_savings_assets(kind)
+        known_ids = set(assets['id'])
+
+        for asset_id, day, value in entries:
+            if asset_id not in known_ids:
+                raise ValueError(f"{kind.capitalize()} with id {asset_id} not found")
+            if value < 0:
+                raise ValueError("Value cannot be negative")
+            self._parse_date(day)
+
+        if entries:
+            self.db.record_asset_values(entries)
+
+    # ============= Aggregates =============
 
     def calculate_net_worth(self) -> float:
         """Calculate total net worth (all savings + investments)"""
-        raise NotImplementedError("Net worth calculation coming soon")
+        totals = self.db.get_net_worth_totals()
+        return round(float(totals['current_value'].sum()), 2) if not totals.empty else 0.0
 
     def get_portfolio_allocation(self) -> Dict[str, float]:
-        """Get asset allocation breakdown"""
-        raise NotImplementedError("Portfolio allocation feature coming soon")
+        """Get asset allocation breakdown as a percentage of net worth per asset type"""
+        totals = self.db.get_net_worth_totals()
+        net_worth = totals['current_value'].sum() if not totals.empty else 0.0
+        if net_worth <= 0:
+            return {}
+
+        return {
+            row['asset_type']: round(row['current_value'] / net_worth * 100, 2)
+            for _, row in totals.iterrows()
+            if row['current_value'] != 0
+        }
 
     def calculate_roi(self, investment_id: int) -> float:
         """Calculate return on investment"""
-        raise NotImplementedError("ROI calculation coming soon")
+        investment = self.db.get_savings_asset_by_id(investment_id)
+        if investment is None or investment['kind'] != INVESTMENT:
+            raise ValueError(f"Investment with id {investment_id} not found")
+        if investment['cost_basis'] == 0:
+            return 0.0
+
+        return round((investment['current_value'] - investment['cost_basis']) / investment['cost_basis'] * 100, 2)
+
+    def get_net_worth_history(self, start_date: Optional[str] = None, end_date: Optional[str] = None) -> pd.DataFrame:
+        """
+        Daily net worth between start_date and end_date from the precomputed points.
+        Days after the last snapshot carry its value forward; days before the first are 0.
+        """
+        end = self._parse_date(end_date) if end_date else date.today()
+        points = self.db.get_net_worth_daily(start_date, end.strftime("%Y-%m-%d"))
+
+        if start_date:
+            start = self._parse_date(start_date)
+        elif not points.empty:
+            start = self._parse_date(points['date'].iloc[0])
+        else:
+            return pd.DataFrame(columns=['date', 'net_worth'])
+        if start > end:
+            raise ValueError("start_date must be on or before end_date")
+
+        days = pd.date_range(start, end, freq="D").strftime("%Y-%m-%d")
+        series = points.set_index('date')['net_worth'].reindex(days)
+        if pd.isna(series.iloc[0]):
+            series.iloc[0] = self.db.get_last_net_worth_point(days[0]) or 0.0
+        series = series.ffill()
+
+        return pd.DataFrame({"date": days, "net_worth": series.round(2).values})
+
+    def _date_or_today(self, value: Optional[str]) -> str:
+        if value is None:
+            return date.today().strftime("%Y-%m-%d")
+        self._parse_date(value)
+        return value
+
+    def _parse_date(self, value: str) -> date:
+        try:
+            return datetime.strptime(value, "%Y-%m-%d").date()
+        except ValueError:
+            raise ValueError(f"Invalid date format: {value}. Expected YYYY-MM-DD")
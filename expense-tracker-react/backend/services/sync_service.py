@@ -0,0 +1,126 @@
+"""
+Sync Service - Delta sync of expenses, budgets and recurring transactions for offline clients
+Clients keep the last version they saw and fetch only rows changed since, then push their
+queued edits as one batch with the row versions they were based on
+"""
+
+from datetime import datetime
+from typing import Dict, List
+from database.sqlite_impl import SQLiteDatabase, SYNC_TABLES
+
+OPERATIONS = ("insert", "update", "delete")
+
+# Columns a client may write per table, and those an insert must include
+SYNC_COLUMNS = {
+    "expenses": ("date", "category", "subcategory", "amount", "description", "is_recurring"),
+    "budgets": ("month", "category", "amount"),
+    "recurring_transactions": ("category", "subcategory", "amount", "description", "is_active"),
+}
+REQUIRED_COLUMNS = {
+    "expenses": ("date", "category", "subcategory", "amount"),
+    "budgets": ("month", "category", "amount"),
+    "recurring_transactions": ("category", "subcategory", "amount"),
+}
+
+MAX_SYNC_LIMIT = 5000
+MAX_MUTATIONS = 1000
+
+
+class SyncService:
+    """Serves changes since a version in compact column/row form and applies batched mutations"""
+
+    def __init__(self, db: SQLiteDatabase):
+        self.db = db
+
+    def get_changes(self, since: int = 0, limit: int = 1000) -> Dict:
+        """
+        Rows changed and ids deleted after `since`, oldest first. Pass the returned version
+        as the next `since`; more is True when the page was cut at `limit`.
+        """
+        if since < 0:
+            raise ValueError("since must be a version >= 0")
+        if not 1 <= limit <= MAX_SYNC_LIMIT:
+            raise ValueError(f"Limit must be between 1 and {MAX_SYNC_LIMIT}")
+
+        changes = self.db.get_sync_changes(since, limit)
+
+        tables = {}
+        for table, rows in changes['rows'].items():
+            if rows:
+                columns = list(rows[0])
+                tables[table] = {"columns": columns, "rows": [[row[column] for column in columns] for row in rows]}
+
+        return {
+            "version": changes['version'],
+            "more": changes['more'],
+            "tables": tables,
+            "deleted": {table: ids for table, ids in changes['deleted'].items() if ids},
+        }
+
+    def apply_mutations(self, mutations: List[dict]) -> Dict:
+        """
+        Apply a batch of client mutations in order, in one transaction.
+        Each mutation is {"table", "op", "id" (update/delete), "base_version" (update/delete), "values"}.
+        The whole batch is rejected if any mutation is malformed; version conflicts are
+        reported per mutation with the server's current row.
+        """
+        if len(mutations) > MAX_MUTATIONS:
+            raise ValueError(f"At most {MAX_MUTATIONS} mutations per batch")
+
+        cleaned = [self._validate(index, mutation) for index, mutation in enumerate(mutations)]
+        results = self.db.apply_sync_mutations(cleaned) if cleaned else []
+
+        for mutation, result in zip(mutations, results):
+            if mutation.get('client_id') is not None:
+                result['client_id'] = mutation['client_id']
+
+        return {"results": results, "version": self.db.get_sync_version()}
+
+    def _validate(self, index: int, mutation: dict) -> dict:
+        table, op = mutation.get('table'), mutation.get('op')
+        if table not in SYNC_TABLES:
+            raise ValueError(f"Mutation {index}: invalid table {table!r}. Expected one of {list(SYNC_TABLES)}")
+        if op not in OPERATIONS:
+            raise ValueError(f"Mutation {index}: invalid op {op!r}. Expected one of {list(OPERATIONS)}")
+
+        cleaned = {"table": table, "op": op}
+        if op != "insert":
+            if not isinstance(mutation.get('id'), int) or not isinstance(mutation.get('base_version'), int):
+                raise ValueError(f"Mutation {index}: {op} needs an integer id and base_version")
+            cleaned['id'] = mutation['id']
+            cleaned['base_version'] = mutation['base_version']
+        if op == "delete":
+            return cleaned
+
+        values = dict(mutation.get('values') or {})
+        unknown = set(values) - set(SYNC_COLUMNS[table])
+        if unknown:
+            raise ValueError(f"Mutation {index}: unknown columns {sorted(unknown)} for {table}")
+        if op == "insert":
+            missing = set(REQUIRED_COLUMNS[table]) - set(values)
+            if missing:
+                raise ValueError(f"Mutation {index}: missing columns {sorted(missing)}")
+            if 'description' in SYNC_COLUMNS[table]:
+                values.setdefault('description', "")
+        elif not values:
+            raise ValueError(f"Mutation {index}: update has no values")
+
+        try:
+            if 'amount' in values:
+                values['amount'] = float(values['amount'])
+                if table == "budgets" and values['amount'] < 0:
+                    raise ValueError("Budget amount cannot be negative")
+                if table != "budgets" and values['amount'] <= 0:
+                    raise ValueError("Amount must be greater than 0")
+            if 'date' in values:
+                datetime.strptime(values['date'], "%Y-%m-%d")
+            if 'month' in values:
+                datetime.strptime(values['month'], "%Y-%m")
+            for flag in ('is_recurring', 'is_active'):
+                if flag in values:
+                    values[flag] = 1 if values[flag] else 0
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"Mutation {index}: {e}")
+
+        cleaned['values'] = values
+        return cleaned
@@ -0,0 +1,136 @@
+"""
+Timeline Service - One date-ordered feed across expenses, budgets, recurring, savings, habits and journal
+"""
+
+import base64
+import heapq
+import json
+from datetime import date, timedelta
+from itertools import islice
+from typing import Dict, Iterator, List, Optional
+
+from database.sqlite_impl import SQLiteDatabase
+
+# Same-day events are ordered by source, last listed first
+SOURCES = ("budget", "recurring", "savings", "habit", "journal", "expense")
+
+# Cursor that sorts after every real event
+START = ("9999-12-31", len(SOURCES), 2 ** 63 - 1)
+
+
+class TimelineService:
+    """
+    Serves the timeline by lazily k-way merging one newest-first stream per source.
+    Every stream is a keyset-paginated query (or a bitset walk for habits) that starts
+    just after the cursor, so a page costs O(limit * log k) regardless of history size.
+    """
+
+    def __init__(self, db: SQLiteDatabase):
+        self.db = db
+
+    def get_timeline(self, limit: int = 50, cursor: Optional[str] = None, sources: Optional[List[str]] = None) -> Dict:
+        """Get one page of events, newest first, with the cursor for the next page"""
+        if limit < 1:
+            raise ValueError("Limit must be at least 1")
+        sources = sources or list(SOURCES)
+        unknown = set(sources) - set(SOURCES)
+        if unknown:
+            raise ValueError(f"Invalid sources: {sorted(unknown)}. Expected any of {list(SOURCES)}")
+
+        position = self._decode_cursor(cursor) if cursor else START
+        # No single stream can contribute more than limit + 1 events to a page
+        streams = [self._stream(source, position, limit + 1) for source in sources]
+        merged = heapq.merge(*streams, key=lambda event: event[0], reverse=True)
+        page = list(islice(merged, limit + 1))
+
+        next_cursor = None
+        if len(page) > limit:
+            page = page[:limit]
+            next_cursor = self._encode_cursor(page[-1][0])
+
+        return {
+            "events": [event for _, event in page],
+            "next_cursor": next_cursor,
+        }
+
+    # ============= Streams =============
+
+    def _stream(self, source: str, position: tuple, batch_size: int) -> Iterator[tuple]:
+        """Yield (sort key, event) for one source strictly after position in feed order"""
+        rank = SOURCES.index(source)
+        before = self._before(rank, position)
+
+        if source == "habit":
+            yield from self._habit_stream(rank, before)
+            return
+
+        partitions = [None]
+        if source == "expense":
+            partitions += self.db.get_archived_years(before[0])
+
+        streams = [
+            self._row_stream(source, rank, self.db.iter_timeline_rows(source, before, batch_size, archive_year=year))
+            for year in partitions
+        ]
+        yield from heapq.merge(*streams, key=lambda event: event[0], reverse=True)
+
+    def _row_stream(self, source: str, rank: int, rows: Iterator[dict]) -> Iterator[tuple]:
+        for row in rows:
+            event_date = row.pop('date')
+            event_id = row.pop('id')
+            yield (event_date, rank, event_id), {"type": source, "date": event_date, "id": event_id, "data": row}
+
+    def _habit_stream(self, rank: int, before: tuple) -> Iterator[tuple]:
+        """Completed habit days, decoded year by year from the bitsets, newest first"""
+        habits = self.db.get_habits()
+        streams = [
+            self._habit_days(rank, int(habit['id']), habit['name'], before)
+            for _, habit in habits.iterrows()
+        ]
+        yield from heapq.merge(*streams, key=lambda event: event[0], reverse=True)
+
+    def _habit_days(self, rank: int, habit_id: int, name: str, before: tuple) -> Iterator[tuple]:
+        last_date, last_id = before
+        # The cursor's own day is only included for habits ordered before it
+        limit_date = date.fromisoformat(last_date) if habit_id < last_id else date.fromisoformat(last_date) - timedelta(days=1)
+
+        bitsets = self.db.get_habit_bitsets(habit_id, end_year=limit_date.year)
+        for year in sorted(bitsets, reverse=True):
+            bits = bitsets[year]
+            if year == limit_date.year:
+                bits &= (1 << limit_date.timetuple().tm_yday) - 1
+
+            jan_first = date(year, 1, 1)
+            while bits:
+                day = bits.bit_length() - 1
+                bits ^= 1 << day
+                event_date = (jan_first + timedelta(days=day)).strftime("%Y-%m-%d")
+                yield (event_date, rank, habit_id), {
+                    "type": "habit", "date": event_date, "id": habit_id, "data": {"habit_id": habit_id, "name": name},
+                }
+
+    # ============= Cursors =============
+
+    def _before(self, rank: int, position: tuple) -> tuple:
+        """
+        Translate a feed position into a per-source keyset bound (date, id).
+        Sources ranked below the cursor's source still include the cursor's whole day,
+        sources ranked above it exclude it, and the same source continues after its id.
+        """
+        last_date, last_rank, last_id = position
+        if rank < last_rank:
+            return last_date, 2 ** 63 - 1
+        if rank > last_rank:
+            return last_date, 0
+        return last_date, last_id
+
+    def _encode_cursor(self, key: tuple) -> str:
+        return base64.urlsafe_b64encode(json.dumps(list(key)).encode()).decode()
+
+    def _decode_cursor(self, cursor: str) -> tuple:
+        try:
+            last_date, last_rank, last_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            date.fromisoformat(last_date)
+            return last_date, int(last_rank), int(last_id)
+        except (ValueError, TypeError):
+            raise ValueError("Invalid cursor")
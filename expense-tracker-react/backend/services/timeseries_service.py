@@ -0,0 +1,236 @@
+"""
+Time Series Service - Gap-filled spending series for daily/weekly/monthly charts
+"""
+
+import threading
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from database.base import ExpenseStorage
+
+GRANULARITIES = ("daily", "weekly", "monthly")
+
+
+class SpendingMatrix:
+    """
+    Dense spending matrix indexed by [is_recurring, day offset from origin, category].
+    Every day in [origin, origin + days) has a row, so series are gap-filled by construction.
+    """
+
+    def __init__(self, origin: date, days: int, df: pd.DataFrame):
+        self.origin = origin
+        self.days = days
+
+        if df.empty:
+            self.categories: List[str] = []
+            self.values = np.zeros((2, days, 0))
+            return
+
+        offsets = (df['date'].values.astype('datetime64[D]') - np.datetime64(origin, 'D')).astype(np.int64)
+        codes, categories = pd.factorize(df['category'])
+        flags = df['is_recurring'].fillna(0).astype(np.int64).values.clip(0, 1)
+        in_range = (offsets >= 0) & (offsets < days)
+
+        n_categories = len(categories)
+        flat_index = (flags[in_range] * days + offsets[in_range]) * n_categories + codes[in_range]
+        totals = np.bincount(flat_index, weights=df['amount'].values[in_range], minlength=2 * days * n_categories)
+
+        self.categories = list(categories)
+        self.values = totals.reshape(2, days, n_categories)
+
+    @property
+    def end(self) -> date:
+        """Last day covered (inclusive)"""
+        return self.origin + timedelta(days=self.days - 1)
+
+    def covers(self, start: date, end: date) -> bool:
+        return self.origin <= start and end <= self.end
+
+    def add(self, day: date, category: str, amount: float, is_recurring: bool = False) -> bool:
+        """Apply a single expense delta in O(1); returns False if the day is outside the window"""
+        offset = (day - self.origin).days
+        if not 0 <= offset < self.days:
+            return False
+
+        if category not in self.categories:
+            self.categories.append(category)
+            self.values = np.pad(self.values, ((0, 0), (0, 0), (0, 1)))
+
+        self.values[1 if is_recurring else 0, offset, self.categories.index(category)] += amount
+        return True
+
+    def daily(self, start: date, end: date, exclude_recurring: bool) -> np.ndarray:
+        """Days x categories slice (inclusive range, must be covered)"""
+        s = (start - self.origin).days
+        e = (end - self.origin).days + 1
+        if exclude_recurring:
+            return self.values[0, s:e]
+        return self.values[0, s:e] + self.values[1, s:e]
+
+
+class TimeSeriesService:
+    """
+    Serves spending series from an in-memory SpendingMatrix over a trailing window.
+    The matrix is built once with vectorized ops and then kept current with per-expense deltas;
+    ranges outside the window are computed on demand without being cached.
+    """
+
+    def __init__(self, db: ExpenseStorage, window_days: int = 3 * 366):
+        self.db = db
+        self.window_days = window_days
+        self._matrix: Optional[SpendingMatrix] = None
+        self._version = 0
+        self._lock = threading.Lock()
+
+    # ============= Incremental updates =============
+
+    def record_expense(self, expense_date: str, category: str, amount: float, is_recurring: bool = False):
+        """Apply a new expense to the cached matrix"""
+        self._apply(expense_date, category, amount, is_recurring)
+
+    def remove_expense(self, expense: dict):
+        """Reverse a deleted (or pre-update) expense row from get_expense_by_id"""
+        self._apply(expense['date'], expense['category'], -float(expense['amount']), bool(expense['is_recurring']))
+
+    def invalidate(self):
+        """Drop the cached matrix; it is rebuilt on the next request"""
+        with self._lock:
+            self._matrix = None
+
+    def _apply(self, expense_date: str, category: str, amount: float, is_recurring: bool):
+        day = pd.Timestamp(expense_date).date()
+        with self._lock:
+            if self._matrix is not None and not self._matrix.add(day, category, amount, is_recurring):
+                # Outside the window (e.g. far-future date): let the next request rebuild
+                if day > self._matrix.end:
+                    self._matrix = None
+
+    # ============= Queries =============
+
+    def get_series(
+        self,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+        granularity: str = "daily",
+        exclude_recurring: bool = True,
+        rolling_window: int = 7,
+    ) -> Dict:
+        """
+        Gap-filled spending per category and in total between start_date and end_date.
+        Each series has the amounts, a trailing rolling mean over rolling_window periods and,
+        for daily series, the cumulative month-to-date total.
+        Defaults to the last 90 days.
+        """
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"Invalid granularity: {granularity}. Expected one of {list(GRANULARITIES)}")
+        if rolling_window < 1:
+            raise ValueError("Rolling window must be at least 1")
+
+        end = self._parse_date(end_date) if end_date else date.today()
+        start = self._parse_date(start_date) if start_date else end - timedelta(days=89)
+        if start > end:
+            raise ValueError("start_date must be on or before end_date")
+
+        # Pull extra history so the first rolling means and month-to-date totals are complete
+        lookback_days = (rolling_window - 1) * {"daily": 1, "weekly": 7, "monthly": 31}[granularity]
+        load_start = min(start - timedelta(days=lookback_days), start.replace(day=1))
+        if granularity == "weekly":
+            load_start -= timedelta(days=load_start.weekday())
+        elif granularity == "monthly":
+            load_start = load_start.replace(day=1)
+
+        matrix = self._get_matrix(load_start, start, end)
+        load_start = max(load_start, matrix.origin)
+        daily = matrix.daily(load_start, end, exclude_recurring)
+        days = pd.date_range(load_start, end, freq="D")
+
+        if granularity == "daily":
+            periods, values = days, daily
+        else:
+            # Weeks start on Monday, months on the 1st
+            period_starts = days.to_period("W-SUN" if granularity == "weekly" else "M").start_time
+            boundaries = np.flatnonzero(np.r_[True, period_starts[1:] != period_starts[:-1]])
+            periods = pd.DatetimeIndex(period_starts[boundaries])
+            values = np.add.reduceat(daily, boundaries, axis=0)
+
+        rolling = self._rolling_mean(values, rolling_window)
+        month_to_date = self._month_to_date(days, daily) if granularity == "daily" else None
+
+        # Drop the lookback rows; weekly/monthly keep the bucket containing start
+        if granularity == "daily":
+            first = int(np.searchsorted(periods, pd.Timestamp(start)))
+        else:
+            first = max(int(np.searchsorted(periods, pd.Timestamp(start), side="right")) - 1, 0)
+
+        def series(column: Optional[int]) -> dict:
+            pick = (lambda a: a.sum(axis=1)) if column is None else (lambda a: a[:, column])
+            result = {
+                "amount": np.round(pick(values)[first:], 2).tolist(),
+                "rolling_mean": np.round(pick(rolling)[first:], 2).tolist(),
+            }
+            if month_to_date is not None:
+                result["month_to_date"] = np.round(pick(month_to_date)[first:], 2).tolist()
+            return result
+
+        return {
+            "granularity": granularity,
+            "periods": [p.strftime("%Y-%m-%d") for p in periods[first:]],
+            "categories": {category: series(i) for i, category in enumerate(matrix.categories)},
+            "total": series(None),
+        }
+
+    def _get_matrix(self, load_start: date, start: date, end: date) -> SpendingMatrix:
+        """Cached trailing-window matrix when it covers [start, end], otherwise a one-off build"""
+        today = date.today()
+        window_start = today - timedelta(days=self.window_days - 1)
+        # Leave room for expenses dated into next month (e.g. applied recurring)
+        window_end = (pd.Timestamp(today) + pd.offsets.MonthEnd(2)).date()
+
+        with self._lock:
+            # Another worker wrote to the database: our deltas no longer tell the whole story
+            version = self.db.data_version()
+            if self._matrix is not None and version != self._version:
+                self._matrix = None
+
+            if self._matrix is not None and self._matrix.covers(start, end):
+                return self._matrix
+
+            if window_start <= start and end <= window_end:
+                self._matrix = self._build(window_start, window_end)
+                self._version = version
+                return self._matrix
+
+        return self._build(load_start, end)
+
+    def _build(self, start: date, end: date) -> SpendingMatrix:
+        df = self.db.get_expenses(start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d"))
+        return SpendingMatrix(start, (end - start).days + 1, df)
+
+    def _rolling_mean(self, values: np.ndarray, window: int) -> np.ndarray:
+        """Trailing mean over up to `window` rows using cumulative sums"""
+        if len(values) == 0:
+            return values
+        cumulative = np.cumsum(np.vstack([np.zeros((1, values.shape[1])), values]), axis=0)
+        index = np.arange(1, len(values) + 1)
+        lower = np.maximum(index - window, 0)
+        counts = (index - lower)[:, None]
+        return (cumulative[index] - cumulative[lower]) / counts
+
+    def _month_to_date(self, days: pd.DatetimeIndex, daily: np.ndarray) -> np.ndarray:
+        """Cumulative totals that reset on the first of every month"""
+        if len(daily) == 0:
+            return daily
+        cumulative = np.cumsum(daily, axis=0)
+        # Index of the first day of each row's month (0 if the month started before the range)
+        positions = np.arange(len(days))
+        month_start = np.maximum.accumulate(np.where(days.day == 1, positions, 0))
+        base = np.where((month_start > 0)[:, None], cumulative[month_start - 1], 0.0)
+        return cumulative - base
+
+    def _parse_date(self, value: str) -> date:
+        try:
+            return datetime.strptime(value, "%Y-%m-%d").date()
+        except ValueError:
+            raise ValueError(f"Invalid date format: {value}. Expected YYYY-MM-DD")
@@ -0,0 +1,267 @@
+"""
+Tenant routing for the Life Dashboard backend
+Every user/household gets its own SQLite file; open databases and their services
+are kept in an LRU-bounded pool and created lazily on first use
+"""
+
+import asyncio
+import os
+import re
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+from database.base import ExpenseStorage, create_storage
+from database.sqlite_impl import SQLiteDatabase
+from database.backup import BackupManager
+from services.expense_service import ExpenseService
+from services.budget_service import BudgetService
+from services.recurring_service import RecurringService
+from services.timeseries_service import TimeSeriesService
+from services.forecast_service import ForecastService
+from services.anomaly_service import AnomalyService
+from services.habit_service import HabitService
+from services.savings_service import SavingsService
+from services.journal_service import JournalService
+from services.timeline_service import TimelineService
+from services.change_feed_service import ChangeFeedService
+from services.sync_service import SyncService
+
+TENANT_HEADER = "X-Tenant-ID"
+TENANT_PATH_PREFIX = "/t/"
+
+# Requests without a tenant use the original single-ledger database
+DEFAULT_TENANT = "default"
+
+TENANT_ID_PATTERN = re.compile(r"^[a-z0-9][a-z0-9_-]{0,63}$")
+
+
+def validate_tenant_id(tenant_id: str) -> str:
+    """Normalize a tenant id; only safe file-name characters are allowed"""
+    tenant_id = tenant_id.strip().lower()
+    if not TENANT_ID_PATTERN.match(tenant_id):
+        raise ValueError(f"Invalid tenant id: {tenant_id!r}. Use 1-64 letters, digits, '-' or '_'")
+    return tenant_id
+
+
+def tenant_data_dir(data_dir: str, tenant_id: str) -> Path:
+    """Directory holding a tenant's database, archive files and backups"""
+    if tenant_id == DEFAULT_TENANT:
+        return Path(data_dir)
+    return Path(data_dir) / "tenants" / tenant_id
+
+
+class Tenant:
+    """One tenant's database plus its services, each built on first access"""
+
+    def __init__(self, tenant_id: str, data_dir: Path, max_concurrency: int, watch_changes: bool = False, database_url: Optional[str] = None):
+        """database_url: keep expenses, budgets and recurring transactions there instead of the SQLite file"""
+        self.tenant_id = tenant_id
+        self.data_dir = data_dir
+        # Caps how many of this tenant's requests hold a worker thread at once, so one
+        # tenant's heavy scans can't occupy the whole threadpool (see api.get_tenant)
+        self.request_slots = asyncio.Semaphore(max_concurrency)
+
+        self._services: Dict[str, object] = {}
+        # Reentrant: a factory may build the services it depends on (forecast -> budget)
+        self._lock = threading.RLock()
+
+        self.db = SQLiteDatabase(str(data_dir / "expenses.db"), watch_changes=watch_changes)
+        self.store: ExpenseStorage = self.db
+        if database_url:
+            self.store = create_storage(
+                database_url, None if tenant_id == DEFAULT_TENANT else tenant_id, watch_changes=watch_changes
+            )
+        # Under the init lock so concurrently starting workers add the defaults only once
+        with self.db.init_lock():
+            self.recurring_service.setup_default_recurring()
+
+    def close(self):
+        """Release the store's connection pool and the SQLite change-watch connection"""
+        if self.store is not self.db:
+            self.store.close()
+        self.db.close()
+
+    @property
+    def expenses_in_sqlite(self) -> bool:
+        """False when database_url moved expenses, budgets and recurring transactions to another store"""
+        return self.store is self.db
+
+    def _service(self, name: str, factory: Callable[[], object]):
+        service = self._services.get(name)
+        if service is None:
+            with self._lock:
+                service = self._services.get(name)
+                if service is None:
+                    service = self._services[name] = factory()
+        return service
+
+    def _sqlite_service(self, name: str, factory: Callable[[], object]):
+        """
+        A service reading expense data from SQLite tables only SQLite writes maintain (change
+        log, sync versions, anomaly joins, archives). With expenses elsewhere it would serve
+        empty or unrelated results, so it refuses to start instead.
+        """
+        if not self.expenses_in_sqlite:
+            raise NotImplementedError(f"The {name} feature needs expenses stored in SQLite; it is unavailable with DATABASE_URL set")
+        return self._service(name, factory)
+
+    @property
+    def expense_service(self) -> ExpenseService:
+        return self._service("expense", lambda: ExpenseService(self.store))
+
+    @property
+    def budget_service(self) -> BudgetService:
+        return self._service("budget", lambda: BudgetService(self.store))
+
+    @property
+    def recurring_service(self) -> RecurringService:
+        return self._service("recurring", lambda: RecurringService(self.store))
+
+    @property
+    def timeseries_service(self) -> TimeSeriesService:
+        return self._service("timeseries", lambda: TimeSeriesService(self.store))
+
+    @property
+    def forecast_service(self) -> ForecastService:
+        return self._service("forecast", lambda: ForecastService(self.db, self.budget_service, store=self.store))
+
+    @property
+    def anomaly_service(self) -> AnomalyService:
+        return self._sqlite_service("anomaly", lambda: AnomalyService(self.db))
+
+    @property
+    def habit_service(self) -> HabitService:
+        return self._service("habit", lambda: HabitService(self.db))
+
+    @property
+    def savings_service(self) -> SavingsService:
+        return self._service("savings", lambda: SavingsService(self.db))
+
+    @property
+    def journal_service(self) -> JournalService:
+        return self._service("journal", lambda: JournalService(self.db))
+
+    @property
+    def timeline_service(self) -> TimelineService:
+        return self._sqlite_service("timeline", lambda: TimelineService(self.db))
+
+    @property
+    def change_feed_service(self) -> ChangeFeedService:
+        return self._sqlite_service("change_feed", lambda: ChangeFeedService(self.db))
+
+    @property
+    def sync_service(self) -> SyncService:
+        return self._sqlite_service("sync", lambda: SyncService(self.db))
+
+    @property
+    def backup_manager(self) -> BackupManager:
+        return self._service("backup", lambda: BackupManager(self.db, str(self.data_dir / "backups")))
+
+
+class TenantPool:
+    """
+    LRU-bounded map of tenant id -> Tenant.
+    Evicting a tenant drops its in-memory caches (time series matrix, forecast models)
+    and closes it: a PostgreSQL store's connection pool and the SQLite watch connection.
+    Requests still running on an evicted tenant keep the connections they hold.
+    """
+
+    def __init__(self, data_dir: str, max_open: int = 64, max_concurrency: int = 4, watch_changes: bool = False, database_url: Optional[str] = None):
+        """
+        watch_changes: other processes write to the same files (multi-worker mode)
+        database_url: optional PostgreSQL URL for the core expense tables (one schema per tenant)
+        """
+        if max_open < 1:
+            raise ValueError("Must allow at least one open tenant")
+        self.data_dir = data_dir
+        self.max_open = max_open
+        self.max_concurrency = max_concurrency
+        self.watch_changes = watch_changes
+        self.database_url = database_url
+        self._tenants: "OrderedDict[str, Tenant]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._opening: Dict[str, threading.Lock] = {}
+
+    def get(self, tenant_id: str) -> Tenant:
+        """Get (opening if needed) the tenant, marking it most recently used"""
+        tenant_id = validate_tenant_id(tenant_id)
+
+        with self._lock:
+            tenant = self._tenants.get(tenant_id)
+            if tenant is not None:
+                self._tenants.move_to_end(tenant_id)
+                return tenant
+            opening = self._opening.setdefault(tenant_id, threading.Lock())
+
+        # Open outside the pool lock so a slow first open doesn't block other tenants
+        evicted = []
+        with opening:
+            with self._lock:
+                tenant = self._tenants.get(tenant_id)
+            if tenant is None:
+                tenant = Tenant(
+                    tenant_id, tenant_data_dir(self.data_dir, tenant_id), self.max_concurrency, self.watch_changes,
+                    self.database_url,
+                )
+
+            with self._lock:
+                self._tenants[tenant_id] = tenant
+                self._tenants.move_to_end(tenant_id)
+                while len(self._tenants) > self.max_open:
+                    evicted.append(self._tenants.popitem(last=False)[1])
+                self._opening.pop(tenant_id, None)
+
+        # Closing a pool waits for its worker threads, so it too happens outside the lock
+        for old in evicted:
+            old.close()
+        return tenant
+
+    def close(self):
+        """Close every open tenant (on shutdown)"""
+        with self._lock:
+            tenants = list(self._tenants.values())
+            self._tenants.clear()
+        for tenant in tenants:
+            tenant.close()
+
+    def open_tenants(self) -> list:
+        """Ids of tenants currently in the pool, least recently used first"""
+        with self._lock:
+            return list(self._tenants)
+
+
+class TenantPathMiddleware:
+    """
+    ASGI middleware routing /t/<tenant>/<path> to /<path> with the tenant header set,
+    so every endpoint is reachable both per path and per header.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] in ("http", "websocket") and scope["path"].startswith(TENANT_PATH_PREFIX):
+            tenant_id, _, rest = scope["path"][len(TENANT_PATH_PREFIX):].partition("/")
+            scope = dict(scope)
+            scope["path"] = "/" + rest
+            scope["raw_path"] = scope["path"].encode()
+            scope["headers"] = [
+                (name, value) for name, value in scope["headers"] if name != TENANT_HEADER.lower().encode()
+            ] + [(TENANT_HEADER.lower().encode(), tenant_id.encode())]
+        await self.app(scope, receive, send)
+
+
+def pool_from_env(data_dir: str) -> TenantPool:
+    """
+    Build the pool with MAX_OPEN_TENANTS / TENANT_MAX_CONCURRENCY / DATABASE_URL overrides.
+    WEB_CONCURRENCY > 1 (number of uvicorn workers) turns on cross-process cache invalidation.
+    """
+    return TenantPool(
+        data_dir,
+        max_open=int(os.environ.get("MAX_OPEN_TENANTS", "64")),
+        max_concurrency=int(os.environ.get("TENANT_MAX_CONCURRENCY", "4")),
+        watch_changes=int(os.environ.get("WEB_CONCURRENCY", "1")) > 1,
+        database_url=os.environ.get("DATABASE_URL") or None,
+    )
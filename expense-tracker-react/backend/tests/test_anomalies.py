@@ -0,0 +1,41 @@
+"""
+Anomaly detection sees archived expenses as it sees hot ones
+"""
+
+import pytest
+
+from database.sqlite_impl import SQLiteDatabase
+from services.anomaly_service import DUPLICATE, OUTLIER, AnomalyService
+
+
+@pytest.fixture(params=[False, True], ids=["hot", "archived"])
+def seeded(request, tmp_path):
+    """20 Groceries expenses in 2024-03 (archived or not) and the service over them"""
+    db = SQLiteDatabase(str(tmp_path / "expenses.db"))
+    service = AnomalyService(db)
+    db.add_expense("2024-03-01", "Food", "Groceries", 12.0)
+    for day in range(2, 21):
+        db.add_expense(f"2024-03-{day:02d}", "Food", "Groceries", 10.0 + (day % 5) * 0.5)
+    db.add_expense("2024-03-21", "Food", "Groceries", 950.0)
+    service.scan_history()
+
+    if request.param:
+        assert db.archive_closed_months("2024-06") == {2024: 21}
+    return db, service
+
+
+def test_incremental_checks(seeded):
+    db, service = seeded
+    duplicate = db.add_expense("2024-03-01", "Food", "Groceries", 12.0)
+    outlier = db.add_expense("2024-07-01", "Food", "Groceries", 900.0)
+
+    assert [a["kind"] for a in service.check_expense(duplicate)] == [DUPLICATE]
+    assert [a["kind"] for a in service.check_expense(outlier)] == [OUTLIER]
+
+
+def test_stored_anomalies_and_scan(seeded):
+    db, service = seeded
+    assert list(service.get_anomalies()["kind"]) == [OUTLIER]
+    assert list(service.get_anomalies(start_date="2024-03-01", end_date="2024-03-31")["amount"]) == [950.0]
+
+    assert service.scan_history() == {DUPLICATE: 0, OUTLIER: 1}
@@ -121,6 +121,33 @@ export const getDailySpending = (startDate?: string, endDate?: string) => {
   return apiCall<{ daily: Array<{ date: string; amount: number }> }>(`/expenses/daily${query}`);
 };
 
+export interface SpendingSeries {
+  amount: number[];
+  rolling_mean: number[];
+  month_to_date?: number[];
+}
+
+export interface SpendingTimeSeries {
+  granularity: 'daily' | 'weekly' | 'monthly';
+  periods: string[];
+  categories: Record<string, SpendingSeries>;
+  total: SpendingSeries;
+}
+
+export const getSpendingTimeSeries = (
+  startDate?: string,
+  endDate?: string,
+  granularity: 'daily' | 'weekly' | 'monthly' = 'daily',
+  excludeRecurring: boolean = true
+) => {
+  const params = new URLSearchParams();
+  if (startDate) params.append('start_date', startDate);
+  if (endDate) params.append('end_date', endDate);
+  params.append('granularity', granularity);
+  params.append('exclude_recurring', String(excludeRecurring));
+  return apiCall<{ timeseries: SpendingTimeSeries }>(`/expenses/timeseries?${params}`);
+};
+
 export const getAvailableMonths = () =>
   apiCall<{ months: MonthOption[] }>('/expenses/available-months');
 
@@ -188,3 +215,89 @@ export const applyRecurring = (month: string) =>
   apiCall<{ message: string; applied: any[] }>(`/recurring/apply/${month}`, {
     method: 'POST',
   });
+
+// ============= Timeline =============
+
+export type TimelineSource = 'budget' | 'recurring' | 'savings' | 'habit' | 'journal' | 'expense';
+
+export interface TimelineEvent {
+  type: TimelineSource;
+  date: string;
+  id: number;
+  data: Record<string, any>;
+}
+
+export const getTimeline = (limit: number = 50, cursor?: string, sources?: TimelineSource[]) => {
+  const params = new URLSearchParams();
+  params.append('limit', String(limit));
+  if (cursor) params.append('cursor', cursor);
+  if (sources && sources.length > 0) params.append('sources', sources.join(','));
+  return apiCall<{ events: TimelineEvent[]; next_cursor: string | null }>(`/timeline?${params}`);
+};
+
+// ============= Live Events =============
+
+export type ChangeTable = 'expenses' | 'budgets' | 'recurring_transactions';
+
+export interface ChangeEvent {
+  id: number;
+  table_name: ChangeTable;
+  op: 'insert' | 'update' | 'delete' | 'bulk_insert';
+  row_id: number | null;
+  old: Record<string, any> | null;
+  new: Record<string, any> | null;
+  created_at: string;
+}
+
+// EventSource reconnects on its own and resumes after the last received id (Last-Event-ID).
+// onReset means changes were missed and every resource should be refetched.
+export const subscribeToChanges = (
+  onChange: (change: ChangeEvent) => void,
+  onReset: () => void,
+  tables?: ChangeTable[],
+) => {
+  const params = new URLSearchParams();
+  if (tables && tables.length > 0) params.append('tables', tables.join(','));
+  const source = new EventSource(`${API_BASE_URL}/events?${params}`);
+  source.addEventListener('change', (event) => onChange(JSON.parse((event as MessageEvent).data)));
+  source.addEventListener('reset', () => onReset());
+  return () => source.close();
+};
+
+// ============= Sync =============
+
+export type SyncTable = 'expenses' | 'budgets' | 'recurring_transactions';
+
+export interface SyncChanges {
+  version: number;
+  more: boolean;
+  tables: Partial<Record<SyncTable, { columns: string[]; rows: any[][] }>>;
+  deleted: Partial<Record<SyncTable, number[]>>;
+}
+
+export interface SyncMutation {
+  table: SyncTable;
+  op: 'insert' | 'update' | 'delete';
+  id?: number;
+  base_version?: number;
+  values?: Record<string, any>;
+  client_id?: string;
+}
+
+export interface SyncResult {
+  status: 'applied' | 'conflict';
+  id?: number;
+  row_version?: number;
+  reason?: 'changed' | 'deleted' | 'exists';
+  current?: Record<string, any> | null;
+  client_id?: string;
+}
+
+export const getSyncChanges = (since: number, limit: number = 1000) =>
+  apiCall<SyncChanges>(`/sync?since=${since}&limit=${limit}`);
+
+export const pushSyncMutations = (mutations: SyncMutation[]) =>
+  apiCall<{ results: SyncResult[]; version: number }>('/sync', {
+    method: 'POST',
+    body: JSON.stringify({ mutations }),
+  });